@@ -151,6 +151,23 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024
 
+# Re-normalize uploads in a background thread when synonyms they relied on change.
+# Off by default so web workers don't reprocess files between requests; queued
+# uploads are left to `manage.py renormalize_uploads` (e.g. from cron).
+NORMALIZER_BACKGROUND_RENORMALIZE = os.getenv('NORMALIZER_BACKGROUND_RENORMALIZE', 'False') == 'True'
+
+# Cache alias (e.g. a DatabaseCache) to share fuzzy column/status match results
+# between processes; unset keeps them in a per-process memo only.
+NORMALIZER_FUZZY_CACHE = os.getenv('NORMALIZER_FUZZY_CACHE') or None
+
+# Trained status classifier weights, written by `manage.py train_status_classifier`
+NORMALIZER_STATUS_MODEL = os.getenv('NORMALIZER_STATUS_MODEL', str(BASE_DIR / 'status_classifier.npz'))
+
+# Reader engines to try per file extension, first choice first, e.g.
+# {'.csv': ['c'], '.xlsx': ['openpyxl']}. Extensions left out use the
+# built-in order in normalizer/readers.py; engines that aren't installed are skipped.
+NORMALIZER_READER_ENGINES = {}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
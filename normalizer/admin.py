@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FOIAUpload, ColumnSynonym, StatusSynonym, ProcessingLog, ColumnMapping, StatusMapping, ContributorStats
+from .models import Agency, FOIAUpload, ColumnSynonym, StatusSynonym, ProcessingLog, ColumnMapping, StatusMapping, ContributorStats, NormalizedRecord, AgencyRollup, RequesterCluster, RequesterAlias
 
 
 @admin.register(FOIAUpload)
@@ -8,6 +8,7 @@ class FOIAUploadAdmin(admin.ModelAdmin):
     list_filter = ['submission_status', 'processed', 'uploaded_at']
     search_fields = ['file', 'submitter_username', 'submitter_email', 'agency']
     readonly_fields = ['uploaded_at', 'reviewed_at']
+    raw_id_fields = ['canonical_agency']
     
     fieldsets = (
         ('Upload Information', {
@@ -20,10 +21,10 @@ class FOIAUploadAdmin(admin.ModelAdmin):
             'fields': ('submission_status', 'reviewed_by', 'reviewed_at', 'rejection_reason')
         }),
         ('FOIA Log Metadata', {
-            'fields': ('source', 'agency', 'time_period_start', 'time_period_end')
+            'fields': ('source', 'agency', 'canonical_agency', 'time_period_start', 'time_period_end')
         }),
         ('Processing', {
-            'fields': ('processed', 'output_file')
+            'fields': ('processed', 'output_file', 'parquet_file')
         })
     )
     
@@ -32,6 +33,13 @@ class FOIAUploadAdmin(admin.ModelAdmin):
     filename.short_description = 'File Name'
 
 
+@admin.register(Agency)
+class AgencyAdmin(admin.ModelAdmin):
+    list_display = ['name', 'source_id', 'updated_at']
+    search_fields = ['name', 'normalized_name', 'source_id']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(ColumnSynonym)
 class ColumnSynonymAdmin(admin.ModelAdmin):
     list_display = ['synonym', 'standard_name']
@@ -81,3 +89,35 @@ class ContributorStatsAdmin(admin.ModelAdmin):
     search_fields = ['username', 'email']
     ordering = ['-approved_count', '-submissions_count']
     readonly_fields = ['submissions_count', 'approved_count', 'rejected_count', 'last_submission']
+
+
+@admin.register(NormalizedRecord)
+class NormalizedRecordAdmin(admin.ModelAdmin):
+    list_display = ['request_id', 'agency', 'status', 'date_requested', 'date_completed', 'upload']
+    list_filter = ['status']
+    search_fields = ['request_id', 'requester', 'subject', 'agency']
+    raw_id_fields = ['upload', 'requester_cluster', 'canonical_agency']
+
+
+@admin.register(AgencyRollup)
+class AgencyRollupAdmin(admin.ModelAdmin):
+    list_display = ['agency', 'canonical_agency', 'status', 'month', 'request_count', 'completed_count']
+    list_filter = ['status']
+    search_fields = ['agency']
+    ordering = ['agency', 'month', 'status']
+    readonly_fields = ['canonical_agency', 'agency', 'status', 'month', 'request_count', 'completed_count']
+
+
+class RequesterAliasInline(admin.TabularInline):
+    model = RequesterAlias
+    extra = 0
+    fields = ['normalized_name', 'phonetic_key', 'token_key']
+    readonly_fields = ['phonetic_key', 'token_key']
+
+
+@admin.register(RequesterCluster)
+class RequesterClusterAdmin(admin.ModelAdmin):
+    list_display = ['canonical_name', 'created_at']
+    search_fields = ['canonical_name', 'aliases__normalized_name']
+    readonly_fields = ['created_at']
+    inlines = [RequesterAliasInline]
@@ -0,0 +1,169 @@
+import difflib
+import os
+import re
+
+from django.db.models import Count, Max
+
+from .models import Agency
+
+
+DIRECTORY_RE = re.compile(r'^(\d+)\s+(.+)$')
+LEADING_ID_RE = re.compile(r'^\s*(\d+)\b\s*(.*)$')
+NON_WORD_RE = re.compile(r'[^a-z0-9 ]+')
+LEADING_WORDS = ('the', 'us', 'united states')
+
+
+def normalize_agency_name(name):
+    """Lowercase, punctuation-free form of an agency name for matching"""
+    text = str(name or '').lower().replace('&', ' and ').replace('u.s.', 'us')
+    text = ' '.join(NON_WORD_RE.sub(' ', text).split())
+    for word in LEADING_WORDS:
+        if text.startswith(word + ' '):
+            text = text[len(word) + 1:]
+    return text
+
+
+def load_agency_directory(path):
+    """Create or update agencies from a FOIA Logs directory ("<id> <name>" folders).
+
+    Returns (created, updated) counts.
+    """
+    created = updated = 0
+    for entry in sorted(os.listdir(path)):
+        match = DIRECTORY_RE.match(entry)
+        if not match or not os.path.isdir(os.path.join(path, entry)):
+            continue
+        source_id, name = int(match.group(1)), match.group(2).strip()
+        agency, was_created = Agency.objects.get_or_create(
+            source_id=source_id,
+            defaults={'name': name, 'normalized_name': normalize_agency_name(name)}
+        )
+        if was_created:
+            created += 1
+        elif agency.name != name:
+            agency.name = name
+            agency.normalized_name = normalize_agency_name(name)
+            agency.save()
+            updated += 1
+    return created, updated
+
+
+class AgencyTrie:
+    """Prefix trie over the words of every agency name.
+
+    Each word of a normalized name is inserted, so "guard" finds "Coast
+    Guard" as well as "co" does. A node keeps the ids of agencies with a word
+    ending there; a prefix lookup walks to the prefix node and collects ids
+    from its subtree.
+    """
+
+    def __init__(self, agencies):
+        self.root = {}
+        self.names = {}
+        for agency_id, name in agencies:
+            self.names[agency_id] = name
+            for word in set(name.split()):
+                node = self.root
+                for ch in word:
+                    node = node.setdefault(ch, {})
+                node.setdefault(None, set()).add(agency_id)
+
+    def _node(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def prefix_ids(self, prefix):
+        node = self._node(prefix)
+        if node is None:
+            return set()
+        ids, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    ids |= child
+                else:
+                    stack.append(child)
+        return ids
+
+    def word_ids(self, word):
+        node = self._node(word)
+        return set(node.get(None, ())) if node else set()
+
+    def search(self, query, limit=10):
+        """Agency ids whose words start with every word of the query, best first"""
+        tokens = normalize_agency_name(query).split()
+        if not tokens:
+            return []
+        ids = None
+        for token in tokens:
+            matches = self.prefix_ids(token)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return []
+        text = ' '.join(tokens)
+        # Names starting with the query first, then shorter (more specific) names
+        return sorted(ids, key=lambda i: (not self.names[i].startswith(text), len(self.names[i]), self.names[i]))[:limit]
+
+
+_trie = None
+_trie_version = None
+
+
+def agency_trie():
+    """The autocomplete trie, rebuilt whenever the agency table changes"""
+    global _trie, _trie_version
+    version = tuple(Agency.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+    if _trie is None or version != _trie_version:
+        _trie = AgencyTrie(Agency.objects.values_list('id', 'normalized_name'))
+        _trie_version = version
+    return _trie
+
+
+def autocomplete_agencies(query, limit=10):
+    ids = agency_trie().search(query, limit)
+    agencies = Agency.objects.in_bulk(ids)
+    return [agencies[i] for i in ids if i in agencies]
+
+
+def resolve_agency(text, cutoff=0.88):
+    """Canonical Agency for a free-text agency string, or None.
+
+    Accepts a bare directory id ("215"), a directory-style "215 Coast
+    Guard" whose name part is that agency's, an exact name match after
+    normalization, or a close spelling of an agency that shares a word with
+    the text. A number that is part of a name ("311 Police Department")
+    isn't taken as an id.
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+
+    match = LEADING_ID_RE.match(text)
+    if match:
+        agency = Agency.objects.filter(source_id=int(match.group(1))).first()
+        rest = normalize_agency_name(match.group(2))
+        if agency and (not rest or rest == agency.normalized_name):
+            return agency
+
+    name = normalize_agency_name(text)
+    if not name:
+        return None
+    agency = Agency.objects.filter(normalized_name=name).order_by('id').first()
+    if agency:
+        return agency
+
+    trie = agency_trie()
+    candidates = set()
+    for word in name.split():
+        candidates |= trie.word_ids(word)
+    best_id, best_ratio = None, cutoff
+    for agency_id in candidates:
+        ratio = difflib.SequenceMatcher(None, name, trie.names[agency_id]).ratio()
+        if ratio >= best_ratio:
+            best_id, best_ratio = agency_id, ratio
+    return Agency.objects.filter(id=best_id).first() if best_id else None
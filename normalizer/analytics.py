@@ -0,0 +1,168 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .agencies import resolve_agency
+from .models import AgencyRollup, NormalizedRecord, RequesterAlias, RequesterCluster, TurnaroundSketch
+from .sketches import TDigest
+
+
+# Statuses that mean the agency has finished with a request
+CLOSED_STATUSES = ['done', 'partial', 'no_docs', 'rejected', 'abandoned']
+
+
+def agency_filter(agency):
+    """Q selecting an agency's rows: its directory entry when the text resolves to one, else the unresolved text"""
+    canonical = resolve_agency(agency)
+    if canonical:
+        return Q(canonical_agency=canonical)
+    return Q(canonical_agency__isnull=True, agency=agency)
+
+
+def _record_groups(upload):
+    """Per (agency, status, month) counts for one upload's records, directory agencies under their directory name"""
+    return (
+        NormalizedRecord.objects
+        .filter(upload=upload)
+        .annotate(month=TruncMonth('date_requested'), agency_name=Coalesce('canonical_agency__name', 'agency'))
+        .values('canonical_agency', 'agency_name', 'status', 'month')
+        .annotate(
+            requests=Count('id'),
+            completed=Count('id', filter=Q(date_completed__isnull=False) | Q(status__in=CLOSED_STATUSES))
+        )
+        .order_by()
+    )
+
+
+def update_rollups(upload, sign=1):
+    """Add (sign=1) or subtract (sign=-1) an upload's records from the rollup tables.
+
+    Must run while the upload's NormalizedRecord rows exist: after loading
+    when publishing, before clearing when retracting.
+    """
+    groups = list(_record_groups(upload))
+    if not groups:
+        return
+
+    with transaction.atomic():
+        for group in groups:
+            rollup, created = AgencyRollup.objects.get_or_create(
+                canonical_agency_id=group['canonical_agency'],
+                agency=group['agency_name'],
+                status=group['status'],
+                month=group['month']
+            )
+            AgencyRollup.objects.filter(pk=rollup.pk).update(
+                request_count=F('request_count') + sign * group['requests'],
+                completed_count=F('completed_count') + sign * group['completed']
+            )
+        if sign < 0:
+            AgencyRollup.objects.filter(request_count__lte=0).delete()
+
+
+def analytics_summary(agency=None):
+    """Status distribution, monthly volume and completion rates read from the rollups"""
+    rollups = AgencyRollup.objects.all()
+    if agency:
+        rollups = rollups.filter(agency_filter(agency))
+
+    per_agency = (
+        rollups.values('canonical_agency', 'agency')
+        .annotate(requests=Sum('request_count'), completed=Sum('completed_count'))
+        .order_by('-requests')
+    )
+    per_status = (
+        rollups.values('status')
+        .annotate(requests=Sum('request_count'))
+        .order_by('-requests')
+    )
+    per_month = (
+        rollups.filter(month__isnull=False)
+        .values('month')
+        .annotate(requests=Sum('request_count'), completed=Sum('completed_count'))
+        .order_by('month')
+    )
+
+    return {
+        'agencies': [
+            {
+                'agency': row['agency'],
+                'requests': row['requests'],
+                'completed': row['completed'],
+                'completion_rate': round(row['completed'] / row['requests'], 4) if row['requests'] else None,
+            }
+            for row in per_agency
+        ],
+        'status_distribution': {row['status']: row['requests'] for row in per_status},
+        'monthly_volume': [
+            {
+                'month': row['month'].strftime('%Y-%m'),
+                'requests': row['requests'],
+                'completed': row['completed'],
+            }
+            for row in per_month
+        ],
+    }
+
+
+def requester_summary(agency=None, limit=50):
+    """Most frequent requesters by resolved cluster, with how many agencies they filed with"""
+    records = NormalizedRecord.objects.filter(requester_cluster__isnull=False, upload__submission_status='approved')
+    if agency:
+        records = records.filter(agency_filter(agency))
+    top = list(
+        records.values('requester_cluster')
+        .annotate(
+            requests=Count('id'),
+            agencies=Count(Coalesce('canonical_agency__name', 'agency'), distinct=True)
+        )
+        .order_by('-requests')[:limit]
+    )
+    clusters = RequesterCluster.objects.in_bulk([row['requester_cluster'] for row in top])
+    aliases = {}
+    for cluster_id, alias in (
+        RequesterAlias.objects
+        .filter(cluster_id__in=clusters).values_list('cluster_id', 'normalized_name')
+    ):
+        aliases.setdefault(cluster_id, []).append(alias)
+    return {
+        'agency': agency,
+        'requesters': [
+            {
+                'cluster_id': row['requester_cluster'],
+                'name': clusters[row['requester_cluster']].canonical_name,
+                'aliases': sorted(aliases.get(row['requester_cluster'], [])),
+                'requests': row['requests'],
+                'agencies': row['agencies'],
+            }
+            for row in top
+        ],
+    }
+
+
+def turnaround_summary(agency=None, year=None, quantiles=(0.5, 0.9)):
+    """Merge approved uploads' turnaround sketches, overall and per year"""
+    sketches = TurnaroundSketch.objects.filter(upload__submission_status='approved')
+    if agency:
+        sketches = sketches.filter(agency_filter(agency))
+    if year:
+        sketches = sketches.filter(year=year)
+
+    by_year = {}
+    for sketch_year, digest in sketches.values_list('year', 'digest'):
+        by_year.setdefault(sketch_year, []).append(TDigest.from_bytes(digest))
+
+    def describe(digest):
+        summary = {'count': int(digest.count)}
+        for q in quantiles:
+            value = digest.quantile(q)
+            summary[f'p{int(q * 100)}'] = round(value, 1) if value is not None else None
+        return summary
+
+    year_digests = {sketch_year: TDigest.merge(digests) for sketch_year, digests in by_year.items()}
+    overall = TDigest.merge(year_digests.values())
+    return {
+        'agency': agency,
+        'overall': describe(overall),
+        'years': {str(sketch_year): describe(digest) for sketch_year, digest in sorted(year_digests.items())},
+    }
@@ -0,0 +1,24 @@
+from django.db import connection
+
+
+def insert_rows(model, columns, rows, batch_size=2000):
+    """Insert plain value tuples into a model's table as cheaply as the backend allows.
+
+    On SQLite a single prepared INSERT run with executemany skips Django's
+    per-instance overhead entirely; other backends use batched bulk_create.
+    ``columns`` are database column names (``record_id`` rather than
+    ``record``), which Django also accepts as model keyword arguments.
+    """
+    if connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(columns))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {model._meta.db_table} ({', '.join(columns)}) VALUES ({placeholders})",
+                rows
+            )
+        return
+
+    model.objects.bulk_create(
+        [model(**dict(zip(columns, row))) for row in rows],
+        batch_size=batch_size
+    )
@@ -0,0 +1,282 @@
+import glob
+import gzip
+import io
+import os
+from decimal import Decimal
+
+import pandas as pd
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from .analytics import update_rollups
+from .bulk import insert_rows
+from .dedup import DuplicateIndex
+from .entities import RequesterResolver
+from .models import NormalizedRecord, ProcessingLog
+from .streaming import iter_file_chunks
+from .utils import SFLF_COLUMNS, parse_sflf_amounts, parse_sflf_dates
+
+
+CORPUS_COLUMNS = ['upload id'] + SFLF_COLUMNS
+
+# SFLF column -> NormalizedRecord field
+RECORD_FIELDS = {
+    'request id': 'request_id',
+    'requester': 'requester',
+    'requester organization': 'requester_organization',
+    'subject': 'subject',
+    'date requested': 'date_requested',
+    'date perfected': 'date_perfected',
+    'date completed': 'date_completed',
+    'status': 'status',
+    'exemptions cited': 'exemptions_cited',
+    'fee category': 'fee_category',
+    'fee waiver': 'fee_waiver',
+    'fees charged': 'fees_charged',
+    'processed under privacy act': 'processed_under_privacy_act',
+}
+RECORD_DATE_FIELDS = ('date_requested', 'date_perfected', 'date_completed')
+RECORD_TEXT_FIELDS = ('agency',) + tuple(
+    field for field in RECORD_FIELDS.values()
+    if field not in RECORD_DATE_FIELDS and field != 'fees_charged'
+)
+
+
+class CorpusStore:
+    """Merged dataset of every approved normalized log.
+
+    Rows are stored one gzip CSV partition per upload, grouped in a directory
+    per agency (``corpus/<agency-slug>/upload-<id>.csv.gz``). Every partition
+    has the same header, so exporting the corpus, or one agency of it, is a
+    concatenation of partitions rather than a re-read of each upload's output.
+    """
+    chunk_size = 50000
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.MEDIA_ROOT, 'corpus')
+        self.header = (','.join(CORPUS_COLUMNS) + '\n').encode('utf-8')
+
+    @staticmethod
+    def agency_key(agency):
+        return slugify(agency or '') or 'unknown-agency'
+
+    def partition_path(self, upload):
+        return os.path.join(self.root, self.agency_key(upload.agency), f'upload-{upload.id}.csv.gz')
+
+    def find_partitions(self, upload_id):
+        return glob.glob(os.path.join(self.root, '*', f'upload-{upload_id}.csv.gz'))
+
+    def add_upload(self, upload):
+        """Write (or replace) the partition holding an upload's normalized rows"""
+        self.remove_upload(upload)
+        path = self.partition_path(upload)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_path = f'{path}.tmp'
+        row_count = 0
+        with gzip.open(temp_path, 'wt', encoding='utf-8', newline='') as f:
+            f.write(self.header.decode('utf-8'))
+            reader = pd.read_csv(
+                upload.output_file.path,
+                dtype=str,
+                keep_default_na=False,
+                chunksize=self.chunk_size
+            )
+            for chunk in reader:
+                chunk = chunk.reindex(columns=CORPUS_COLUMNS, fill_value='')
+                chunk['upload id'] = upload.id
+                chunk['agency'] = upload.agency
+                chunk.to_csv(f, header=False, index=False)
+                row_count += len(chunk)
+        os.replace(temp_path, path)
+
+        ProcessingLog.objects.create(
+            upload=upload,
+            log_type='info',
+            message=f'Added {row_count} rows to corpus partition {self.agency_key(upload.agency)}'
+        )
+        return row_count
+
+    def remove_upload(self, upload):
+        """Drop an upload's partition, wherever its agency placed it"""
+        removed = False
+        for path in self.find_partitions(upload.id):
+            os.remove(path)
+            removed = True
+        return removed
+
+    def partitions(self, agency=None):
+        pattern = self.agency_key(agency) if agency else '*'
+        return sorted(glob.glob(os.path.join(self.root, pattern, 'upload-*.csv.gz')))
+
+    def iter_csv(self, agency=None):
+        """Yield the merged corpus (optionally one agency) as CSV bytes"""
+        yield self.header
+        for path in self.partitions(agency):
+            skip = len(self.header)
+            for chunk in iter_file_chunks(path):
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk = chunk[dropped:]
+                    skip -= dropped
+                if chunk:
+                    yield chunk
+
+
+class RecordLoader:
+    """Bulk-load an upload's normalized output into NormalizedRecord rows.
+
+    The output is read in fixed-size chunks and each chunk is converted with
+    vectorized pandas operations, then written with COPY on PostgreSQL, one
+    executemany INSERT on SQLite, or batched bulk_create elsewhere, so memory
+    stays bounded by one chunk.
+    """
+    chunk_size = 10000
+    batch_size = 2000
+
+    def __init__(self):
+        self.columns = (
+            ['upload_id', 'row_number'] + list(RECORD_TEXT_FIELDS) + list(RECORD_DATE_FIELDS)
+            + ['fees_charged', 'requester_cluster_id', 'canonical_agency_id']
+        )
+        self.max_lengths = {
+            field.name: field.max_length
+            for field in NormalizedRecord._meta.get_fields()
+            if getattr(field, 'max_length', None)
+        }
+
+    def prepare_chunk(self, chunk, upload, offset, requester_clusters=None):
+        """Convert a chunk of output text into typed NormalizedRecord columns"""
+        frame = pd.DataFrame(index=chunk.index)
+        frame['upload_id'] = upload.id
+        frame['row_number'] = range(offset + 1, offset + len(chunk) + 1)
+        frame['agency'] = upload.agency
+        frame['canonical_agency_id'] = upload.canonical_agency_id
+        
+        for sflf_col, field in RECORD_FIELDS.items():
+            values = chunk[sflf_col] if sflf_col in chunk.columns else pd.Series('', index=chunk.index)
+            if field in RECORD_DATE_FIELDS:
+                parsed = parse_sflf_dates(values)
+                frame[field] = parsed.dt.date.astype(object).where(parsed.notna(), None)
+            elif field == 'fees_charged':
+                amounts = parse_sflf_amounts(values).round(2)
+                amounts = amounts.where(amounts.abs() < 1e12)
+                frame[field] = [None if pd.isna(v) else Decimal(f'{v:.2f}') for v in amounts]
+            else:
+                frame[field] = values.astype(str).str.strip()
+        
+        for field in RECORD_TEXT_FIELDS:
+            max_length = self.max_lengths.get(field)
+            if max_length:
+                frame[field] = frame[field].str.slice(0, max_length)
+        
+        # Kept as ints and None: a float column would write "123.0" into the bigint column
+        clusters = frame['requester'].map(requester_clusters or {})
+        frame['requester_cluster_id'] = pd.Series(
+            [None if pd.isna(v) else int(v) for v in clusters], index=frame.index, dtype=object
+        )
+        return frame[self.columns]
+
+    def _insert(self, frame):
+        frame = frame.copy()
+        for field in RECORD_DATE_FIELDS:
+            frame[field] = [value.isoformat() if value else None for value in frame[field]]
+        frame['fees_charged'] = [str(value) if value is not None else None for value in frame['fees_charged']]
+        insert_rows(NormalizedRecord, self.columns, frame.itertuples(index=False, name=None), self.batch_size)
+
+    @staticmethod
+    def copy_buffer(frame):
+        """A prepared chunk as the CSV text COPY reads"""
+        buffer = io.StringIO()
+        frame.to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+        return buffer
+
+    def _copy(self, frame):
+        buffer = self.copy_buffer(frame)
+        table = NormalizedRecord._meta.db_table
+        quoted_text = ', '.join(connection.ops.quote_name(c) for c in RECORD_TEXT_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(self.columns)}) FROM STDIN "
+                f"WITH (FORMAT csv, FORCE_NOT_NULL ({quoted_text}))",
+                buffer
+            )
+
+    def load(self, upload, requester_clusters=None):
+        """Replace an upload's records with the rows of its normalized output.
+
+        ``requester_clusters`` maps requester names to RequesterCluster ids
+        (see RequesterResolver.resolve_upload).
+        """
+        write = self._copy if connection.vendor == 'postgresql' else self._insert
+        row_count = 0
+        
+        with transaction.atomic():
+            self.clear(upload)
+            reader = pd.read_csv(
+                upload.output_file.path,
+                dtype=str,
+                keep_default_na=False,
+                chunksize=self.chunk_size
+            )
+            for chunk in reader:
+                write(self.prepare_chunk(chunk, upload, row_count, requester_clusters))
+                row_count += len(chunk)
+        
+        ProcessingLog.objects.create(
+            upload=upload,
+            log_type='info',
+            message=f'Loaded {row_count} normalized records'
+        )
+        return row_count
+
+    @staticmethod
+    def clear(upload):
+        # Drop rows that reference records first, so the records themselves can
+        # go in one DELETE instead of Django collecting every instance
+        DuplicateIndex.clear(upload)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {NormalizedRecord._meta.db_table} WHERE upload_id = %s",
+                [upload.id]
+            )
+            return cursor.rowcount
+
+
+def publish_upload(upload):
+    """Add an approved upload's normalized output to the corpus"""
+    if not upload.output_file or not os.path.exists(upload.output_file.path):
+        ProcessingLog.objects.create(
+            upload=upload,
+            log_type='warning',
+            message='Approved without a normalized output; nothing added to the corpus'
+        )
+        return
+    with transaction.atomic():
+        # Withdraw rollup counts for any records being replaced before reloading
+        update_rollups(upload, -1)
+        requester_clusters = RequesterResolver().resolve_upload(upload)
+        RecordLoader().load(upload, requester_clusters)
+        update_rollups(upload, 1)
+        DuplicateIndex().index_upload(upload)
+        # The partition file can't roll back, so only write it once the rows are committed
+        transaction.on_commit(lambda: CorpusStore().add_upload(upload))
+
+
+def retract_upload(upload):
+    """Remove an upload's rows from the corpus after rejection or before reprocessing"""
+    with transaction.atomic():
+        update_rollups(upload, -1)
+        removed_records = RecordLoader.clear(upload)
+        transaction.on_commit(lambda: _remove_partition(upload, removed_records))
+
+
+def _remove_partition(upload, removed_records):
+    if CorpusStore().remove_upload(upload) or removed_records:
+        ProcessingLog.objects.create(
+            upload=upload,
+            log_type='info',
+            message='Removed rows from the corpus'
+        )
@@ -0,0 +1,209 @@
+import numpy as np
+from django.db import connection, transaction
+
+from .bulk import insert_rows
+from .models import NormalizedRecord, ProcessingLog, RecordBucket, RecordFingerprint
+
+
+class DuplicateIndex:
+    """MinHash/LSH index for spotting the same request across logs.
+
+    Each record's subject and requester are normalized and cut into
+    character shingles; a MinHash signature of ``num_perm`` values estimates
+    Jaccard similarity between records. The signature is split into
+    ``bands`` bands, and each band is hashed to a bucket key stored in an
+    indexed table, so finding candidates is a handful of index lookups
+    instead of comparing against every other record. With 8 bands of 8 rows
+    pairs above roughly 0.75 similarity are very likely to share a bucket.
+    """
+    num_perm = 64
+    bands = 8
+    shingle_size = 5
+    chunk_size = 5000
+    # Candidates read from one bucket when looking up a record's duplicates
+    max_bucket_candidates = 200
+    prime = np.uint64((1 << 31) - 1)
+
+    def __init__(self):
+        rng = np.random.default_rng(20240601)
+        self.a = rng.integers(1, int(self.prime), size=self.num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(self.prime), size=self.num_perm, dtype=np.uint64)
+        self.band_multipliers = rng.integers(1, 1 << 62, size=self.num_perm // self.bands, dtype=np.uint64) | np.uint64(1)
+        self.rows_per_band = self.num_perm // self.bands
+
+    @staticmethod
+    def normalize_text(subject, requester):
+        text = f'{subject} {requester}'.lower()
+        return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+    def shingle_hashes(self, texts):
+        """Hash every character shingle of every text in one vectorized pass.
+
+        Returns (hashes, owners): the 32-bit shingle hashes and, for each, the
+        index of the text it came from. Texts shorter than a shingle
+        contribute a single hash of the whole text.
+        """
+        encoded = [text.encode('utf-8') for text in texts]
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        size = self.shingle_size
+        gram_counts = np.maximum(lengths - size + 1, 1)
+        owners = np.repeat(np.arange(len(texts)), gram_counts)
+        offsets = np.arange(len(owners)) - np.repeat(np.cumsum(gram_counts) - gram_counts, gram_counts)
+        positions = np.repeat(starts, gram_counts) + offsets
+
+        hashes = np.zeros(len(owners), dtype=np.uint64)
+        padded = np.concatenate((data, np.zeros(size, dtype=np.uint64)))
+        for k in range(size):
+            # Short texts hash only their own bytes (zero-padded past the end)
+            in_text = offsets + k < np.repeat(lengths, gram_counts)
+            hashes = (hashes * np.uint64(257) + np.where(in_text, padded[positions + k], 0)) & np.uint64(0xFFFFFFFF)
+        return hashes, owners
+
+    def signatures(self, texts):
+        """MinHash signatures (len(texts) x num_perm) for a batch of texts"""
+        hashes, owners = self.shingle_hashes(texts)
+        hashes %= self.prime
+        boundaries = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for i in range(self.num_perm):
+            permuted = (self.a[i] * hashes + self.b[i]) % self.prime
+            signatures[:, i] = np.minimum.reduceat(permuted, boundaries)
+        return signatures
+
+    def band_keys(self, signatures):
+        """One signed 64-bit bucket key per band per signature (band index mixed in)"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band)
+        keys = (bands * self.band_multipliers).sum(axis=2, dtype=np.uint64)
+        keys = keys * np.uint64(31) + np.arange(self.bands, dtype=np.uint64)
+        return keys.view(np.int64)
+
+    def index_upload(self, upload):
+        """Fingerprint and bucket every record of an upload"""
+        records = (
+            NormalizedRecord.objects
+            .filter(upload=upload)
+            .order_by('id')
+            .values_list('id', 'subject', 'requester')
+        )
+        indexed = 0
+        with transaction.atomic():
+            batch = []
+            for row in records.iterator(chunk_size=self.chunk_size):
+                batch.append(row)
+                if len(batch) >= self.chunk_size:
+                    indexed += self._index_batch(upload, batch)
+                    batch = []
+            if batch:
+                indexed += self._index_batch(upload, batch)
+
+        ProcessingLog.objects.create(
+            upload=upload,
+            log_type='info',
+            message=f'Indexed {indexed} records for duplicate detection'
+        )
+        return indexed
+
+    def _index_batch(self, upload, batch):
+        ids, texts = [], []
+        for record_id, subject, requester in batch:
+            text = self.normalize_text(subject, requester)
+            if text:
+                ids.append(record_id)
+                texts.append(text)
+        if not ids:
+            return 0
+
+        signatures = self.signatures(texts)
+        keys = self.band_keys(signatures)
+        insert_rows(
+            RecordFingerprint,
+            ['record_id', 'upload_id', 'minhash'],
+            [(record_id, upload.id, signatures[i].astype('<u4').tobytes()) for i, record_id in enumerate(ids)]
+        )
+        insert_rows(
+            RecordBucket,
+            ['record_id', 'upload_id', 'bucket'],
+            [(record_id, upload.id, int(key)) for i, record_id in enumerate(ids) for key in keys[i]]
+        )
+        return len(ids)
+
+    @staticmethod
+    def clear(upload):
+        RecordBucket.objects.filter(upload=upload).delete()
+        RecordFingerprint.objects.filter(upload=upload).delete()
+
+    @staticmethod
+    def similarity(left, right):
+        return float(np.mean(np.frombuffer(bytes(left), dtype='<u4') == np.frombuffer(bytes(right), dtype='<u4')))
+
+    def likely_duplicates(self, record, threshold=0.6, limit=25):
+        """Records elsewhere in the corpus that are probably the same request.
+
+        At most ``max_bucket_candidates`` records are taken from each of the
+        record's buckets, so a text repeated thousands of times ("Incident
+        Report") costs the same as any other.
+        """
+        fingerprint = RecordFingerprint.objects.filter(record=record).first()
+        if fingerprint is None:
+            return []
+
+        candidate_ids = set()
+        for bucket in RecordBucket.objects.filter(record=record).values_list('bucket', flat=True):
+            candidate_ids.update(
+                RecordBucket.objects
+                .filter(bucket=bucket)
+                .exclude(record=record)
+                .order_by('record_id')
+                .values_list('record_id', flat=True)[:self.max_bucket_candidates]
+            )
+        candidates = list(
+            RecordFingerprint.objects.filter(record_id__in=list(candidate_ids)).values_list('record_id', 'minhash')
+        )
+        if not candidates:
+            return []
+
+        signature = np.frombuffer(bytes(fingerprint.minhash), dtype='<u4')
+        signatures = np.frombuffer(b''.join(bytes(minhash) for _, minhash in candidates), dtype='<u4')
+        scores = (signatures.reshape(len(candidates), -1) == signature).mean(axis=1)
+        order = [i for i in np.argsort(-scores, kind='stable') if scores[i] >= threshold][:limit]
+        scored = [(candidates[i][0], float(scores[i])) for i in order]
+
+        records = NormalizedRecord.objects.in_bulk([record_id for record_id, _ in scored])
+        return [(records[record_id], score) for record_id, score in scored if record_id in records]
+
+    def upload_overlap(self, upload):
+        """Other uploads sharing LSH buckets with this one, with candidate record counts.
+
+        A high count relative to the upload's size usually means a duplicate
+        upload, a component/parent agency log, or overlapping fiscal years.
+        Each side is reduced to distinct buckets per upload before the two
+        are joined, so a text repeated throughout one upload doesn't pair
+        every copy with every other.
+        """
+        table = RecordBucket._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH mine AS ("
+                f"  SELECT DISTINCT bucket, record_id FROM {table} WHERE upload_id = %s"
+                f"), shared AS ("
+                f"  SELECT DISTINCT bucket, upload_id FROM {table}"
+                f"  WHERE upload_id <> %s AND bucket IN (SELECT bucket FROM mine)"
+                f"), mine_counts AS ("
+                f"  SELECT shared.upload_id, COUNT(DISTINCT mine.record_id) AS records"
+                f"  FROM shared JOIN mine ON mine.bucket = shared.bucket GROUP BY shared.upload_id"
+                f"), other_counts AS ("
+                f"  SELECT upload_id, COUNT(DISTINCT record_id) AS matching FROM {table}"
+                f"  WHERE upload_id <> %s AND bucket IN (SELECT bucket FROM mine) GROUP BY upload_id"
+                f") "
+                f"SELECT mine_counts.upload_id, records, matching "
+                f"FROM mine_counts JOIN other_counts ON other_counts.upload_id = mine_counts.upload_id "
+                f"ORDER BY records DESC",
+                [upload.id, upload.id, upload.id]
+            )
+            return [
+                {'upload_id': other_upload, 'records': mine_count, 'matching_records': other_count}
+                for other_upload, mine_count, other_count in cursor.fetchall()
+            ]
@@ -0,0 +1,153 @@
+import codecs
+import csv
+import io
+import math
+import re
+from collections import Counter, namedtuple
+
+
+# Bytes read from the start of a CSV to sniff its dialect
+SNIFF_BYTES = 64 * 1024
+# Rows of the prefix searched for the header and used to score delimiters
+HEADER_SEARCH_ROWS = 20
+SNIFF_ROWS = 100
+DELIMITERS = [',', ';', '\t', '|']
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+ENCODING_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+class CsvDialect(namedtuple('CsvDialect', ['encoding', 'delimiter', 'quotechar', 'header_row'])):
+    """How to parse a CSV file: its encoding, delimiter, quote character and
+    the number of title/blank rows above its header."""
+    __slots__ = ()
+
+    def read_options(self):
+        """pd.read_csv keyword arguments for this dialect"""
+        return {
+            'encoding': self.encoding,
+            # Bytes past the sniffed prefix that don't decode become U+FFFD
+            # instead of failing the whole parse
+            'encoding_errors': 'replace',
+            'sep': self.delimiter,
+            'quotechar': self.quotechar,
+            'skiprows': self.header_row or None,
+        }
+
+    def supports(self, engine):
+        """Whether a reader engine parses this dialect correctly"""
+        # pyarrow's skiprows doesn't skip rows above the header reliably
+        return not (engine == 'pyarrow' and self.header_row)
+
+    def __str__(self):
+        return (
+            f'encoding {self.encoding}, delimiter {self.delimiter!r}, quote {self.quotechar!r}, '
+            f'header in row {self.header_row + 1}'
+        )
+
+
+def sniff_encoding(prefix, final=True):
+    """Encoding of a file from its first bytes: a BOM, UTF-16 NUL patterns, valid UTF-8 or cp1252.
+
+    ``final`` is False if the file continues past ``prefix``, so a
+    multi-byte character cut off at the end isn't held against UTF-8.
+    """
+    for bom, encoding in ENCODING_BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    # UTF-16 without a BOM: ASCII text leaves every other byte NUL
+    head = prefix[:4096]
+    if len(head) >= 4:
+        even_nuls = head[0::2].count(0) / len(head[0::2])
+        odd_nuls = head[1::2].count(0) / len(head[1::2])
+        if odd_nuls > 0.4 and even_nuls < 0.1:
+            return 'utf-16-le'
+        if even_nuls > 0.4 and odd_nuls < 0.1:
+            return 'utf-16-be'
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        prefix.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        # cp1252 leaves five bytes undefined; latin-1 decodes anything
+        return 'latin-1'
+
+
+def sniff_delimiter(text):
+    """(delimiter, quote character) that split the sample rows most consistently into 2+ fields"""
+    quotechar = '"'
+    if '"' not in text and re.search(r"(?:^|[,;\t|])'[^'\n]*'(?:[,;\t|]|$)", text, re.MULTILINE):
+        quotechar = "'"
+
+    best, best_score = ',', (False, 0.0, 0)
+    for delimiter in DELIMITERS:
+        rows = [row for row in _rows(text, delimiter, quotechar, SNIFF_ROWS) if row]
+        if not rows:
+            continue
+        widths = Counter(len(row) for row in rows)
+        width, count = widths.most_common(1)[0]
+        # Prefer delimiters giving several fields, then consistent widths, then more fields
+        score = (width > 1, count / len(rows), width)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best, quotechar
+
+
+def sniff_header_row(text, delimiter, quotechar):
+    """Number of title, note and blank rows above the header.
+
+    The header is the first row filling nearly as many cells as the widest
+    of the leading rows; titles ("Calendar Year 2017 FOIA Log,,,") and
+    group bands over the header fill far fewer.
+    """
+    rows = _rows(text, delimiter, quotechar, HEADER_SEARCH_ROWS)
+    filled = [sum(1 for cell in row if cell.strip()) for row in rows]
+    widest = max(filled, default=0)
+    if widest < 2:
+        return 0
+    needed = max(2, math.ceil(0.8 * widest))
+    return next(i for i, count in enumerate(filled) if count >= needed)
+
+
+def _rows(text, delimiter, quotechar, limit):
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter, quotechar=quotechar)
+    rows = []
+    try:
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= limit:
+                break
+    except csv.Error:
+        pass
+    return rows
+
+
+def sniff_csv(file_path):
+    """CsvDialect of a CSV file, sniffed from its first SNIFF_BYTES bytes.
+
+    The prefix is read once; the file itself is then parsed a single time
+    with the dialect's read_options().
+    """
+    with open(file_path, 'rb') as f:
+        prefix = f.read(SNIFF_BYTES)
+    truncated = len(prefix) == SNIFF_BYTES
+
+    encoding = sniff_encoding(prefix, final=not truncated)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(prefix, final=not truncated)
+    if truncated and '\n' in text:
+        # Drop the partial last line
+        text = text[:text.rindex('\n') + 1]
+
+    delimiter, quotechar = sniff_delimiter(text)
+    return CsvDialect(encoding, delimiter, quotechar, sniff_header_row(text, delimiter, quotechar))
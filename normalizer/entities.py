@@ -0,0 +1,317 @@
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import NormalizedRecord, ProcessingLog, RequesterAlias, RequesterCluster
+
+
+PARENTHETICAL_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+NON_WORD_RE = re.compile(r'[^a-z0-9 ]+')
+
+NAME_AFFIXES = {
+    'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'esq', 'jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'md',
+}
+# Values agencies put in the requester column instead of a name
+PLACEHOLDER_NAMES = {
+    'redacted', 'withheld', 'unknown', 'anonymous', 'none', 'na', 'n a', 'not applicable',
+    'privacy', 'b6', 'b 6', 'b6 b7c', 'b 6 b 7 c', 'requester', 'self',
+}
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def normalize_name(raw):
+    """Canonical lowercase form of a requester name, or '' if it isn't one.
+
+    Drops parentheticals ("J. Smith (MuckRock)"), titles and suffixes and
+    punctuation, and turns "Smith, John" into "john smith".
+    """
+    text = PARENTHETICAL_RE.sub(' ', str(raw or '')).lower()
+    parts = []
+    for part in text.split(','):
+        tokens = [t for t in NON_WORD_RE.sub(' ', part.replace('.', ' ')).split() if t not in NAME_AFFIXES]
+        if tokens:
+            parts.append(tokens)
+    if len(parts) == 2:
+        parts.reverse()
+    tokens = [token for part in parts for token in part]
+    name = ' '.join(tokens)
+    if name in PLACEHOLDER_NAMES or not any(ch.isalpha() for ch in name):
+        return ''
+    return name
+
+
+def soundex(word):
+    letters = [ch for ch in word if ch.isalpha()]
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for ch in letters[1:]:
+        digit = SOUNDEX_CODES.get(ch, '')
+        if digit and digit != previous:
+            code += digit
+        if ch not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def blocking_keys(name):
+    """(phonetic_key, token_key) used to find candidate matches for a name"""
+    tokens = name.split()
+    phonetic = soundex(tokens[-1]) + tokens[0][0] if tokens else ''
+    return phonetic, ' '.join(sorted(tokens))
+
+
+class RequesterResolver:
+    """Incremental entity resolution for requester names.
+
+    Each distinct name is normalized and given two blocking keys: the
+    soundex of the surname plus the first initial, and the sorted name
+    tokens. Only names sharing a key are ever compared, so resolving an
+    upload costs a few indexed alias lookups plus the pairs inside its
+    blocks rather than every pair in the corpus. Candidate pairs are scored
+    together with pandas joins over character trigrams (cosine similarity),
+    with "J. Smith" / "John Smith" style initials scored as a near match.
+
+    Names already seen keep their alias, and existing clusters are never
+    merged with each other, so cluster ids stay stable as new uploads are
+    approved. New names either join the cluster they match or form a new one.
+    """
+    threshold = 0.7
+    initial_score = 0.85
+    lookup_batch = 500
+
+    def resolve_upload(self, upload):
+        """Resolve the requester names in an upload's output; returns {requester: cluster id}"""
+        max_length = NormalizedRecord._meta.get_field('requester').max_length
+        counts = Counter()
+        reader = pd.read_csv(
+            upload.output_file.path,
+            dtype=str,
+            keep_default_na=False,
+            usecols=lambda column: column == 'requester',
+            chunksize=50000
+        )
+        for chunk in reader:
+            if 'requester' in chunk.columns:
+                # Match the values RecordLoader stores
+                counts.update(chunk['requester'].str.strip().str.slice(0, max_length).value_counts().to_dict())
+
+        clusters, created = self.resolve(counts)
+        if clusters:
+            ProcessingLog.objects.create(
+                upload=upload,
+                log_type='info',
+                message=f'Resolved {len(clusters)} requester names ({created} new requester clusters)'
+            )
+        return clusters
+
+    def resolve(self, counts):
+        """Attach raw names (with record counts) to clusters.
+
+        Returns ({raw name: cluster id}, number of clusters created).
+        """
+        normalized = {}
+        for raw in counts:
+            name = normalize_name(raw)
+            if name:
+                normalized[raw] = name[:500]
+        if not normalized:
+            return {}, 0
+
+        names = set(normalized.values())
+        known = self._aliases(normalized_name__in=names)
+        new_names = sorted(names - set(known['name']))
+
+        created = 0
+        if new_names:
+            name_counts = Counter()
+            for raw, name in normalized.items():
+                name_counts[name] += counts[raw]
+            canonical = {}
+            for raw, name in normalized.items():
+                if name not in canonical or counts[raw] > counts[canonical[name]]:
+                    canonical[name] = raw
+            created = self._attach(new_names, name_counts, canonical)
+
+        aliases = self._aliases(normalized_name__in=names)
+        cluster_ids = dict(zip(aliases['name'], aliases['cluster']))
+        return {raw: cluster_ids[name] for raw, name in normalized.items() if name in cluster_ids}, created
+
+    def _aliases(self, **lookup):
+        """Existing aliases as a frame, querying the ``__in`` lookup in batches"""
+        (key, values), = lookup.items()
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), self.lookup_batch):
+            rows.extend(
+                RequesterAlias.objects
+                .filter(**{key: values[start:start + self.lookup_batch]})
+                .values_list('normalized_name', 'cluster_id', 'phonetic_key', 'token_key')
+            )
+        return pd.DataFrame(rows, columns=['name', 'cluster', 'phonetic', 'tokens']).drop_duplicates('name')
+
+    def _attach(self, new_names, name_counts, canonical):
+        keys = [blocking_keys(name) for name in new_names]
+        new = pd.DataFrame({
+            'name': new_names,
+            'cluster': pd.Series([None] * len(new_names), dtype=object),
+            'phonetic': [phonetic for phonetic, _ in keys],
+            'tokens': [tokens for _, tokens in keys],
+        })
+        neighbours = pd.concat([
+            self._aliases(phonetic_key__in=set(new['phonetic'])),
+            self._aliases(token_key__in=set(new['tokens'])),
+        ]).drop_duplicates('name')
+
+        names = pd.concat([new, neighbours], ignore_index=True)
+        names['cluster'] = names['cluster'].astype(object)
+        pairs = self._candidate_pairs(names, len(new))
+        if len(pairs):
+            pairs['score'], pairs['general'] = self._score(names, pairs)
+            pairs = pairs[pairs['score'] >= self.threshold]
+            pairs = self._drop_ambiguous(pairs, new_count=len(new)).sort_values('score', ascending=False)
+
+        # Union-find over the matches; a component may absorb at most one existing cluster
+        parent = list(range(len(names)))
+        component_cluster = names['cluster'].tolist()
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for left, right in zip(pairs['left'], pairs['right']) if len(pairs) else ():
+            left, right = find(left), find(right)
+            if left == right:
+                continue
+            if component_cluster[left] is not None and component_cluster[right] is not None:
+                continue
+            parent[right] = left
+            if component_cluster[left] is None:
+                component_cluster[left] = component_cluster[right]
+
+        members = {}
+        for i in range(len(new)):
+            members.setdefault(find(i), []).append(i)
+
+        with transaction.atomic():
+            unclustered = [root for root in members if component_cluster[root] is None]
+            clusters = RequesterCluster.objects.bulk_create([
+                RequesterCluster(canonical_name=canonical[max(
+                    (new_names[i] for i in members[root]), key=lambda name: name_counts[name]
+                )][:500])
+                for root in unclustered
+            ])
+            for root, cluster in zip(unclustered, clusters):
+                component_cluster[root] = cluster.id
+
+            RequesterAlias.objects.bulk_create(
+                [
+                    RequesterAlias(
+                        normalized_name=names.at[i, 'name'],
+                        cluster_id=component_cluster[root],
+                        phonetic_key=names.at[i, 'phonetic'],
+                        token_key=names.at[i, 'tokens'][:500],
+                    )
+                    for root, indexes in members.items()
+                    for i in indexes
+                ],
+                batch_size=self.lookup_batch,
+                ignore_conflicts=True
+            )
+        return len(clusters)
+
+    @staticmethod
+    def _candidate_pairs(names, new_count):
+        """(left, right) index pairs sharing a blocking key where left is a new name"""
+        frame = names[['phonetic', 'tokens']].reset_index().rename(columns={'index': 'row'})
+        new = frame[frame['row'] < new_count]
+        pairs = pd.concat([
+            new.merge(frame, on=key, suffixes=('_left', '_right'))[['row_left', 'row_right']]
+            for key in ('phonetic', 'tokens')
+        ])
+        pairs.columns = ['left', 'right']
+        # Each new/new pair once; new/existing pairs always
+        keep = (pairs['right'] >= new_count) | (pairs['left'] < pairs['right'])
+        return pairs[keep].drop_duplicates().reset_index(drop=True)
+
+    @staticmethod
+    def _drop_ambiguous(pairs, new_count):
+        """Drop initial-based matches that could belong to more than one person.
+
+        "j smith" may be John or Jane: if a general name matches several
+        specific ones it is left on its own. An existing general name never
+        pulls a new specific name into its cluster, since it may already
+        stand for someone else.
+        """
+        initial = pairs['general'] >= 0
+        specific = np.where(pairs['general'] == pairs['left'], pairs['right'], pairs['left'])
+        matches = pd.Series(specific[initial]).groupby(pairs['general'][initial].to_numpy()).nunique()
+        ambiguous = pairs['general'].isin(matches.index[matches > 1])
+        existing_general = (pairs['general'] >= new_count) & (specific < new_count)
+        return pairs[~(initial & (ambiguous | existing_general))]
+
+    def _score(self, names, pairs):
+        """Score candidate pairs; returns (scores, general) arrays.
+
+        The trigram cosine similarity of every pair is computed at once with
+        joins over the names' trigrams. It is then checked against the
+        tokens the two names don't share, so that long names differing in one
+        telling word ("... Tulsa District" / "... Omaha District") don't
+        match. ``general`` is the row of the less specific name when a match
+        rests on an initial ("j smith" / "john smith"), else -1.
+        """
+        grams = pd.DataFrame(
+            [(i, gram) for i, name in enumerate(names['name']) for gram in self._trigrams(name)],
+            columns=['row', 'gram']
+        )
+        sizes = grams.groupby('row').size()
+        shared = (
+            pairs.merge(grams, left_on='left', right_on='row')
+            .merge(grams, left_on=['right', 'gram'], right_on=['row', 'gram'])
+            .groupby(['left', 'right']).size()
+        )
+        shared = shared.reindex(pd.MultiIndex.from_frame(pairs[['left', 'right']]), fill_value=0).to_numpy()
+        left_sizes = sizes.reindex(pairs['left']).to_numpy()
+        right_sizes = sizes.reindex(pairs['right']).to_numpy()
+        cosines = shared / np.sqrt(left_sizes * right_sizes)
+
+        token_sets = [frozenset(name.split()) for name in names['name']]
+        scores = np.zeros(len(pairs))
+        general = np.full(len(pairs), -1, dtype=np.int64)
+        for k, (left, right) in enumerate(zip(pairs['left'], pairs['right'])):
+            only_left = token_sets[left] - token_sets[right]
+            only_right = token_sets[right] - token_sets[left]
+            if not only_left and not only_right:
+                scores[k] = 1.0
+            elif not only_left or not only_right:
+                # One name adds only initials ("jane smith" / "jane q smith")
+                extra = only_left or only_right
+                if all(len(token) == 1 for token in extra):
+                    scores[k] = max(cosines[k], self.initial_score)
+                    general[k] = left if not only_left else right
+            elif len(only_left) == 1 and len(only_right) == 1:
+                (a,), (b,) = only_left, only_right
+                if a[0] != b[0]:
+                    continue
+                if len(a) == 1 or len(b) == 1:
+                    scores[k] = self.initial_score
+                    general[k] = left if len(a) == 1 else right
+                elif soundex(a) == soundex(b):
+                    # Spelling variants ("jon" / "john")
+                    scores[k] = cosines[k]
+        return scores, general
+
+    @staticmethod
+    def _trigrams(name):
+        padded = f'  {name} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,175 @@
+import csv
+import datetime
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .agencies import resolve_agency
+from .models import NormalizedRecord
+from .streaming import StreamBuffer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - Parquet export is optional
+    pa = None
+    pq = None
+
+
+EXPORT_FIELDS = [
+    'id', 'upload_id', 'row_number', 'agency', 'canonical_agency_id', 'request_id',
+    'requester', 'requester_organization', 'requester_cluster_id', 'subject',
+    'date_requested', 'date_perfected', 'date_completed', 'status', 'exemptions_cited',
+    'fee_category', 'fee_waiver', 'fees_charged', 'processed_under_privacy_act',
+]
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(ValueError):
+    """Raised for filters that can't be applied"""
+
+
+class RecordExport:
+    """Filtered export of approved NormalizedRecord rows in constant memory.
+
+    Rows are read in keyset chunks (``id > last id ORDER BY id LIMIT n``),
+    so every query is an index range scan whatever the offset, and each
+    chunk is serialized and handed to the response before the next is read.
+    """
+    chunk_size = 5000
+
+    def __init__(self, params):
+        self.queryset = self.filter(params)
+
+    @staticmethod
+    def _int(params, name):
+        value = params.get(name, '').strip()
+        if not value:
+            return None
+        if not value.isdigit():
+            raise ExportError(f'{name} must be a number')
+        return int(value)
+
+    @staticmethod
+    def _date(params, name):
+        value = params.get(name, '').strip()
+        if not value:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise ExportError(f'{name} must be a date (YYYY-MM-DD)')
+
+    def filter(self, params):
+        """Queryset for agency, agency_id, status, year, start/end (date requested), upload and requester filters"""
+        records = NormalizedRecord.objects.filter(upload__submission_status='approved')
+
+        agency_id = self._int(params, 'agency_id')
+        agency = params.get('agency', '').strip()
+        if agency_id:
+            records = records.filter(canonical_agency_id=agency_id)
+        elif agency:
+            canonical = resolve_agency(agency)
+            records = records.filter(canonical_agency=canonical) if canonical else records.filter(agency=agency)
+
+        statuses = [s.strip() for s in ','.join(params.getlist('status')).split(',') if s.strip()]
+        if statuses:
+            records = records.filter(status__in=statuses)
+
+        year = self._int(params, 'year')
+        if year:
+            if not 1900 <= year <= 2100:
+                raise ExportError('year is out of range')
+            records = records.filter(
+                date_requested__gte=datetime.date(year, 1, 1),
+                date_requested__lt=datetime.date(year + 1, 1, 1)
+            )
+        start = self._date(params, 'start')
+        if start:
+            records = records.filter(date_requested__gte=start)
+        end = self._date(params, 'end')
+        if end:
+            records = records.filter(date_requested__lte=end)
+
+        upload_id = self._int(params, 'upload')
+        if upload_id:
+            records = records.filter(upload_id=upload_id)
+        requester = self._int(params, 'requester_cluster')
+        if requester:
+            records = records.filter(requester_cluster_id=requester)
+        return records
+
+    def iter_chunks(self):
+        """Yield lists of row tuples (EXPORT_FIELDS order), one keyset chunk at a time"""
+        last_id = 0
+        while True:
+            rows = list(
+                self.queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list(*EXPORT_FIELDS)[:self.chunk_size]
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+            if len(rows) < self.chunk_size:
+                return
+
+    def iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for rows in self.iter_chunks():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    def iter_jsonl(self):
+        for rows in self.iter_chunks():
+            yield ''.join(
+                json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+                for row in rows
+            ).encode('utf-8')
+
+    def parquet_schema(self):
+        types = {
+            'id': pa.int64(), 'upload_id': pa.int64(), 'row_number': pa.int64(),
+            'canonical_agency_id': pa.int64(), 'requester_cluster_id': pa.int64(),
+            'date_requested': pa.date32(), 'date_perfected': pa.date32(), 'date_completed': pa.date32(),
+            'fees_charged': pa.decimal128(14, 2),
+        }
+        return pa.schema(
+            [pa.field(name, types.get(name, pa.string())) for name in EXPORT_FIELDS],
+            metadata={b'sflf_version': b'1.5.0'}
+        )
+
+    def iter_parquet(self):
+        """Parquet file written one row group per chunk into a drained buffer"""
+        schema = self.parquet_schema()
+        buffer = StreamBuffer()
+        writer = pq.ParquetWriter(buffer, schema, compression='zstd')
+        for rows in self.iter_chunks():
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield buffer.pop()
+        writer.close()
+        yield buffer.pop()
+
+    def stream(self, export_format):
+        if export_format == 'parquet':
+            if pa is None:
+                raise ExportError('Parquet export requires pyarrow')
+            return self.iter_parquet()
+        if export_format == 'jsonl':
+            return self.iter_jsonl()
+        return self.iter_csv()
@@ -30,7 +30,9 @@ class FileUploadForm(forms.ModelForm):
             }),
             'agency': forms.TextInput(attrs={
                 'class': 'form-control',
-                'placeholder': 'e.g., FBI, Federal or City of Portland, Oregon'
+                'placeholder': 'e.g., FBI, Federal or City of Portland, Oregon',
+                'list': 'agency-options',
+                'autocomplete': 'off'
             }),
             'time_period_start': forms.DateInput(attrs={
                 'class': 'form-control',
@@ -0,0 +1,201 @@
+import time
+from collections import deque, namedtuple
+
+from django.db.models import Count, Max
+
+from .models import ColumnSynonym, StatusSynonym
+
+
+# Header keywords per SFLF field; on equal scores the earlier field wins
+COLUMN_KEYWORDS = {
+    'request id': ['id', 'number', 'tracking', 'control', 'case', 'ref'],
+    'requester': ['name', 'requester', 'requestor', 'from', 'who'],
+    'requester organization': ['org', 'company', 'affiliation', 'entity'],
+    'subject': ['subject', 'description', 'request', 'topic', 'about'],
+    'date requested': ['requested', 'received', 'submitted', 'date_req'],
+    'date perfected': ['perfected', 'complete', 'perfection'],
+    'date completed': ['completed', 'closed', 'resolved', 'finished'],
+    'status': ['status', 'state', 'disposition', 'outcome'],
+    'exemptions cited': ['exemption', 'withhold', 'redact', 'b('],
+    'fee category': ['fee_cat', 'category', 'fee_type'],
+    'fee waiver': ['waiver', 'fee_waiv', 'discount'],
+    'fees charged': ['fee', 'cost', 'charge', 'amount', 'paid'],
+    'processed under privacy act': ['privacy', 'privacy_act'],
+}
+
+# Status value keywords per SFLF status, in the same priority order
+STATUS_KEYWORDS = {
+    'processed': ['processing', 'in process', 'pending', 'open', 'active'],
+    'appealing': ['appeal', 'appealed', 'under appeal'],
+    'fix': ['fix', 'clarification', 'need info', 'incomplete'],
+    'payment': ['payment', 'fee', 'invoice', 'billing'],
+    'lawsuit': ['lawsuit', 'litigation', 'court', 'legal'],
+    'rejected': ['rejected', 'denied', 'reject', 'denial'],
+    'no_docs': ['no docs', 'no records', 'no responsive', 'nothing found'],
+    'done': ['done', 'complete', 'closed', 'fulfilled'],
+    'partial': ['partial', 'partially', 'some records'],
+    'abandoned': ['abandoned', 'withdrawn', 'cancelled', 'closed by requester'],
+}
+
+# Confidence of a match: (whole input, part of the input)
+KEYWORD_SCORES = (0.9, 0.7)
+SYNONYM_SCORES = (1.0, 0.8)
+
+KeywordRule = namedtuple('KeywordRule', ['phrase', 'target', 'priority', 'method'])
+KeywordHit = namedtuple('KeywordHit', ['target', 'phrase', 'start', 'score', 'priority', 'method'])
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over a list of phrases.
+
+    States are dicts of character transitions; each state's failure link
+    points to the longest proper suffix that is also a phrase prefix, and
+    its output lists every phrase ending there. Scanning a text is a single
+    pass whatever the number of phrases.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append(index)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """(start, phrase index) of every phrase occurrence in ``text``"""
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for index in self.output[state]:
+                yield end - len(self.phrases[index]), index
+
+
+class KeywordMatcher:
+    """Keyword rules and synonym phrases compiled into one automaton.
+
+    Keyword rules match anywhere in the input, as substrings. Synonyms
+    match the whole input, or, if they are several words long, whole words
+    inside it ("final disposition (fy19)"). A hit covering the whole input scores
+    higher than one inside it, and hits are ranked by score, then phrase
+    length (longest match), then rule priority.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.automaton = AhoCorasick(rule.phrase for rule in self.rules)
+
+    @classmethod
+    def compile(cls, keywords, synonyms=()):
+        """Matcher for a {target: [keyword]} dict plus (phrase, target) synonym pairs"""
+        rules = [
+            KeywordRule(keyword, target, priority, 'keyword')
+            for priority, (target, words) in enumerate(keywords.items())
+            for keyword in words
+        ]
+        rules.extend(
+            KeywordRule(phrase, target, len(keywords), 'synonym')
+            for phrase, target in synonyms
+            if phrase
+        )
+        return cls(rules)
+
+    def hits(self, text):
+        """Every rule matching ``text`` (already lowercased and stripped), best first"""
+        hits = []
+        for start, index in self.automaton.find(text):
+            rule = self.rules[index]
+            end = start + len(rule.phrase)
+            whole = start == 0 and end == len(text)
+            if rule.method == 'synonym':
+                if not whole and (
+                    ' ' not in rule.phrase
+                    or (start and text[start - 1].isalnum())
+                    or (end < len(text) and text[end].isalnum())
+                ):
+                    continue
+                score = SYNONYM_SCORES[0 if whole else 1]
+            else:
+                score = KEYWORD_SCORES[0 if whole else 1]
+            hits.append(KeywordHit(rule.target, rule.phrase, start, score, rule.priority, rule.method))
+        hits.sort(key=lambda hit: (-hit.score, -len(hit.phrase), hit.priority))
+        return hits
+
+    def best(self, text):
+        """The best hit for ``text``, or None"""
+        hits = self.hits(text)
+        return hits[0] if hits else None
+
+    def target_scores(self, text):
+        """{target: best hit} for ``text``"""
+        best = {}
+        for hit in self.hits(text):
+            best.setdefault(hit.target, hit)
+        return best
+
+
+def synonym_version():
+    """Changes whenever a column or status synonym is added, edited or removed"""
+    return tuple(
+        value
+        for model in (ColumnSynonym, StatusSynonym)
+        for value in model.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values()
+    )
+
+
+# Seconds between synonym_version() checks; the synonym signals force one sooner
+MATCHERS_VERSION_TTL = 5
+
+_matchers = None
+_matchers_version = None
+_matchers_checked_at = 0.0
+
+
+def keyword_matchers():
+    """(column matcher, status matcher), recompiled when the synonyms change.
+
+    The synonym version is checked at most every MATCHERS_VERSION_TTL
+    seconds, so most calls are a clock read.
+    """
+    global _matchers, _matchers_version, _matchers_checked_at
+    now = time.monotonic()
+    if _matchers is not None and now - _matchers_checked_at < MATCHERS_VERSION_TTL:
+        return _matchers
+    version = synonym_version()
+    if version != _matchers_version or _matchers is None:
+        column_synonyms = ColumnSynonym.objects.values_list('synonym', 'standard_name')
+        status_synonyms = StatusSynonym.objects.values_list('synonym', 'standard_status')
+        _matchers = (
+            KeywordMatcher.compile(COLUMN_KEYWORDS, ((s.lower().strip(), name) for s, name in column_synonyms)),
+            KeywordMatcher.compile(STATUS_KEYWORDS, ((s.lower().strip(), status) for s, status in status_synonyms)),
+        )
+        _matchers_version = version
+    _matchers_checked_at = now
+    return _matchers
+
+
+def expire_keyword_matchers():
+    """Check the synonym version on the next keyword_matchers() call"""
+    global _matchers_checked_at
+    _matchers_checked_at = 0.0
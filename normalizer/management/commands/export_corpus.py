@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from normalizer.corpus import CorpusStore
+import gzip
+
+
+class Command(BaseCommand):
+    help = 'Export the merged corpus of approved normalized logs as one CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            type=str,
+            help='Path of the CSV to write (a .gz suffix writes it gzip-compressed)',
+        )
+        parser.add_argument(
+            '--agency',
+            type=str,
+            help='Only export partitions for this agency',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        store = CorpusStore()
+        partitions = store.partitions(options.get('agency'))
+        
+        opener = gzip.open if output.endswith('.gz') else open
+        with opener(output, 'wb') as f:
+            for chunk in store.iter_csv(options.get('agency')):
+                f.write(chunk)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {len(partitions)} corpus partitions to {output}')
+        )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import transaction
+from normalizer.agencies import load_agency_directory, resolve_agency
+from normalizer.analytics import update_rollups
+from normalizer.models import FOIAUpload, NormalizedRecord, TurnaroundSketch
+import os
+
+
+class Command(BaseCommand):
+    help = 'Load canonical agencies from the FOIA Logs directory ("<id> <name>" folders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logs-path',
+            type=str,
+            help='Path to the FOIA Logs directory',
+        )
+        parser.add_argument(
+            '--resolve-uploads',
+            action='store_true',
+            help='Also link existing uploads to their canonical agency',
+        )
+
+    def handle(self, *args, **options):
+        logs_path = options.get('logs_path') or os.path.join(settings.BASE_DIR, 'FOIA Logs')
+
+        if not os.path.isdir(logs_path):
+            self.stdout.write(self.style.WARNING(f'FOIA Logs directory not found: {logs_path}'))
+            return
+
+        created, updated = load_agency_directory(logs_path)
+        self.stdout.write(
+            self.style.SUCCESS(f'Loaded {created} new agencies and updated {updated} from {logs_path}')
+        )
+
+        if options['resolve_uploads']:
+            resolved = 0
+            for upload in FOIAUpload.objects.filter(canonical_agency__isnull=True).exclude(agency=''):
+                agency = resolve_agency(upload.agency)
+                if agency:
+                    self.link_upload(upload, agency)
+                    resolved += 1
+            self.stdout.write(self.style.SUCCESS(f'Linked {resolved} uploads to canonical agencies'))
+
+    @staticmethod
+    def link_upload(upload, agency):
+        """Link an upload, its loaded records and its sketches to an agency, moving its rollup counts along"""
+        with transaction.atomic():
+            update_rollups(upload, -1)
+            upload.canonical_agency = agency
+            upload.save(update_fields=['canonical_agency'])
+            NormalizedRecord.objects.filter(upload=upload).update(canonical_agency=agency)
+            TurnaroundSketch.objects.filter(upload=upload).update(canonical_agency=agency)
+            update_rollups(upload, 1)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from normalizer.models import ColumnSynonym, StatusSynonym
+from normalizer.models import ColumnSynonym, StatusSynonym, FOIAUpload
+from normalizer.renormalize import process_stale_uploads
 from normalizer.utils import SynonymLoader
 import os
 
@@ -19,6 +20,11 @@ class Command(BaseCommand):
             type=str,
             help='Path to status_synonyms.txt file',
         )
+        parser.add_argument(
+            '--no-renormalize',
+            action='store_true',
+            help='Only queue affected uploads; leave re-normalizing them to renormalize_uploads',
+        )
 
     def handle(self, *args, **options):
         # Default paths - look in the parent directory of the Django project
@@ -57,4 +63,14 @@ class Command(BaseCommand):
                 self.style.WARNING(f'Status synonyms file not found: {status_synonyms_path}')
             )
         
-        self.stdout.write(self.style.SUCCESS('Synonym loading complete!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Synonym loading complete!'))
+        
+        queued = FOIAUpload.objects.filter(renormalize_requested_at__isnull=False).count()
+        if queued and options['no_renormalize']:
+            self.stdout.write(f'{queued} uploads queued for re-normalization')
+        elif queued:
+            self.stdout.write(f'Re-normalizing {queued} uploads affected by the new synonyms...')
+            succeeded, failed = process_stale_uploads()
+            self.stdout.write(self.style.SUCCESS(f'Re-normalized {succeeded} uploads'))
+            if failed:
+                self.stdout.write(self.style.WARNING(f'{failed} uploads failed and remain queued'))
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from normalizer.renormalize import process_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Re-normalize uploads queued after the synonyms their mappings used changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after this many uploads',
+        )
+
+    def handle(self, *args, **options):
+        succeeded, failed = process_stale_uploads(options.get('limit'))
+        self.stdout.write(self.style.SUCCESS(f'Re-normalized {succeeded} uploads'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} uploads failed and remain queued'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from normalizer.keywords import STATUS_KEYWORDS
+from normalizer.models import StatusMapping, StatusSynonym
+from normalizer.status_classifier import StatusClassifier, status_model_path
+from normalizer.utils import SynonymLoader
+import os
+
+
+class Command(BaseCommand):
+    help = 'Train the status classifier from status synonyms and user-confirmed status mappings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status-synonyms-path',
+            type=str,
+            help='Path to status_synonyms.txt file (in addition to the StatusSynonym table)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Where to write the model (defaults to NORMALIZER_STATUS_MODEL)',
+        )
+
+    def handle(self, *args, **options):
+        status_synonyms_path = options.get('status_synonyms_path') or os.path.join(settings.BASE_DIR, 'status_synonyms.txt')
+        output = options.get('output') or status_model_path()
+
+        examples = []
+        if os.path.exists(status_synonyms_path):
+            examples.extend(
+                (synonym, status) for status, synonym in SynonymLoader.parse_synonym_file(status_synonyms_path)
+            )
+        else:
+            self.stdout.write(self.style.WARNING(f'Status synonyms file not found: {status_synonyms_path}'))
+        examples.extend(StatusSynonym.objects.values_list('synonym', 'standard_status'))
+        examples.extend(
+            StatusMapping.objects.filter(user_confirmed=True).exclude(mapped_status='').values_list('original_status', 'mapped_status')
+        )
+        examples.extend((keyword, status) for status, keywords in STATUS_KEYWORDS.items() for keyword in keywords)
+        examples.extend((status, status) for status in STATUS_KEYWORDS)
+        examples = sorted(set(examples))
+
+        if len({status for _, status in examples}) < 2:
+            self.stdout.write(self.style.ERROR('Need examples of at least two statuses to train'))
+            return
+
+        classifier = StatusClassifier.train(examples)
+        classifier.save(output)
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained on {len(examples)} examples of {len(classifier.classes)} statuses '
+            f'(training accuracy {classifier.accuracy(examples):.0%}); saved to {output}'
+        ))
@@ -0,0 +1,263 @@
+import difflib
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .keywords import keyword_matchers
+from .memo import column_memo
+from .profiles import DATE_FIELDS, ColumnClassifier, profile_columns
+
+
+# Fields several columns may map to. Status columns are combined by
+# priority; requester name parts ("First Name", "Last Name") are joined.
+MULTI_COLUMN_FIELDS = {'status'}
+NAME_PART_FIELD = 'requester'
+MAX_NAME_PARTS = 3
+NAME_PART_RE = re.compile(r'(first|given|middle|last|family|sur)[\s_]*name|\b([flm])_name\b')
+NAME_PART_RANKS = {
+    'first': 0, 'given': 0, 'f': 0,
+    'middle': 1, 'm': 1,
+    'last': 2, 'family': 2, 'sur': 2, 'l': 2,
+}
+
+# Words naming the event each date field records, matched at word starts.
+# A date header naming another field's event and not this one's ("Date
+# Recvd" for date perfected), or an event that is none of them ("Due
+# Date"), isn't matched to the field by keyword or string similarity.
+DATE_ROLE_WORDS = {
+    'date requested': ['request', r'req\b', 'receiv', 'recv', 'rcvd', "rec'd", 'submit'],
+    'date perfected': ['perfect'],
+    'date completed': [
+        'complet', 'close', 'respon', 'resp', 'reply', 'sent', 'determin', 'resolv', 'finish', 'fulfill',
+    ],
+}
+DATE_EXCLUDED_WORDS = ['due', 'deadline', 'destroy', 'archiv', 'payment', 'birth']
+DATE_ROLE_RES = {
+    field: re.compile(r'\b(?:' + '|'.join(words) + ')') for field, words in DATE_ROLE_WORDS.items()
+}
+DATE_EXCLUDED_RE = re.compile(r'\b(?:' + '|'.join(DATE_EXCLUDED_WORDS) + ')')
+
+FORBIDDEN = -1e6
+
+ColumnMatch = namedtuple('ColumnMatch', ['field', 'confidence', 'method', 'candidate', 'synonym'])
+
+
+def name_part_rank(column):
+    """Position of a requester name part column (first, middle, last), or None"""
+    match = NAME_PART_RE.search(str(column).lower())
+    if not match:
+        return None
+    return NAME_PART_RANKS[match.group(1) or match.group(2)]
+
+
+def date_conflicts(column):
+    """Date fields a header contradicts: those whose event it doesn't name
+    while naming another's, or all three for a header naming another kind of date"""
+    name = str(column).lower()
+    if DATE_EXCLUDED_RE.search(name):
+        return set(DATE_FIELDS)
+    named = {field for field, pattern in DATE_ROLE_RES.items() if pattern.search(name)}
+    return set(DATE_FIELDS) - named if named else set()
+
+
+def solve_assignment(scores):
+    """Assign each row to a distinct column maximizing the total score.
+
+    Hungarian algorithm (shortest augmenting paths with potentials) for a
+    rows <= columns matrix; the scans over columns are NumPy operations, so
+    an upload costs O(rows) vector passes. Returns the column of each row.
+    """
+    n, m = np.shape(scores)
+    # 1-based columns; column 0 is the virtual start of each augmenting path
+    cost = np.zeros((n, m + 1))
+    cost[:, 1:] = -np.asarray(scores, dtype=float)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # row[j]: 1-based row assigned to column j (0 = free); row[0] is the row being placed
+    row = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        row[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            free = ~used
+            free[0] = False
+            reduced = cost[row[j0] - 1] - u[row[j0]] - v
+            better = free & (reduced < minv)
+            minv[better] = reduced[better]
+            way[better] = j0
+            j1 = int(np.argmin(np.where(free, minv, np.inf)))
+            delta = minv[j1]
+            u[row[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if row[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            row[j0] = row[j1]
+            j0 = j1
+
+    assignment = np.empty(n, dtype=np.int64)
+    for j in np.flatnonzero(row[1:]) + 1:
+        assignment[row[j] - 1] = j - 1
+    return assignment
+
+
+class ColumnMatcher:
+    """Joint mapping of an upload's header row onto SFLF fields.
+
+    Every column is scored against every field at once: 1.0 for a synonym
+    (0.8 for one inside the header), 0.9/0.7 for an exact/partial header
+    keyword, a scaled string similarity otherwise. Header scores are
+    lowered when the ColumnClassifier finds the values fit another class
+    better, an empty or junk column ('other') included, and a column whose
+    header matches nothing can still be mapped from its values alone, except
+    to a date field; a date header naming another date's event isn't
+    matched to the field (see DATE_ROLE_WORDS). The matrix is then solved
+    as one assignment so each field gets at most one column, except status
+    and requester name parts. A column that only matches fields taken by
+    better columns stays unmapped instead of shadowing them.
+    """
+    content_weight = 0.5
+    min_score = 0.4
+    content_threshold = 0.75
+    content_scale = 0.8
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+
+    def header_scores(self, columns):
+        """(fields, scores, confidence, methods, synonyms) for the column names.
+
+        ``fields`` is the SFLF fields plus any synonym targets outside them;
+        the others are columns x fields arrays. ``scores`` is ``confidence``
+        with a small keyword-order tie-break; ``synonyms`` holds the synonym
+        phrase behind each synonym match.
+        """
+        names = [str(col).lower().strip() for col in columns]
+        fields_key = tuple(self.fields)
+        rows = [column_memo.get_or_compute((fields_key, name), self._header_row) for name in names]
+        targets = {field for row in rows for field, *_ in row}
+        fields = self.fields + sorted(targets - set(self.fields))
+        index = {field: j for j, field in enumerate(fields)}
+        scores = np.zeros((len(names), len(fields)))
+        confidence = np.zeros((len(names), len(fields)))
+        methods = np.full((len(names), len(fields)), '', dtype=object)
+        synonyms = np.full((len(names), len(fields)), '', dtype=object)
+        for i, row in enumerate(rows):
+            for field, score, field_confidence, method, synonym in row:
+                j = index[field]
+                scores[i, j], confidence[i, j], methods[i, j] = score, field_confidence, method
+                synonyms[i, j] = synonym
+        return fields, scores, confidence, methods, synonyms
+
+    @staticmethod
+    def _header_row(key):
+        """((field, score, confidence, method, synonym), ...) for one lowercased header; memoized per process"""
+        fields, name = key
+        row = {}
+        for field in fields:
+            ratio = difflib.SequenceMatcher(None, name, field).ratio()
+            if ratio > 0.6:
+                row[field] = (ratio * 0.8, ratio * 0.8, 'fuzzy', '')
+        column_keywords, _ = keyword_matchers()
+        for target, hit in column_keywords.target_scores(name).items():
+            score = hit.score - hit.priority * 1e-3
+            if score > row.get(target, (0,))[0]:
+                method = 'synonym' if hit.score == 1.0 else hit.method
+                row[target] = (score, hit.score, method, hit.phrase if hit.method == 'synonym' else '')
+        return tuple((field, *values) for field, values in row.items())
+
+    def assign(self, df, fixed=None, profiles=None):
+        """Match the columns of ``df`` not in ``fixed`` ({column: field} already decided).
+
+        ``profiles`` is profile_columns(df), if already computed. Returns
+        {column: ColumnMatch}. ``field`` is None for a column left unmapped;
+        ``candidate`` is then its best field, if it had one. ``synonym`` is
+        the synonym phrase a synonym match was made by, else ''.
+        """
+        fixed = {str(col): field for col, field in (fixed or {}).items()}
+        positions = [i for i, col in enumerate(df.columns) if str(col) not in fixed]
+        if not positions:
+            return {}
+        columns = [df.columns[i] for i in positions]
+
+        fields, header, confidence, methods, synonyms = self.header_scores(columns)
+        if profiles is None:
+            profiles = profile_columns(df)
+        sample = profiles.iloc[positions]
+        classifier = ColumnClassifier()
+        probabilities = classifier.class_probabilities(sample)
+        content = classifier.field_probabilities(sample, fields, probabilities)
+        # How well the values fit each field: its class probability, or for a
+        # field content can't identify, how unlike an empty column they are.
+        # Columns with no values in the sample fit nothing.
+        known = np.array([classifier.content_class(field) is not None for field in fields], dtype=bool)
+        fit = np.where(known, content, 1 - probabilities[:, [classifier.classes.index('other')]])
+        empty = sample['fill_rate'].to_numpy() == 0
+        content[empty] = 0
+        fit[empty] = 0
+        # Penalize a header match by how much less likely the field is than the
+        # likeliest class, 'other' included: a field the values rule out loses
+        # content_weight however unsure the classifier is between the rest
+        relative = np.minimum(fit / probabilities.max(axis=1, keepdims=True), 1)
+        adjusted = header - self.content_weight * (1 - relative)
+        # Values can't tell the three dates apart, so a date field needs a header match
+        dates = np.isin(fields, DATE_FIELDS)
+        content_only = (header == 0) & (content >= self.content_threshold) & ~dates
+        scores = np.where(
+            header > 0,
+            np.where(adjusted >= self.min_score, adjusted, FORBIDDEN),
+            np.where(content_only, content * self.content_scale, FORBIDDEN)
+        )
+        # Synonyms are curated per header, so only keyword and similarity matches are checked
+        index = {field: j for j, field in enumerate(fields)}
+        for i, col in enumerate(columns):
+            for j in (index[field] for field in date_conflicts(col) if field in index):
+                if methods[i, j] != 'synonym':
+                    scores[i, j] = FORBIDDEN
+        confidence = np.where(content_only, content * self.content_scale, confidence)
+        methods = np.where(content_only, 'content', methods)
+
+        name_parts = np.array([name_part_rank(col) is not None for col in columns])
+        taken = pd.Series(list(fixed.values()), dtype=object).value_counts()
+        slot_fields, slot_scores = [], []
+        for j, field in enumerate(fields):
+            if field in MULTI_COLUMN_FIELDS:
+                count = len(columns)
+            elif field == NAME_PART_FIELD:
+                # One slot for a full name column, the rest for name parts
+                if not taken.get(field, 0):
+                    slot_fields.append(j)
+                    slot_scores.append(np.where(name_parts, FORBIDDEN, scores[:, j]))
+                for _ in range(MAX_NAME_PARTS):
+                    slot_fields.append(j)
+                    slot_scores.append(np.where(name_parts, scores[:, j], FORBIDDEN))
+                continue
+            else:
+                count = 0 if taken.get(field, 0) else 1
+            for _ in range(count):
+                slot_fields.append(j)
+                slot_scores.append(scores[:, j])
+        # Leaving a column unmapped scores zero, so it loses to any real match
+        matrix = np.column_stack(slot_scores + [np.zeros(len(columns))] * len(columns))
+
+        assignment = solve_assignment(matrix)
+        best = header.argmax(axis=1)
+        matches = {}
+        for i, col in enumerate(columns):
+            slot = assignment[i]
+            if slot < len(slot_fields) and matrix[i, slot] > FORBIDDEN / 2:
+                j = slot_fields[slot]
+                matches[col] = ColumnMatch(fields[j], float(confidence[i, j]), methods[i, j], fields[j], synonyms[i, j])
+            else:
+                candidate = fields[best[i]] if header[i, best[i]] > 0 else None
+                matches[col] = ColumnMatch(None, 0.0, '', candidate, '')
+        return matches
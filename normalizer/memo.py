@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .keywords import synonym_version
+
+
+class FuzzyMemo:
+    """Bounded LRU memo of fuzzy match results, shared by the whole process.
+
+    Keys are normalized inputs (a lowercased header or status value) and
+    values are what the matcher computed for them. Results depend on the
+    synonyms, so the memo is emptied when synonym_version() changes. The
+    version is checked at most every ``version_ttl`` seconds, which keeps a
+    hit to a dict lookup. In this process the synonym signals clear the memo
+    straight away.
+
+    With settings.NORMALIZER_FUZZY_CACHE naming a cache alias, misses are
+    looked up in that cache too and results written to it, so that a
+    DatabaseCache shares them across processes and restarts. Keys there
+    include the synonym version, so stale entries are simply never read.
+    """
+    version_ttl = 5
+    # Part of the shared cache keys: bump when the memoized values change shape
+    value_format = 2
+
+    def __init__(self, kind, maxsize=4096):
+        self.kind = kind
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_key = ''
+        self.checked_at = 0.0
+        self.hits = self.misses = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.checked_at = 0.0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.version_ttl:
+            return
+        version = synonym_version()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+                self.version_key = hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+            self.checked_at = now
+
+    def _shared_cache(self):
+        alias = getattr(settings, 'NORMALIZER_FUZZY_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _cache_key(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return f'normalizer:fuzzy:{self.kind}:{self.value_format}:{self.version_key}:{digest}'
+
+    def get_or_compute(self, key, compute):
+        """The memoized result for ``key``, calling ``compute(key)`` on a miss"""
+        self._check_version()
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        shared = self._shared_cache()
+        value = shared.get(self._cache_key(key)) if shared else None
+        if value is None:
+            value = compute(key)
+            if shared:
+                shared.set(self._cache_key(key), value, None)
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+
+column_memo = FuzzyMemo('column')
+status_memo = FuzzyMemo('status')
+
+
+def clear_fuzzy_memos():
+    column_memo.clear()
+    status_memo.clear()
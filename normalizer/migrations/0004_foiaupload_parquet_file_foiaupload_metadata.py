@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0003_contributorstats_remove_foiaupload_processing_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foiaupload',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='foiaupload',
+            name='parquet_file',
+            field=models.FileField(blank=True, help_text='Columnar copy of the normalized output', null=True, upload_to='outputs/'),
+        ),
+    ]
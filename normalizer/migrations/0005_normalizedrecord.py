@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0004_foiaupload_parquet_file_foiaupload_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NormalizedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('agency', models.CharField(blank=True, max_length=255)),
+                ('request_id', models.CharField(blank=True, max_length=255)),
+                ('requester', models.CharField(blank=True, max_length=500)),
+                ('requester_organization', models.CharField(blank=True, max_length=500)),
+                ('subject', models.TextField(blank=True)),
+                ('date_requested', models.DateField(blank=True, null=True)),
+                ('date_perfected', models.DateField(blank=True, null=True)),
+                ('date_completed', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=255)),
+                ('exemptions_cited', models.TextField(blank=True)),
+                ('fee_category', models.CharField(blank=True, max_length=255)),
+                ('fee_waiver', models.CharField(blank=True, max_length=255)),
+                ('fees_charged', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('processed_under_privacy_act', models.CharField(blank=True, max_length=255)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='normalizer.foiaupload')),
+            ],
+            options={
+                'ordering': ['upload', 'row_number'],
+                'indexes': [models.Index(fields=['agency'], name='normalizer__agency_928a59_idx'), models.Index(fields=['status'], name='normalizer__status_4be67c_idx'), models.Index(fields=['date_requested'], name='normalizer__date_re_cea079_idx'), models.Index(fields=['request_id'], name='normalizer__request_48d9e4_idx')],
+            },
+        ),
+    ]
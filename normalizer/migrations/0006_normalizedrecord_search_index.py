@@ -0,0 +1,83 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE normalizer_recordsearch USING fts5(
+        subject, requester, requester_organization,
+        content='normalizer_normalizedrecord', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER normalizer_recordsearch_ai AFTER INSERT ON normalizer_normalizedrecord BEGIN
+        INSERT INTO normalizer_recordsearch(rowid, subject, requester, requester_organization)
+        VALUES (new.id, new.subject, new.requester, new.requester_organization);
+    END
+    """,
+    """
+    CREATE TRIGGER normalizer_recordsearch_ad AFTER DELETE ON normalizer_normalizedrecord BEGIN
+        INSERT INTO normalizer_recordsearch(normalizer_recordsearch, rowid, subject, requester, requester_organization)
+        VALUES ('delete', old.id, old.subject, old.requester, old.requester_organization);
+    END
+    """,
+    """
+    CREATE TRIGGER normalizer_recordsearch_au AFTER UPDATE ON normalizer_normalizedrecord BEGIN
+        INSERT INTO normalizer_recordsearch(normalizer_recordsearch, rowid, subject, requester, requester_organization)
+        VALUES ('delete', old.id, old.subject, old.requester, old.requester_organization);
+        INSERT INTO normalizer_recordsearch(rowid, subject, requester, requester_organization)
+        VALUES (new.id, new.subject, new.requester, new.requester_organization);
+    END
+    """,
+    "INSERT INTO normalizer_recordsearch(normalizer_recordsearch) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS normalizer_recordsearch_au",
+    "DROP TRIGGER IF EXISTS normalizer_recordsearch_ad",
+    "DROP TRIGGER IF EXISTS normalizer_recordsearch_ai",
+    "DROP TABLE IF EXISTS normalizer_recordsearch",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE normalizer_normalizedrecord ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(requester, '') || ' ' || coalesce(requester_organization, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX normalizer_record_search_gin ON normalizer_normalizedrecord USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS normalizer_record_search_gin",
+    "ALTER TABLE normalizer_normalizedrecord DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Full-text index over record subject/requester fields.
+
+    SQLite gets an external-content FTS5 table kept in sync by triggers;
+    PostgreSQL gets a generated tsvector column with a GIN index. Both are
+    maintained by the database as records are loaded or deleted.
+    """
+
+    dependencies = [
+        ('normalizer', '0005_normalizedrecord'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
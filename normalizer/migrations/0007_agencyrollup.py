@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0006_normalizedrecord_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgencyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agency', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(blank=True, max_length=255)),
+                ('month', models.DateField(blank=True, help_text='First day of the month requested (empty if unknown)', null=True)),
+                ('request_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='normalizer__month_0c1035_idx'), models.Index(fields=['status'], name='normalizer__status_508105_idx')],
+                'unique_together': {('agency', 'status', 'month')},
+            },
+        ),
+    ]
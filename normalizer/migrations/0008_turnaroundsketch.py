@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0007_agencyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnaroundSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agency', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('year', models.IntegerField(db_index=True)),
+                ('count', models.IntegerField(default=0)),
+                ('digest', models.BinaryField(help_text='Serialized t-digest (see sketches.TDigest)')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnaround_sketches', to='normalizer.foiaupload')),
+            ],
+            options={
+                'unique_together': {('upload', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0008_turnaroundsketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordFingerprint',
+            fields=[
+                ('record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='normalizer.normalizedrecord')),
+                ('minhash', models.BinaryField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='normalizer.foiaupload')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecordBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='normalizer.normalizedrecord')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='normalizer.foiaupload')),
+            ],
+        ),
+    ]
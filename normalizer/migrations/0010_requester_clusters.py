@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0009_record_minhash_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequesterCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canonical_name', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RequesterAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_name', models.CharField(max_length=500, unique=True)),
+                ('phonetic_key', models.CharField(db_index=True, help_text='Soundex of surname + first initial', max_length=20)),
+                ('token_key', models.CharField(db_index=True, help_text='Sorted name tokens', max_length=500)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='normalizer.requestercluster')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='normalizedrecord',
+            name='requester_cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='normalizer.requestercluster'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0010_requester_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Agency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.PositiveIntegerField(blank=True, help_text='Numeric agency id used by the FOIA Logs corpus', null=True, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(db_index=True, help_text='Lowercase name used for matching free-text agencies', max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'agencies',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='foiaupload',
+            name='canonical_agency',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='normalizer.agency'),
+        ),
+        migrations.AddField(
+            model_name='normalizedrecord',
+            name='canonical_agency',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='normalizer.agency'),
+        ),
+    ]
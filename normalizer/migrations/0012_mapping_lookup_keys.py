@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:22
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def fill_lookup_keys(apps, schema_editor):
+    apps.get_model('normalizer', 'ColumnMapping').objects.update(lookup_key=Lower(Trim('original_column')))
+    apps.get_model('normalizer', 'StatusMapping').objects.update(lookup_key=Lower(Trim('original_status')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0011_agency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='columnmapping',
+            name='lookup_key',
+            field=models.CharField(blank=True, db_index=True, help_text='Synonym key the mapping was looked up by', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='foiaupload',
+            name='renormalize_requested_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='statusmapping',
+            name='lookup_key',
+            field=models.CharField(blank=True, db_index=True, help_text='Synonym key the mapping was looked up by', max_length=255),
+        ),
+        migrations.RunPython(fill_lookup_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0012_mapping_lookup_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foiaupload',
+            name='output_fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the inputs the output was built from', max_length=64),
+        ),
+    ]
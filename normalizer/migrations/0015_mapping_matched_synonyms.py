@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0014_synonym_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='columnmapping',
+            name='matched_synonym',
+            field=models.CharField(blank=True, db_index=True, help_text='Synonym phrase the mapping was matched by, if any', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='statusmapping',
+            name='matched_synonym',
+            field=models.CharField(blank=True, db_index=True, help_text='Synonym phrase the mapping was matched by, if any', max_length=255),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:12
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce, TruncMonth
+import django.db.models.deletion
+
+
+def rebuild_rollups(apps, schema_editor):
+    """Recount the rollups with records of directory agencies under their directory entry"""
+    AgencyRollup = apps.get_model('normalizer', 'AgencyRollup')
+    NormalizedRecord = apps.get_model('normalizer', 'NormalizedRecord')
+    closed = ['done', 'partial', 'no_docs', 'rejected', 'abandoned']
+    groups = (
+        NormalizedRecord.objects
+        .annotate(month=TruncMonth('date_requested'), agency_name=Coalesce('canonical_agency__name', 'agency'))
+        .values('canonical_agency', 'agency_name', 'status', 'month')
+        .annotate(
+            requests=Count('id'),
+            completed=Count('id', filter=Q(date_completed__isnull=False) | Q(status__in=closed))
+        )
+        .order_by()
+    )
+    AgencyRollup.objects.all().delete()
+    AgencyRollup.objects.bulk_create(
+        [
+            AgencyRollup(
+                canonical_agency_id=group['canonical_agency'],
+                agency=group['agency_name'],
+                status=group['status'],
+                month=group['month'],
+                request_count=group['requests'],
+                completed_count=group['completed'],
+            )
+            for group in groups.iterator()
+        ],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0015_mapping_matched_synonyms'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='agencyrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='agencyrollup',
+            name='canonical_agency',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rollups', to='normalizer.agency'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='agencyrollup',
+            unique_together={('canonical_agency', 'agency', 'status', 'month')},
+        ),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_canonical_agencies(apps, schema_editor):
+    FOIAUpload = apps.get_model('normalizer', 'FOIAUpload')
+    apps.get_model('normalizer', 'TurnaroundSketch').objects.update(
+        canonical_agency=Subquery(FOIAUpload.objects.filter(pk=OuterRef('upload')).values('canonical_agency')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('normalizer', '0016_agencyrollup_canonical_agency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turnaroundsketch',
+            name='canonical_agency',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='turnaround_sketches', to='normalizer.agency'),
+        ),
+        migrations.RunPython(fill_canonical_agencies, migrations.RunPython.noop),
+    ]
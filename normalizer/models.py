@@ -3,6 +3,21 @@ from django.contrib.auth.models import User
 import os
 
 
+class Agency(models.Model):
+    """A canonical agency, as named in the FOIA Logs directory (e.g. "215 Coast Guard")"""
+    source_id = models.PositiveIntegerField(unique=True, null=True, blank=True, help_text="Numeric agency id used by the FOIA Logs corpus")
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, db_index=True, help_text="Lowercase name used for matching free-text agencies")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'agencies'
+    
+    def __str__(self):
+        return f"{self.source_id} {self.name}" if self.source_id else self.name
+
+
 class FOIAUpload(models.Model):
     SUBMISSION_STATUS_CHOICES = [
         ('pending', 'Pending Review'),
@@ -36,13 +51,22 @@ class FOIAUpload(models.Model):
     
     processed = models.BooleanField(default=False)
     output_file = models.FileField(upload_to='outputs/', null=True, blank=True)
+    output_fingerprint = models.CharField(max_length=64, blank=True, help_text="Hash of the inputs the output was built from")
+    parquet_file = models.FileField(upload_to='outputs/', null=True, blank=True, help_text="Columnar copy of the normalized output")
     
     # SFLF Uploader metadata fields
     source = models.TextField(blank=True, help_text="Where the FOIA log was obtained (URL or description)")
     agency = models.CharField(max_length=255, blank=True, help_text="Associated federal, state or local agency")
+    canonical_agency = models.ForeignKey(Agency, null=True, blank=True, on_delete=models.SET_NULL, related_name='uploads')
     time_period_start = models.DateField(null=True, blank=True, help_text="Start date of log period")
     time_period_end = models.DateField(null=True, blank=True, help_text="End date of log period")
     
+    # Review choices such as status column priority
+    metadata = models.JSONField(default=dict, blank=True)
+    
+    # Set when a synonym this upload's automatic mappings relied on changes
+    renormalize_requested_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    
     def __str__(self):
         return f"{self.file.name} - {self.uploaded_at}"
     
@@ -54,6 +78,7 @@ class FOIAUpload(models.Model):
 class ColumnSynonym(models.Model):
     standard_name = models.CharField(max_length=255, help_text="Standard SFLF column name")
     synonym = models.CharField(max_length=255, help_text="Alternative column name")
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('standard_name', 'synonym')
@@ -65,6 +90,7 @@ class ColumnSynonym(models.Model):
 class StatusSynonym(models.Model):
     standard_status = models.CharField(max_length=255, help_text="Standard SFLF status")
     synonym = models.CharField(max_length=255, help_text="Alternative status name")
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('standard_status', 'synonym')
@@ -97,10 +123,16 @@ class ColumnMapping(models.Model):
     mapped_column = models.CharField(max_length=255)
     confidence = models.FloatField(null=True, blank=True, help_text="AI confidence score")
     user_confirmed = models.BooleanField(default=False)
+    lookup_key = models.CharField(max_length=255, blank=True, db_index=True, help_text="Synonym key the mapping was looked up by")
+    matched_synonym = models.CharField(max_length=255, blank=True, db_index=True, help_text="Synonym phrase the mapping was matched by, if any")
     
     class Meta:
         unique_together = ('upload', 'original_column')
     
+    def save(self, *args, **kwargs):
+        self.lookup_key = str(self.original_column).lower().strip()[:255]
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.original_column} -> {self.mapped_column}"
 
@@ -111,14 +143,129 @@ class StatusMapping(models.Model):
     mapped_status = models.CharField(max_length=255)
     confidence = models.FloatField(null=True, blank=True, help_text="AI confidence score")
     user_confirmed = models.BooleanField(default=False)
+    lookup_key = models.CharField(max_length=255, blank=True, db_index=True, help_text="Synonym key the mapping was looked up by")
+    matched_synonym = models.CharField(max_length=255, blank=True, db_index=True, help_text="Synonym phrase the mapping was matched by, if any")
     
     class Meta:
         unique_together = ('upload', 'original_status')
     
+    def save(self, *args, **kwargs):
+        self.lookup_key = str(self.original_status).lower().strip()[:255]
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.original_status} -> {self.mapped_status}"
 
 
+class RequesterCluster(models.Model):
+    """A requester as resolved across logs; ids stay stable as new names are attached"""
+    canonical_name = models.CharField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.canonical_name
+
+
+class RequesterAlias(models.Model):
+    """A normalized requester name and the cluster it resolved to"""
+    normalized_name = models.CharField(max_length=500, unique=True)
+    cluster = models.ForeignKey(RequesterCluster, on_delete=models.CASCADE, related_name='aliases')
+    phonetic_key = models.CharField(max_length=20, db_index=True, help_text="Soundex of surname + first initial")
+    token_key = models.CharField(max_length=500, db_index=True, help_text="Sorted name tokens")
+    
+    def __str__(self):
+        return f"{self.normalized_name} -> {self.cluster_id}"
+
+
+class NormalizedRecord(models.Model):
+    """One normalized request from an approved upload, with typed SFLF fields"""
+    upload = models.ForeignKey(FOIAUpload, on_delete=models.CASCADE, related_name='records')
+    row_number = models.PositiveIntegerField()
+    agency = models.CharField(max_length=255, blank=True)
+    canonical_agency = models.ForeignKey(Agency, null=True, blank=True, on_delete=models.SET_NULL, related_name='records')
+    
+    request_id = models.CharField(max_length=255, blank=True)
+    requester = models.CharField(max_length=500, blank=True)
+    requester_organization = models.CharField(max_length=500, blank=True)
+    subject = models.TextField(blank=True)
+    date_requested = models.DateField(null=True, blank=True)
+    date_perfected = models.DateField(null=True, blank=True)
+    date_completed = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=255, blank=True)
+    exemptions_cited = models.TextField(blank=True)
+    fee_category = models.CharField(max_length=255, blank=True)
+    fee_waiver = models.CharField(max_length=255, blank=True)
+    fees_charged = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    processed_under_privacy_act = models.CharField(max_length=255, blank=True)
+    requester_cluster = models.ForeignKey(RequesterCluster, null=True, blank=True, on_delete=models.SET_NULL, related_name='records')
+    
+    class Meta:
+        ordering = ['upload', 'row_number']
+        indexes = [
+            models.Index(fields=['agency']),
+            models.Index(fields=['status']),
+            models.Index(fields=['date_requested']),
+            models.Index(fields=['request_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.request_id or '(no id)'} - {self.agency}"
+
+
+class RecordFingerprint(models.Model):
+    """MinHash signature of a record's subject and requester text"""
+    record = models.OneToOneField(NormalizedRecord, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    upload = models.ForeignKey(FOIAUpload, on_delete=models.CASCADE, related_name='+')
+    minhash = models.BinaryField()
+
+
+class RecordBucket(models.Model):
+    """LSH band bucket a record's signature falls in; records sharing a bucket are duplicate candidates"""
+    record = models.ForeignKey(NormalizedRecord, on_delete=models.CASCADE, related_name='lsh_buckets')
+    upload = models.ForeignKey(FOIAUpload, on_delete=models.CASCADE, related_name='+')
+    bucket = models.BigIntegerField(db_index=True)
+
+
+class AgencyRollup(models.Model):
+    """Request counts per agency, status and month requested, kept current as uploads are approved or withdrawn.
+    
+    Records of a directory agency count under it whatever the upload spelled
+    its name; ``agency`` is then the directory name, else the upload's text.
+    """
+    canonical_agency = models.ForeignKey(Agency, null=True, blank=True, on_delete=models.SET_NULL, related_name='rollups')
+    agency = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=255, blank=True)
+    month = models.DateField(null=True, blank=True, help_text="First day of the month requested (empty if unknown)")
+    request_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('canonical_agency', 'agency', 'status', 'month')
+        indexes = [
+            models.Index(fields=['month']),
+            models.Index(fields=['status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.agency} / {self.status or '(blank)'} / {self.month}: {self.request_count}"
+
+
+class TurnaroundSketch(models.Model):
+    """Quantile sketch of days from request to completion for one upload and year requested"""
+    upload = models.ForeignKey(FOIAUpload, on_delete=models.CASCADE, related_name='turnaround_sketches')
+    canonical_agency = models.ForeignKey(Agency, null=True, blank=True, on_delete=models.SET_NULL, related_name='turnaround_sketches')
+    agency = models.CharField(max_length=255, blank=True, db_index=True)
+    year = models.IntegerField(db_index=True)
+    count = models.IntegerField(default=0)
+    digest = models.BinaryField(help_text="Serialized t-digest (see sketches.TDigest)")
+    
+    class Meta:
+        unique_together = ('upload', 'year')
+    
+    def __str__(self):
+        return f"{self.agency} {self.year}: {self.count} completed requests"
+
+
 class ContributorStats(models.Model):
     """Track contributor statistics for the leaderboard"""
     username = models.CharField(max_length=100, unique=True)
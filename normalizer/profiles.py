@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from .models import StatusSynonym
+
+
+PROFILE_FEATURES = [
+    'fill_rate', 'date_rate', 'numeric_rate', 'digit_rate', 'name_rate',
+    'exemption_rate', 'status_rate', 'unique_ratio', 'mean_length',
+]
+PROFILE_SAMPLE_ROWS = 200
+
+DATE_RE = r'^(?:\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}|[a-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2}[ -][a-z]{3,9}[ -]\d{2,4})'
+NAME_RE = r"^[a-z][a-z.'-]*(?:,? [a-z][a-z.'-]*){1,3}$"
+EXEMPTION_RE = r'\(b\)\s*\(\d|\bb\s?\(?[1-9]\)?(?:\b|\()|\bex(?:emption|\.)?\s*[1-9]\b'
+
+# Status words common enough to count without a synonym
+STATUS_WORDS = {'open', 'closed', 'pending', 'granted', 'denied', 'complete', 'completed', 'withdrawn', 'in progress'}
+
+# Content classes and their linear weights over the derived features
+# (see ColumnClassifier.features); 'date' stands for all three date fields.
+CLASS_WEIGHTS = {
+    'request id': {'unique': 4, 'short': 2, 'digit': 1.5, 'date': -3, 'status': -2, 'bias': -4},
+    'requester': {'name': 4, 'unique': 1, 'digit': -1, 'status': -2, 'bias': -3},
+    'subject': {'long': 5, 'unique': 1, 'bias': -3},
+    'date': {'date': 5, 'bias': -2.5},
+    'status': {'status': 6, 'repeated': 1, 'bias': -3},
+    'exemptions cited': {'exemption': 6, 'bias': -3},
+    'fees charged': {'numeric': 3, 'repeated': 2, 'short': 1, 'date': -3, 'bias': -4},
+    'other': {'empty': 4},
+}
+DATE_FIELDS = ('date requested', 'date perfected', 'date completed')
+
+
+def status_vocabulary():
+    """Lowercase status values recognized without fuzzy matching"""
+    vocabulary = set(STATUS_WORDS)
+    for synonym, status in StatusSynonym.objects.values_list('synonym', 'standard_status'):
+        vocabulary.add(synonym.lower().strip())
+        vocabulary.add(status.lower().strip())
+    return vocabulary
+
+
+def profile_columns(df, sample_rows=PROFILE_SAMPLE_ROWS):
+    """Value profile of each column over the leading rows, as a columns x PROFILE_FEATURES frame.
+
+    All cells of the sample are stacked into one series, so each feature is
+    a single vectorized string operation followed by a per-column mean.
+    """
+    sample = df.head(sample_rows)
+    width = sample.shape[1]
+    cells = sample.set_axis(range(width), axis=1).stack()
+    text = cells.astype(str).str.strip().str.lower()
+    text = text[text != '']
+    column = text.index.get_level_values(1)
+
+    numeric = pd.to_numeric(text.str.replace(r'[$,\s]', '', regex=True), errors='coerce').notna()
+    flags = pd.DataFrame({
+        'date_rate': text.str.match(DATE_RE),
+        'numeric_rate': numeric,
+        'digit_rate': text.str.contains(r'\d'),
+        'name_rate': text.str.match(NAME_RE) & (text.str.len() <= 40),
+        'exemption_rate': text.str.contains(EXEMPTION_RE),
+        'status_rate': text.isin(status_vocabulary()),
+    }, index=text.index)
+    grouped = flags.groupby(column)
+    profile = grouped.mean()
+    profile['unique_ratio'] = text.groupby(column).nunique() / grouped.size()
+    profile['mean_length'] = text.str.len().groupby(column).mean()
+    profile['fill_rate'] = grouped.size() / max(len(sample), 1)
+
+    profile = profile.reindex(range(width)).fillna(0.0)[PROFILE_FEATURES].astype(float)
+    profile.index = [str(col) for col in df.columns]
+    return profile
+
+
+class ColumnClassifier:
+    """Predict the SFLF field of a column from its value profile.
+
+    A fixed linear model over a few derived features (how date-, number-,
+    name- or status-like the values are, how distinct and how long), with
+    a softmax over the content classes. It is meant to decide columns whose
+    header says nothing ("Column_3", "Unnamed: 5") and to break ties the
+    header can't; fields content can't tell apart, like the three dates,
+    share one class.
+    """
+    classes = list(CLASS_WEIGHTS)
+
+    def __init__(self):
+        terms = sorted({term for weights in CLASS_WEIGHTS.values() for term in weights})
+        self.terms = terms
+        self.weights = np.array([[CLASS_WEIGHTS[cls].get(term, 0.0) for term in terms] for cls in self.classes])
+
+    def features(self, profiles):
+        """Derived feature matrix (columns x terms) from a profile frame"""
+        length = profiles['mean_length'].to_numpy()
+        derived = {
+            'bias': np.ones(len(profiles)),
+            'date': profiles['date_rate'].to_numpy(),
+            'numeric': profiles['numeric_rate'].to_numpy(),
+            'digit': profiles['digit_rate'].to_numpy(),
+            'name': profiles['name_rate'].to_numpy(),
+            'exemption': profiles['exemption_rate'].to_numpy(),
+            'status': profiles['status_rate'].to_numpy(),
+            'unique': profiles['unique_ratio'].to_numpy(),
+            'repeated': 1 - profiles['unique_ratio'].to_numpy(),
+            'long': np.clip(length / 60, 0, 1),
+            'short': np.clip(1 - length / 25, 0, 1),
+            'empty': 1 - profiles['fill_rate'].to_numpy(),
+        }
+        return np.column_stack([derived[term] for term in self.terms])
+
+    def class_probabilities(self, profiles):
+        """Columns x classes softmax probabilities"""
+        logits = self.features(profiles) @ self.weights.T
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def content_class(self, field):
+        """The content class standing for a field, or None if values can't identify it"""
+        cls = 'date' if field in DATE_FIELDS else field
+        return cls if cls in self.classes and cls != 'other' else None
+
+    def field_probabilities(self, profiles, fields, probabilities=None):
+        """Columns x fields probabilities; each date field gets the date class's, unknown fields 0
+
+        ``probabilities`` is class_probabilities(profiles), if already computed.
+        """
+        if probabilities is None:
+            probabilities = self.class_probabilities(profiles)
+        result = np.zeros((len(profiles), len(fields)))
+        for j, field in enumerate(fields):
+            cls = self.content_class(field)
+            if cls:
+                result[:, j] = probabilities[:, self.classes.index(cls)]
+        return result
+
+    def predict(self, profiles):
+        """[(field or None, confidence)] per column; dates are reported as 'date requested'"""
+        probabilities = self.class_probabilities(profiles)
+        predictions = []
+        for row in probabilities:
+            cls = self.classes[int(row.argmax())]
+            field = None if cls == 'other' else DATE_FIELDS[0] if cls == 'date' else cls
+            predictions.append((field, float(row.max())))
+        return predictions
@@ -0,0 +1,92 @@
+import importlib.util
+import time
+from collections import namedtuple
+
+import pandas as pd
+from pandas.util.version import Version
+
+
+ReaderEngine = namedtuple('ReaderEngine', ['name', 'module', 'min_pandas'])
+
+# Engines pandas can read files with: the module each needs and the first
+# pandas release that supports it
+READER_ENGINES = {
+    'calamine': ReaderEngine('calamine', 'python_calamine', '2.2'),
+    'openpyxl': ReaderEngine('openpyxl', 'openpyxl', None),
+    'xlrd': ReaderEngine('xlrd', 'xlrd', None),
+    'pyarrow': ReaderEngine('pyarrow', 'pyarrow', '1.4'),
+    'c': ReaderEngine('c', None, None),
+}
+
+# Engines tried per file extension, first choice first. Files whose
+# extension doesn't match their contents (xlsx saved as .xls) are read by
+# the other format's engine further down the chain.
+ENGINE_ORDER = {
+    '.csv': ['pyarrow', 'c'],
+    '.xlsx': ['calamine', 'openpyxl', 'xlrd'],
+    '.xls': ['calamine', 'xlrd', 'openpyxl'],
+}
+
+# CSVs smaller than this parse faster with the C engine than pyarrow starts its threads
+PYARROW_MIN_BYTES = 1024 * 1024
+
+
+class ReaderError(ValueError):
+    """Raised when no engine could read a file"""
+
+
+_available = {}
+
+
+def engine_available(name):
+    """Whether an engine's module is installed and this pandas supports it"""
+    if name not in _available:
+        engine = READER_ENGINES[name]
+        _available[name] = (
+            (engine.module is None or importlib.util.find_spec(engine.module) is not None)
+            and (engine.min_pandas is None or Version(pd.__version__) >= Version(engine.min_pandas))
+        )
+    return _available[name]
+
+
+def select_engines(file_ext, size, nrows=None, order=None):
+    """Installed engines to read a file with, in the order to try them.
+
+    ``order`` overrides ENGINE_ORDER per extension (settings.NORMALIZER_READER_ENGINES).
+    pyarrow can't stop after ``nrows`` and only pays off on larger CSVs, so
+    peeks and small files go to the C engine first.
+    """
+    names = list((order or {}).get(file_ext) or ENGINE_ORDER.get(file_ext, []))
+    if file_ext == '.csv' and 'pyarrow' in names:
+        if nrows is not None:
+            names.remove('pyarrow')
+        elif size < PYARROW_MIN_BYTES:
+            names.remove('pyarrow')
+            names.append('pyarrow')
+    return [name for name in names if name in READER_ENGINES and engine_available(name)]
+
+
+def read_with_fallback(read, engines, action='Read'):
+    """Call ``read(engine)`` with each engine until one succeeds.
+
+    Returns (result, engine, [(log type, message)]), the messages timing
+    every attempt ("{action} with {engine} in 0.12s"). Raises ReaderError
+    listing each engine's failure if none can read the file.
+    """
+    messages = []
+    failures = []
+    for engine in engines:
+        start = time.perf_counter()
+        try:
+            result = read(engine)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            messages.append(('warning', f'{engine} reader failed after {elapsed:.2f}s: {e}'))
+            failures.append(f'{engine}: {e}')
+            continue
+        elapsed = time.perf_counter() - start
+        messages.append(('info', f'{action} with {engine} in {elapsed:.2f}s'))
+        return result, engine, messages
+    if not failures:
+        raise ReaderError('No reader engine is installed for this file format')
+    raise ReaderError('; '.join(failures))
@@ -0,0 +1,84 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from .profiles import DATE_RE
+
+
+# Words of titles, report headers, totals and footnotes around a table
+REGION_KEYWORDS_RE = re.compile(
+    r'generated on|report|page \d+|total|summary|header|title|department|agency name'
+    r'|footnote|prepared by|^\s*(?:note|notes|source)\s*:|^\s*\*'
+)
+DATE_PATTERN = re.compile(DATE_RE, re.IGNORECASE)
+
+EMPTY, NUMBER, DATE, TEXT = range(4)
+
+
+def row_features(df):
+    """Per-row (filled cells, type consistency, keyword, repeated header) arrays for a whole sheet.
+
+    Each column is classified in one vectorized pass (empty, number, date or
+    text); a row's type consistency is the share of its filled cells whose
+    type is their column's most common one.
+    """
+    rows, width = df.shape
+    kinds = np.zeros((rows, width), dtype=np.int8)
+    header_cells = np.zeros(rows, dtype=np.int64)
+    text = pd.Series('', index=df.index)
+    for j in range(width):
+        column = df.iloc[:, j]
+        if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_datetime64_any_dtype(column):
+            # Typed columns need no string work; they hold no header or keyword text
+            kind = DATE if pd.api.types.is_datetime64_any_dtype(column) else NUMBER
+            kinds[:, j] = np.where(column.notna().to_numpy(), kind, EMPTY)
+            continue
+        # Blank nulls before astype(str): pandas 2.1 can write 'nan' into the
+        # source column for NaNs that aren't the np.nan singleton (unpickled frames)
+        strings = column.where(column.notna(), '').astype(str).str.strip()
+        filled = (strings != '').to_numpy()
+        numeric = pd.to_numeric(strings.str.replace(r'[$,]', '', regex=True), errors='coerce').notna().to_numpy()
+        dates = strings.str.match(DATE_PATTERN).to_numpy()
+        kinds[:, j] = np.select([~filled, dates, numeric], [EMPTY, DATE, NUMBER], TEXT)
+        header_cells += (strings.str.lower() == str(df.columns[j]).strip().lower()).to_numpy() & filled
+        text = text + ' ' + strings
+
+    filled = kinds != EMPTY
+    counts = filled.sum(axis=1)
+    modal = np.array([
+        np.bincount(kinds[filled[:, j], j], minlength=4).argmax() if filled[:, j].any() else EMPTY
+        for j in range(width)
+    ])
+    consistency = ((kinds == modal) & filled).sum(axis=1) / np.maximum(counts, 1)
+    keywords = text.str.lower().str.contains(REGION_KEYWORDS_RE).to_numpy()
+    return counts, consistency, keywords, header_cells
+
+
+def table_region(df):
+    """(start, stop) of the contiguous block of data rows in a sheet.
+
+    A data row fills a reasonable share of the columns (relative to the
+    sheet's typical row), mostly holds the kinds of values its columns do,
+    isn't a sparse row of title/total/footnote words and doesn't repeat
+    the header. Everything before the first and after the last data row is
+    junk; rows in between are kept whatever they look like. Returns
+    (0, len(df)) if no row looks like data.
+    """
+    rows, width = df.shape
+    if not rows or not width:
+        return 0, rows
+    counts, consistency, keywords, header_cells = row_features(df)
+    typical = np.median(counts[counts > 0]) if counts.any() else 0
+    min_filled = max(min(2, width), int(np.ceil(0.3 * typical)))
+
+    data = (
+        (counts >= min_filled)
+        & (consistency >= 0.5)
+        & ~(keywords & (counts < 0.5 * typical))
+        & (header_cells * 2 < counts)
+    )
+    positions = np.flatnonzero(data)
+    if not len(positions):
+        return 0, rows
+    return int(positions[0]), int(positions[-1]) + 1
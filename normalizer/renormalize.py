@@ -0,0 +1,155 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ColumnSynonym, FOIAUpload, ProcessingLog
+
+
+logger = logging.getLogger(__name__)
+
+# Only one drain at a time per process, whether from the worker thread or a command
+_drain_lock = threading.Lock()
+# At most one worker thread per process; a request arriving while it runs makes it drain again
+_worker_lock = threading.Lock()
+_worker = None
+_worker_requested = False
+# Synonym keys collected per model inside batched_renormalization()
+_batch = threading.local()
+
+
+def request_renormalization(synonym_model, keys):
+    """Queue processed uploads whose unconfirmed mappings depend on any of the synonyms ``keys``.
+
+    A mapping depends on a synonym it was matched by, which may be a phrase
+    inside its header or status ("final disposition" in "final disposition
+    (fy19)"), on one equal to its whole text, and on a multi-word synonym
+    its text contains, which could now match inside it. Returns the number
+    of uploads queued, or 0 inside batched_renormalization(), which queues
+    them when the block ends.
+    """
+    keys = {str(key).lower().strip() for key in keys if key}
+    if not keys:
+        return 0
+    pending = getattr(_batch, 'keys', None)
+    if pending is not None:
+        pending[synonym_model].update(keys)
+        return 0
+    relation = 'column_mappings' if synonym_model is ColumnSynonym else 'status_mappings'
+    depends = Q(**{f'{relation}__lookup_key__in': keys}) | Q(**{f'{relation}__matched_synonym__in': keys})
+    for key in keys:
+        if ' ' in key:
+            depends |= Q(**{f'{relation}__lookup_key__contains': key})
+    affected = FOIAUpload.objects.filter(
+        depends,
+        processed=True,
+        **{f'{relation}__user_confirmed': False}
+    ).values('id')
+    queued = FOIAUpload.objects.filter(id__in=affected).update(renormalize_requested_at=timezone.now())
+    if queued:
+        transaction.on_commit(start_background_worker)
+    return queued
+
+
+@contextmanager
+def batched_renormalization():
+    """Queue the uploads affected by synonyms saved inside the block once, when it ends.
+
+    Loading a synonym file saves hundreds of synonyms; without this each
+    save runs its own request_renormalization query and worker start.
+    """
+    if getattr(_batch, 'keys', None) is not None:
+        # Nested: the outermost block queues everything
+        yield
+        return
+    _batch.keys = defaultdict(set)
+    try:
+        yield
+    finally:
+        pending, _batch.keys = _batch.keys, None
+    for synonym_model, keys in pending.items():
+        request_renormalization(synonym_model, keys)
+
+
+def renormalize_upload(upload):
+    """Refresh an upload's unconfirmed mappings and rewrite its outputs"""
+    from .corpus import publish_upload
+    from .utils import FOIANormalizer
+    from .views import process_upload
+
+    requested_at = upload.renormalize_requested_at
+    ProcessingLog.objects.create(
+        upload=upload,
+        log_type='info',
+        message='Re-normalizing after synonym changes'
+    )
+    normalizer = FOIANormalizer(upload)
+    normalizer.refresh_mappings(normalizer.load_file())
+    process_upload(upload)
+    if upload.submission_status == 'approved':
+        publish_upload(upload)
+
+    # Leave the request in place if another synonym change came in meanwhile
+    FOIAUpload.objects.filter(
+        id=upload.id,
+        renormalize_requested_at=requested_at
+    ).update(renormalize_requested_at=None)
+
+
+def process_stale_uploads(limit=None):
+    """Re-normalize queued uploads, oldest request first; returns (succeeded, failed)"""
+    succeeded = failed = 0
+    attempted = {}
+    with _drain_lock:
+        while limit is None or succeeded + failed < limit:
+            queued = FOIAUpload.objects.filter(renormalize_requested_at__isnull=False).order_by('renormalize_requested_at')
+            upload = next(
+                (u for u in queued if attempted.get(u.id) != u.renormalize_requested_at),
+                None
+            )
+            if upload is None:
+                break
+            attempted[upload.id] = upload.renormalize_requested_at
+            try:
+                renormalize_upload(upload)
+                succeeded += 1
+            except Exception:
+                # process_upload has logged the failure; the request stays queued
+                logger.exception('Re-normalizing upload %s failed', upload.id)
+                failed += 1
+    return succeeded, failed
+
+
+def _background_drain():
+    global _worker, _worker_requested
+    try:
+        while True:
+            with _worker_lock:
+                if not _worker_requested:
+                    _worker = None
+                    return
+                _worker_requested = False
+            process_stale_uploads()
+    except Exception:
+        logger.exception('Background re-normalization failed')
+        with _worker_lock:
+            _worker = None
+    finally:
+        connection.close()
+
+
+def start_background_worker():
+    """Drain the queue in a daemon thread, starting one only if none is running"""
+    global _worker, _worker_requested
+    if not getattr(settings, 'NORMALIZER_BACKGROUND_RENORMALIZE', False):
+        return
+    with _worker_lock:
+        _worker_requested = True
+        if _worker is None:
+            _worker = threading.Thread(target=_background_drain, name='normalizer-renormalize', daemon=True)
+            _worker.start()
@@ -0,0 +1,133 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import NormalizedRecord
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class RecordSearch:
+    """Ranked full-text search over record subjects and requesters.
+
+    Uses the FTS5 table on SQLite and the generated tsvector column on
+    PostgreSQL (see migration 0006); other backends fall back to unranked
+    substring matching. Instances behave like a sliceable sequence so they can
+    be handed straight to a Django Paginator: only the requested page is
+    fetched from the index.
+    """
+
+    def __init__(self, query, agency=None):
+        self.query = query
+        self.agency = agency
+        self.tokens = TOKEN_RE.findall(query.lower())
+        self._count = None
+
+    def _fts5_match(self):
+        # Quote each token so user input can't inject FTS5 query syntax
+        return ' '.join(f'"{token}"' for token in self.tokens)
+
+    def _agency_clause(self, column):
+        if not self.agency:
+            return '', []
+        return f' AND {column} = %s', [self.agency]
+
+    def _sqlite(self, select, suffix='', params=()):
+        agency_sql, agency_params = self._agency_clause('r.agency')
+        sql = (
+            f"SELECT {select} FROM normalizer_recordsearch s "
+            f"JOIN normalizer_normalizedrecord r ON r.id = s.rowid "
+            f"WHERE normalizer_recordsearch MATCH %s{agency_sql}{suffix}"
+        )
+        return sql, [self._fts5_match()] + agency_params + list(params)
+
+    def _postgres(self, select, suffix='', params=()):
+        agency_sql, agency_params = self._agency_clause('r.agency')
+        sql = (
+            f"SELECT {select} FROM normalizer_normalizedrecord r, "
+            f"plainto_tsquery('english', %s) q "
+            f"WHERE r.search_vector @@ q{agency_sql}{suffix}"
+        )
+        return sql, [' '.join(self.tokens)] + agency_params + list(params)
+
+    def _fallback_queryset(self):
+        queryset = NormalizedRecord.objects.all()
+        if self.agency:
+            queryset = queryset.filter(agency=self.agency)
+        for token in self.tokens:
+            queryset = queryset.filter(
+                Q(subject__icontains=token) |
+                Q(requester__icontains=token) |
+                Q(requester_organization__icontains=token)
+            )
+        return queryset.order_by('id')
+
+    def _build(self, select, suffix='', params=()):
+        if connection.vendor == 'sqlite':
+            return self._sqlite(select, suffix, params)
+        return self._postgres(select, suffix, params)
+
+    def count(self):
+        if self._count is None:
+            if not self.tokens:
+                self._count = 0
+            elif connection.vendor not in ('sqlite', 'postgresql'):
+                self._count = self._fallback_queryset().count()
+            else:
+                sql, params = self._build('COUNT(*)')
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def page(self, offset, limit):
+        """Return records ranked offset..offset+limit, each with a ``rank`` attribute"""
+        if not self.tokens or limit <= 0:
+            return []
+
+        if connection.vendor == 'sqlite':
+            # bm25() is lower-is-better; weight subject matches above requester matches
+            sql, params = self._build(
+                'r.id, bm25(normalizer_recordsearch, 2.0, 1.0, 1.0) AS score',
+                ' ORDER BY score LIMIT %s OFFSET %s',
+                (limit, offset)
+            )
+        elif connection.vendor == 'postgresql':
+            sql, params = self._build(
+                'r.id, -ts_rank_cd(r.search_vector, q) AS score',
+                ' ORDER BY score LIMIT %s OFFSET %s',
+                (limit, offset)
+            )
+        else:
+            records = list(self._fallback_queryset()[offset:offset + limit])
+            for record in records:
+                record.rank = None
+            return records
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranked = cursor.fetchall()
+
+        records = NormalizedRecord.objects.select_related('upload').in_bulk([row[0] for row in ranked])
+        results = []
+        for record_id, score in ranked:
+            record = records.get(record_id)
+            if record is not None:
+                record.rank = -score
+                results.append(record)
+        return results
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            stop = key.stop if key.stop is not None else self.count()
+            return self.page(start, stop - start)
+        results = self.page(key, 1)
+        if not results:
+            raise IndexError(key)
+        return results[0]
@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .readers import ReaderError, read_with_fallback
+
+
+# Workbooks at least this large have their sheets parsed in a process pool
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+# The header row is looked for among this many leading rows
+HEADER_SEARCH_ROWS = 4
+# Cells past this many empty columns in a row aren't part of the table
+MAX_EMPTY_COLUMNS = 50
+
+SheetRead = namedtuple('SheetRead', ['frame', 'messages', 'needs_inference', 'complete'])
+
+# One pool per process, started on first use: spawning workers costs more than small workbooks take to read
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def sheet_names(file_path, engines):
+    """(sheet names, engines to read the sheets with, [(log type, message)])
+
+    The engine that could list the sheets is moved to the front of ``engines``.
+    """
+    def list_sheets(engine):
+        with pd.ExcelFile(file_path, engine=engine) as book:
+            return book.sheet_names
+
+    names, engine, messages = read_with_fallback(list_sheets, engines, action='Listed sheets')
+    return names, [engine] + [other for other in engines if other != engine], messages
+
+
+def _openpyxl_value(cell):
+    """A cell's value as pandas' openpyxl reader converts it"""
+    if cell.value is None:
+        return ''
+    if cell.data_type == 'e':
+        return np.nan
+    if cell.data_type == 'n':
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _read_rows(file_path, sheet_name, engine, limit=None):
+    """(rows, complete): a sheet's leading ``limit`` rows as lists of cell values, '' for empty cells.
+
+    openpyxl sheets are streamed row by row, each row only as wide as its
+    own last cell: pandas pads every row to the widest one, so one stray
+    cell far to the right costs seconds per sheet. Other engines go through
+    pd.read_excel. ``complete`` is whether the rows are known to be all of them.
+    """
+    if engine == 'openpyxl':
+        import openpyxl
+
+        book = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = book[sheet_name]
+            # Stated dimensions are often wrong; read what's actually there
+            sheet.reset_dimensions()
+            rows = []
+            for row in sheet.rows:
+                if limit is not None and len(rows) >= limit:
+                    return rows, False
+                rows.append(_trimmed([_openpyxl_value(cell) for cell in row]))
+            return rows, True
+        finally:
+            book.close()
+    grid = pd.read_excel(
+        file_path, sheet_name=sheet_name, header=None, dtype=object, nrows=limit,
+        keep_default_na=False, engine=engine
+    )
+    return [_trimmed(row) for row in grid.to_numpy().tolist()], limit is None
+
+
+def _trimmed(row):
+    """A row without its trailing empty cells"""
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and value == '') or (isinstance(value, float) and np.isnan(value))
+
+
+def _table_grid(rows):
+    """(rows, stray cells): the rows cut to the table, padded to one width.
+
+    Trailing empty rows and columns are dropped, and so are cells past a
+    gap of MAX_EMPTY_COLUMNS empty columns, which are stray values typed far
+    to the right of the table rather than part of it.
+    """
+    # Formatting can leave a sheet a million empty rows long
+    end = len(rows)
+    while end and not rows[end - 1]:
+        end -= 1
+    rows = rows[:end]
+    counts = np.zeros(max((len(row) for row in rows), default=0), dtype=np.int64)
+    for row in rows:
+        filled = [j for j, value in enumerate(row) if not _blank(value)]
+        counts[filled] += 1
+    columns = np.flatnonzero(counts)
+    if not len(columns):
+        return [], 0
+    gaps = np.flatnonzero(np.diff(columns) > MAX_EMPTY_COLUMNS)
+    width = int(columns[gaps[0]] if len(gaps) else columns[-1]) + 1
+    stray = int(counts[width:].sum())
+
+    grid = [row[:width] + [''] * (width - len(row)) for row in rows]
+    while grid and all(_blank(value) for value in grid[-1]):
+        grid.pop()
+    return grid, stray
+
+
+def _header_row(grid):
+    """(row index, message) of the first of the leading rows naming every column, or (None, None)"""
+    for header_row in range(min(HEADER_SEARCH_ROWS, len(grid))):
+        if not any(_blank(value) for value in grid[header_row]):
+            return header_row, (f'Found headers in row {header_row}' if header_row else None)
+    return None, None
+
+
+def _frame(rows):
+    """DataFrame of rows whose first row is the header, with dtypes inferred as pd.read_excel does"""
+    return TextParser(rows, header=0).read()
+
+
+def read_sheet(file_path, sheet_name, engines, nrows=None):
+    """Read one sheet and find its header row.
+
+    Runs in worker processes, so it doesn't touch Django: log messages are
+    returned rather than written. The sheet is read once as raw rows (see
+    _read_rows) and the header found among its leading rows in memory.
+    Returns a SheetRead; ``frame`` is None if the sheet couldn't be read or
+    is empty, ``needs_inference`` means the sheet has no header row and its
+    columns still need naming, and ``complete`` means ``frame`` holds the
+    whole sheet, not just its first ``nrows`` rows. ``engines`` are tried
+    in order (see readers.read_with_fallback).
+    """
+    # A header below the first row, or none, still leaves nrows data rows
+    limit = nrows + HEADER_SEARCH_ROWS if nrows is not None else None
+    try:
+        (rows, complete), engine, messages = read_with_fallback(
+            lambda engine: _read_rows(file_path, sheet_name, engine, limit), engines
+        )
+    except ReaderError as e:
+        return SheetRead(None, [('warning', f'Could not read sheet: {e}')], False, False)
+    grid, stray = _table_grid(rows)
+    if stray:
+        messages.append(('warning', f'Ignored {stray} stray cells right of the table'))
+    if not grid:
+        return SheetRead(None, messages + [('info', 'Empty sheet, skipped')], False, complete)
+
+    needs_inference = False
+    header_row, message = _header_row(grid)
+    if header_row is None or message:
+        messages.append(('warning', 'Detected missing headers, trying different header rows'))
+    if message:
+        messages.append(('info', message))
+    if header_row is not None:
+        df = _frame(grid[header_row:])
+    elif len(grid) > 1 and all(isinstance(value, str) for value in grid[1]):
+        # The row under a title row has meaningful text that could be headers
+        names = [
+            value.strip() if value.strip() else f'Column_{i+1}'
+            for i, value in enumerate(grid[1])
+        ]
+        df = _frame([names] + grid[2:])
+        messages.append(('info', 'Used first data row as column headers'))
+    else:
+        # A data-only sheet; the caller names the columns from their values
+        df = _frame(grid)
+        needs_inference = True
+    if nrows is not None:
+        df = df.head(nrows)
+    return SheetRead(df, messages, needs_inference, complete)
+
+
+def _sheet_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def read_sheets(file_path, names, engines, nrows=None):
+    """{sheet name: SheetRead} for the named sheets.
+
+    Large workbooks are parsed one sheet per worker process of a pool kept
+    for the life of this process, so a workbook takes about as long as its
+    largest sheet; small ones, or any that the pool fails on, are read in
+    this process.
+    """
+    if len(names) > 1 and (os.cpu_count() or 1) > 1 and os.path.getsize(file_path) >= PARALLEL_MIN_BYTES:
+        pool = None
+        try:
+            pool = _sheet_pool()
+            results = pool.map(
+                read_sheet, [file_path] * len(names), names, [engines] * len(names), [nrows] * len(names)
+            )
+            return dict(zip(names, results))
+        except BrokenProcessPool:
+            _discard_pool(pool)
+        except (OSError, pickle.PicklingError, pickle.UnpicklingError, TypeError, AttributeError):
+            # The pool couldn't start, or a sheet's arguments or result couldn't cross to or from it
+            pass
+    return {name: read_sheet(file_path, name, engines, nrows) for name in names}
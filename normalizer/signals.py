@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .keywords import expire_keyword_matchers
+from .models import ColumnSynonym, StatusSynonym
+from .memo import clear_fuzzy_memos
+from .renormalize import request_renormalization
+
+
+@receiver(pre_save, sender=ColumnSynonym)
+@receiver(pre_save, sender=StatusSynonym)
+def remember_previous_synonym(sender, instance, **kwargs):
+    # An edited synonym stops matching its old text, so uploads using that go stale too
+    instance._previous_synonym = (
+        sender.objects.filter(pk=instance.pk).values_list('synonym', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=ColumnSynonym)
+@receiver(post_save, sender=StatusSynonym)
+def synonym_saved(sender, instance, **kwargs):
+    clear_fuzzy_memos()
+    expire_keyword_matchers()
+    request_renormalization(sender, {instance.synonym, getattr(instance, '_previous_synonym', None)})
+
+
+@receiver(post_delete, sender=ColumnSynonym)
+@receiver(post_delete, sender=StatusSynonym)
+def synonym_deleted(sender, instance, **kwargs):
+    clear_fuzzy_memos()
+    expire_keyword_matchers()
+    request_renormalization(sender, {instance.synonym})
@@ -0,0 +1,122 @@
+import os
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+
+HASH_DIM = 2 ** 12
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Rows featurized and scored per matrix multiply
+SCORE_BATCH = 512
+
+
+def status_features(text):
+    """Hashed feature indices of a status value: words, word pairs and character trigrams"""
+    tokens = TOKEN_RE.findall(str(text).lower())
+    features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f'<{token}>'
+        features.extend(f'#{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    return [zlib.crc32(feature.encode()) % HASH_DIM for feature in features]
+
+
+def featurize(values):
+    """(len(values), HASH_DIM) matrix of L2-normalized hashed feature counts"""
+    matrix = np.zeros((len(values), HASH_DIM), dtype=np.float32)
+    for row, value in enumerate(values):
+        np.add.at(matrix[row], status_features(value), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+class StatusClassifier:
+    """Softmax regression over hashed status n-grams.
+
+    Trained offline (``manage.py train_status_classifier``) from the status
+    synonyms and user-confirmed status mappings, and stored as a float16
+    weight matrix plus bias in a small .npz file. Scoring an upload
+    featurizes all its unique status values and maps them with one matrix
+    multiply per batch.
+    """
+
+    def __init__(self, classes, weights, bias):
+        self.classes = list(classes)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+
+    @classmethod
+    def train(cls, examples, epochs=400, learning_rate=2.0, l2=1e-4):
+        """Fit on (status text, standard status) pairs with full-batch gradient descent"""
+        examples = sorted(set((str(text).strip(), label) for text, label in examples if str(text).strip()))
+        classes = sorted({label for _, label in examples})
+        index = {label: k for k, label in enumerate(classes)}
+        features = featurize([text for text, _ in examples])
+        targets = np.zeros((len(examples), len(classes)), dtype=np.float32)
+        targets[np.arange(len(examples)), [index[label] for _, label in examples]] = 1.0
+
+        weights = np.zeros((HASH_DIM, len(classes)), dtype=np.float32)
+        bias = np.zeros(len(classes), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = cls._softmax(features @ weights + bias)
+            error = (probabilities - targets) / len(examples)
+            weights -= learning_rate * (features.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(classes, weights, bias)
+
+    @staticmethod
+    def _softmax(logits):
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, values):
+        """[(status, probability)] for each value"""
+        predictions = []
+        for start in range(0, len(values), SCORE_BATCH):
+            probabilities = self._softmax(featurize(values[start:start + SCORE_BATCH]) @ self.weights + self.bias)
+            best = probabilities.argmax(axis=1)
+            predictions.extend(
+                (self.classes[k], float(p)) for k, p in zip(best, probabilities[np.arange(len(best)), best])
+            )
+        return predictions
+
+    def accuracy(self, examples):
+        predictions = self.predict([text for text, _ in examples])
+        return float(np.mean([label == predicted for (_, label), (predicted, _) in zip(examples, predictions)]))
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            classes=np.array(self.classes),
+            weights=self.weights.astype(np.float16),
+            bias=self.bias
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['classes'].tolist(), data['weights'], data['bias'])
+
+
+def status_model_path():
+    return str(getattr(settings, 'NORMALIZER_STATUS_MODEL', os.path.join(settings.BASE_DIR, 'status_classifier.npz')))
+
+
+_classifier = None
+_classifier_key = None
+
+
+def status_classifier():
+    """The trained classifier, reloaded when the model file changes; None if there isn't one"""
+    global _classifier, _classifier_key
+    path = status_model_path()
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    if key != _classifier_key:
+        _classifier = StatusClassifier.load(path)
+        _classifier_key = key
+    return _classifier
@@ -0,0 +1,67 @@
+import gzip
+import zipfile
+
+
+class StreamBuffer:
+    """Write-only file object that hands its contents back in chunks.
+
+    Writers such as ``zipfile.ZipFile`` write into it and the caller drains
+    it with ``pop()`` after each step, so only the bytes produced since the
+    last drain are ever held in memory.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        # Writers like pyarrow close their sink when done; pop() still works after
+        self.closed = True
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_file_chunks(path, chunk_size=64 * 1024):
+    """Yield the contents of a stored output, decompressing .gz files on the fly"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_zip_stream(entries):
+    """Build a zip archive on the fly from (name, chunk iterator) pairs.
+
+    Entries are written with data descriptors, so the archive never needs a
+    seekable target or a temp file. An entry's chunk iterator may itself be
+    a generator that is only started once the previous entry is complete.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in entries:
+            with archive.open(name, 'w') as dest:
+                for chunk in chunks:
+                    dest.write(chunk)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+            yield buffer.pop()
+    yield buffer.pop()
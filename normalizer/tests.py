@@ -1,3 +1,857 @@
+import csv
+import datetime
+import gzip
+import io
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import threading
+import warnings
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from . import sheets
+from .agencies import normalize_agency_name, resolve_agency
+from .analytics import analytics_summary, turnaround_summary, update_rollups
+from .corpus import CorpusStore, RecordLoader, publish_upload, retract_upload
+from .dedup import DuplicateIndex
+from .dialects import sniff_csv, sniff_encoding
+from .exports import EXPORT_FIELDS, RecordExport
+from .keywords import keyword_matchers
+from .matching import FORBIDDEN, ColumnMatcher, solve_assignment
+from .memo import FuzzyMemo
+from .models import (
+    Agency, ColumnMapping, ColumnSynonym, FOIAUpload, NormalizedRecord, RequesterCluster, StatusSynonym,
+    TurnaroundSketch,
+)
+from .readers import PYARROW_MIN_BYTES, ReaderError, read_with_fallback, select_engines
+from .regions import table_region
+from .renormalize import batched_renormalization, request_renormalization, start_background_worker
+from .search import RecordSearch
+from .sheets import read_sheet
+from .sketches import TDigest
+from .status_classifier import StatusClassifier, status_classifier
+from .utils import FEES_PARQUET_TYPE, SFLF_COLUMNS, FOIANormalizer, SynonymLoader
+from .views import process_upload
+
+
+class MediaTestCase(TestCase):
+    """A TestCase whose uploads and outputs go to a temporary MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media_root = media.name
+
+    def write_output(self, name, text):
+        """Store a gzip-compressed normalized output; returns its name relative to MEDIA_ROOT"""
+        os.makedirs(os.path.join(self.media_root, 'outputs'), exist_ok=True)
+        with gzip.open(os.path.join(self.media_root, 'outputs', name), 'wt', encoding='utf-8') as f:
+            f.write(text)
+        return f'outputs/{name}'
+
+    def get(self, url, **extra):
+        # Production settings redirect plain HTTP
+        return self.client.get(url, secure=True, **extra)
+
+    def approved_upload(self, text='request id,subject\n19-001,Police reports\n', **fields):
+        fields = {'agency': 'Test Agency', **fields}
+        upload = FOIAUpload.objects.create(
+            source='test', file='uploads/test.csv', submission_status='approved', processed=True, **fields
+        )
+        upload.output_file.name = self.write_output(f'normalized_{upload.id}.csv.gz', text)
+        upload.save()
+        return upload
+
+
+def date_frame(columns, rows=20):
+    """A frame whose every column holds dates, plus a request id column"""
+    data = {'Request Number': [f'2019-{i:04d}' for i in range(rows)]}
+    for k, column in enumerate(columns):
+        data[column] = [f'{(i + k) % 12 + 1}/{i % 28 + 1}/2019' for i in range(rows)]
+    return pd.DataFrame(data)
+
+
+class DateColumnMatchTests(TestCase):
+    def assign(self, columns):
+        matches = ColumnMatcher(SFLF_COLUMNS).assign(date_frame(columns))
+        return {col: match.field for col, match in matches.items()}
+
+    def test_date_headers_stay_out_of_slots_they_contradict(self):
+        fields = self.assign(['Response Date', 'DATE DUE', 'Rcvd from Legal', '1st Resp Date', 'Date Recvd'])
+        self.assertEqual(fields['Date Recvd'], 'date requested')
+        self.assertIsNone(fields['DATE DUE'])
+        self.assertNotIn(fields['Response Date'], ('date requested', 'date perfected'))
+        self.assertNotIn(fields['1st Resp Date'], ('date requested', 'date perfected'))
+        self.assertNotIn(fields['Rcvd from Legal'], ('date perfected', 'date completed'))
+
+    def test_unnamed_date_column_is_not_guessed_into_a_date_slot(self):
+        self.assertIsNone(self.assign(['Column_3'])['Column_3'])
+
+    def test_named_date_headers_keep_their_fields(self):
+        fields = self.assign(['Date Received', 'Date Perfected', 'Date Closed'])
+        self.assertEqual(fields['Date Received'], 'date requested')
+        self.assertEqual(fields['Date Perfected'], 'date perfected')
+        self.assertEqual(fields['Date Closed'], 'date completed')
+
+    def test_due_date_is_not_a_request_date(self):
+        fields = self.assign(['Date Received', 'Due Date (30 Days from Received)'])
+        self.assertEqual(fields['Date Received'], 'date requested')
+        self.assertIsNone(fields['Due Date (30 Days from Received)'])
+
+
+class ReadSheetTests(TestCase):
+    def workbook(self, rows):
+        import openpyxl
+
+        book = openpyxl.Workbook()
+        for row in rows:
+            book.active.append(row)
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        book.save(path)
+        return path, book.active.title
+
+    def test_header_below_a_title_row(self):
+        path, name = self.workbook([
+            ['FOIA Log 2019'],
+            ['Request Number', 'Requester', 'Date Received'],
+            ['19-001', 'Jane Doe', 3],
+            ['19-002', 'John Roe', 4],
+        ])
+        read = read_sheet(path, name, ['openpyxl'])
+        self.assertEqual(list(read.frame.columns), ['Request Number', 'Requester', 'Date Received'])
+        self.assertEqual(read.frame['Date Received'].tolist(), [3, 4])
+        self.assertFalse(read.needs_inference)
+        self.assertTrue(read.complete)
+
+    def test_stray_cells_far_right_are_dropped(self):
+        stray = [None] * 300 + ['19']
+        path, name = self.workbook([['Request Number', 'Requester'], ['19-001', 'Jane Doe'], stray])
+        read = read_sheet(path, name, ['openpyxl'])
+        self.assertEqual(read.frame.shape, (1, 2))
+        self.assertIn(('warning', 'Ignored 1 stray cells right of the table'), read.messages)
+
+    def test_peek_is_incomplete(self):
+        path, name = self.workbook([['Request Number']] + [[f'19-{i:03d}'] for i in range(20)])
+        read = read_sheet(path, name, ['openpyxl'], nrows=5)
+        self.assertEqual(len(read.frame), 5)
+        self.assertFalse(read.complete)
+
+
+class ReadSheetsTests(TestCase):
+    def setUp(self):
+        import openpyxl
+
+        book = openpyxl.Workbook()
+        book.active.append(['Request Number', 'Requester'])
+        book.active.append(['19-001', 'Jane Doe'])
+        book.create_sheet('FY20').append(['Request Number', 'Requester'])
+        handle, self.path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        book.save(self.path)
+        self.names = book.sheetnames
+        # Send every workbook to the pool
+        for patcher in (patch.object(sheets, 'PARALLEL_MIN_BYTES', 0), patch('os.cpu_count', return_value=2)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pickling_error_reads_sheets_in_process(self):
+        pool = Mock(**{'map.side_effect': pickle.PicklingError('cannot pickle')})
+        with patch.object(sheets, '_sheet_pool', return_value=pool):
+            reads = sheets.read_sheets(self.path, self.names, ['openpyxl'])
+        self.assertEqual(reads[self.names[0]].frame['Requester'].tolist(), ['Jane Doe'])
+        self.assertEqual(len(reads['FY20'].frame), 0)
+
+    def test_broken_pool_is_replaced(self):
+        pool = Mock(**{'map.side_effect': BrokenProcessPool()})
+        with patch.object(sheets, '_pool', pool):
+            reads = sheets.read_sheets(self.path, self.names, ['openpyxl'])
+            self.assertIsNone(sheets._pool)
+        pool.shutdown.assert_called_once()
+        self.assertEqual(set(reads), set(self.names))
+
+
+class CombineSheetsTests(TestCase):
+    def test_empty_and_all_na_sheets_keep_columns_without_warnings(self):
+        upload = FOIAUpload.objects.create(agency='Test Agency', source='test', file='uploads/test.csv')
+        frames = [
+            ('FY19', pd.DataFrame({'Request Number': ['19-001'], 'Fees': [5.0]})),
+            ('FY20', pd.DataFrame({'request number': ['20-001'], 'Fees': [None], 'Notes': [None]})),
+            ('FY21', pd.DataFrame({'Request Number': [], 'Fees': []}, dtype=object)),
+        ]
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', FutureWarning)
+            df = FOIANormalizer(upload, log=False)._combine_sheets(frames)
+        self.assertEqual(list(df.columns), ['Request Number', 'Fees', 'sheet', 'Notes'])
+        self.assertEqual(df['Request Number'].tolist(), ['19-001', '20-001'])
+        self.assertEqual(df['Fees'].dtype, np.float64)
+
+
+class SolveAssignmentTests(TestCase):
+    def brute_force(self, scores):
+        n, m = scores.shape
+        return max(
+            sum(scores[i, j] for i, j in enumerate(columns))
+            for columns in itertools.permutations(range(m), n)
+        )
+
+    def test_matches_brute_force_optimum(self):
+        rng = np.random.default_rng(7)
+        for n, m in [(1, 1), (3, 3), (4, 6), (5, 5), (3, 7)]:
+            scores = rng.normal(size=(n, m))
+            assignment = solve_assignment(scores)
+            self.assertEqual(len(set(assignment)), n)
+            self.assertAlmostEqual(scores[np.arange(n), assignment].sum(), self.brute_force(scores))
+
+    def test_forbidden_cells_are_avoided(self):
+        scores = np.array([[1.0, FORBIDDEN], [2.0, 0.5]])
+        self.assertEqual(list(solve_assignment(scores)), [0, 1])
+
+
+class ColumnMatcherTests(TestCase):
+    def test_empty_column_loses_to_filled_one(self):
+        df = date_frame(['Date Received'])
+        df['Received'] = None
+        matches = ColumnMatcher(SFLF_COLUMNS).assign(df)
+        self.assertEqual(matches['Date Received'].field, 'date requested')
+        self.assertIsNone(matches['Received'].field)
+
+    def test_fixed_fields_are_not_reassigned(self):
+        df = date_frame(['Date Received', 'Date Closed'])
+        matches = ColumnMatcher(SFLF_COLUMNS).assign(df, fixed={'Date Closed': 'date completed'})
+        self.assertNotIn('Date Closed', matches)
+        self.assertEqual(matches['Date Received'].field, 'date requested')
+
+
+class KeywordMatchersTests(TestCase):
+    def test_version_is_checked_once_per_ttl_and_after_synonym_changes(self):
+        keyword_matchers()
+        with self.assertNumQueries(0):
+            column_matcher, _ = keyword_matchers()
+        self.assertNotEqual(column_matcher.best('final disposition').method, 'synonym')
+
+        ColumnSynonym.objects.create(standard_name='status', synonym='Final Disposition')
+        column_matcher, _ = keyword_matchers()
+        self.assertEqual(column_matcher.best('final disposition')[:2], ('status', 'final disposition'))
+
+
+class TDigestTests(TestCase):
+    values = np.random.default_rng(11).exponential(30, size=20000)
+
+    def assertNearQuantile(self, digest, q):
+        expected = np.quantile(self.values, q)
+        self.assertAlmostEqual(digest.quantile(q), expected, delta=0.02 * expected + 0.5)
+
+    def test_quantiles(self):
+        digest = TDigest.from_values(self.values)
+        self.assertEqual(digest.count, len(self.values))
+        for q in (0.1, 0.5, 0.9, 0.99):
+            self.assertNearQuantile(digest, q)
+        self.assertEqual(digest.quantile(0), self.values.min())
+        self.assertEqual(digest.quantile(1), self.values.max())
+
+    def test_merged_digests_match_whole(self):
+        parts = np.array_split(self.values, 4)
+        digest = TDigest.merge([TDigest.from_values(part) for part in parts])
+        for q in (0.5, 0.9, 0.99):
+            self.assertNearQuantile(digest, q)
+
+    def test_bytes_round_trip(self):
+        digest = TDigest.from_values(self.values)
+        restored = TDigest.from_bytes(digest.to_bytes())
+        self.assertAlmostEqual(restored.quantile(0.9), digest.quantile(0.9), places=2)
+
+    def test_empty_digest(self):
+        self.assertIsNone(TDigest.from_values([np.nan]).quantile(0.5))
+
+
+class ResolveAgencyTests(TestCase):
+    def setUp(self):
+        self.coast_guard = self.agency(215, 'Coast Guard')
+        self.other = self.agency(311, 'Department of Energy')
+        self.police = self.agency(4341, 'Howard County Police Department')
+
+    @staticmethod
+    def agency(source_id, name):
+        return Agency.objects.create(source_id=source_id, name=name, normalized_name=normalize_agency_name(name))
+
+    def test_directory_ids(self):
+        self.assertEqual(resolve_agency('215'), self.coast_guard)
+        self.assertEqual(resolve_agency('215 Coast Guard'), self.coast_guard)
+        self.assertEqual(resolve_agency('215 U.S. Coast Guard'), self.coast_guard)
+
+    def test_number_in_a_name_is_not_an_id(self):
+        self.assertIsNone(resolve_agency('311 Police Department'))
+        self.assertEqual(resolve_agency('311 Howard County Police Department'), self.police)
+
+    def test_names(self):
+        self.assertEqual(resolve_agency('the coast guard'), self.coast_guard)
+        self.assertEqual(resolve_agency('Howard County Police Dept'), self.police)
+        self.assertIsNone(resolve_agency('Federal Bureau of Investigation'))
+        self.assertIsNone(resolve_agency(''))
+
+
+class UploadOverlapTests(TestCase):
+    def upload(self, subjects):
+        upload = FOIAUpload.objects.create(agency='Test Agency', source='test', file='uploads/test.csv')
+        NormalizedRecord.objects.bulk_create(
+            NormalizedRecord(upload=upload, row_number=i, subject=subject, requester='Jane Doe')
+            for i, subject in enumerate(subjects)
+        )
+        DuplicateIndex().index_upload(upload)
+        return upload
+
+    def test_reports_other_uploads_only(self):
+        repeated = 'All emails about the harbor dredging contract from 2018'
+        mine = self.upload([repeated, repeated, 'Police reports for the parade on main street'])
+        other = self.upload([repeated, 'Budget memos for the new library branch downtown'])
+        self.upload(['Records of parking tickets issued in march'])
+
+        overlap = DuplicateIndex().upload_overlap(mine)
+        self.assertEqual([row['upload_id'] for row in overlap], [other.id])
+        self.assertEqual(overlap[0]['records'], 2)
+        self.assertEqual(overlap[0]['matching_records'], 1)
+
+    def test_repeated_text_counts_each_record_once(self):
+        mine = self.upload(['Incident Report'] * 50)
+        other = self.upload(['Incident Report'] * 3 + ['Budget memos for the new library branch downtown'])
+        self.assertEqual(
+            DuplicateIndex().upload_overlap(mine),
+            [{'upload_id': other.id, 'records': 50, 'matching_records': 3}]
+        )
+
+    def test_likely_duplicates_reads_a_bounded_number_per_bucket(self):
+        upload = self.upload(['Incident Report'] * 30)
+        record = NormalizedRecord.objects.filter(upload=upload).first()
+        index = DuplicateIndex()
+        index.max_bucket_candidates = 5
+        duplicates = index.likely_duplicates(record)
+        self.assertEqual(len(duplicates), 5)
+        self.assertNotIn(record, [duplicate for duplicate, _ in duplicates])
+        self.assertEqual({score for _, score in duplicates}, {1.0})
+
+
+class RenormalizationTrackingTests(TestCase):
+    def setUp(self):
+        self.upload = FOIAUpload.objects.create(agency='Test Agency', source='test', file='uploads/test.csv', processed=True)
+
+    def test_synonym_matched_inside_a_header_is_tracked(self):
+        ColumnSynonym.objects.create(standard_name='status', synonym='Final Disposition')
+        column = 'Final Disposition (FY19)'
+        match = ColumnMatcher(SFLF_COLUMNS).assign(pd.DataFrame({column: ['Granted', 'Denied']}))[column]
+        self.assertEqual((match.field, match.synonym), ('status', 'final disposition'))
+
+        ColumnMapping.objects.create(
+            upload=self.upload, original_column=column, mapped_column='status', matched_synonym=match.synonym
+        )
+        self.assertEqual(request_renormalization(ColumnSynonym, {'Final Disposition'}), 1)
+        self.assertEqual(request_renormalization(ColumnSynonym, {'Disposition'}), 0)
+
+    def test_new_phrase_inside_a_header_is_tracked(self):
+        ColumnMapping.objects.create(upload=self.upload, original_column='Date of Request (Received)', mapped_column='date requested')
+        self.assertEqual(request_renormalization(ColumnSynonym, {'date of request'}), 1)
+
+    def test_confirmed_mappings_are_left_alone(self):
+        ColumnMapping.objects.create(
+            upload=self.upload, original_column='Final Disposition (FY19)', mapped_column='status',
+            matched_synonym='final disposition', user_confirmed=True
+        )
+        self.assertEqual(request_renormalization(ColumnSynonym, {'final disposition'}), 0)
+
+
+class BatchedRenormalizationTests(TestCase):
+    def setUp(self):
+        upload = FOIAUpload.objects.create(agency='Test Agency', source='test', file='uploads/test.csv', processed=True)
+        ColumnMapping.objects.create(upload=upload, original_column='Final Disposition', mapped_column='status')
+        self.queued = FOIAUpload.objects.filter(id=upload.id, renormalize_requested_at__isnull=False)
+
+    def test_synonym_file_queues_uploads_once_at_the_end(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('status: Final Disposition, Outcome, Result\nsubject: Topic\n')
+        self.addCleanup(os.remove, f.name)
+
+        with patch('normalizer.renormalize.request_renormalization', wraps=request_renormalization) as requested:
+            SynonymLoader.load_synonyms_from_file(f.name, ColumnSynonym)
+        self.assertTrue(self.queued.exists())
+        self.assertEqual(ColumnSynonym.objects.count(), 4)
+        requested.assert_called_once()
+
+    def test_nested_batches_queue_when_the_outermost_ends(self):
+        with batched_renormalization():
+            with batched_renormalization():
+                ColumnSynonym.objects.create(standard_name='status', synonym='Final Disposition')
+            self.assertFalse(self.queued.exists())
+        self.assertTrue(self.queued.exists())
+
+    def test_background_worker_runs_once_per_process(self):
+        started, release = threading.Event(), threading.Event()
+
+        def drain():
+            started.set()
+            release.wait(5)
+
+        with self.settings(NORMALIZER_BACKGROUND_RENORMALIZE=True), \
+                patch('normalizer.renormalize.process_stale_uploads', side_effect=drain) as process_stale_uploads:
+            start_background_worker()
+            started.wait(5)
+            start_background_worker()
+            start_background_worker()
+            workers = [thread for thread in threading.enumerate() if thread.name == 'normalizer-renormalize']
+            self.assertEqual(len(workers), 1)
+            release.set()
+            workers[0].join(5)
+        # Requests made while it ran are drained in one more pass
+        self.assertEqual(process_stale_uploads.call_count, 2)
+
+
+class ParquetTableTests(TestCase):
+    def test_typed_columns(self):
+        df = pd.DataFrame({
+            'request id': ['19-001', '19-002', '19-003'],
+            'date requested': ['2019-01-03', 'not a date', ''],
+            'fees charged': ['$1,234.50', '', '12'],
+        })
+        table = FOIANormalizer(None, log=False).build_parquet_table(df)
+        self.assertEqual(table.schema.field('fees charged').type, FEES_PARQUET_TYPE)
+        self.assertEqual(str(table.schema.field('date requested').type), 'date32[day]')
+        self.assertEqual(table['fees charged'].to_pylist(), [Decimal('1234.50'), None, Decimal('12.00')])
+        self.assertEqual(table['date requested'].null_count, 2)
+
+
+class DownloadEncodingTests(MediaTestCase):
+    text = 'request id,subject\n19-001,Police reports\n'
+
+    def download(self, **headers):
+        upload = self.approved_upload(self.text)
+        return self.get(reverse('download_file', args=[upload.id]), **headers)
+
+    def test_gzip_is_sent_to_clients_that_accept_it(self):
+        response = self.download(HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), self.text)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_gzip_refused_with_q_zero_is_decoded(self):
+        for header in ('gzip;q=0', 'gzip; q=0.0, identity', '*;q=0', ''):
+            response = self.download(HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+            self.assertEqual(b''.join(response.streaming_content).decode(), self.text)
+
+    def test_etag_revalidation(self):
+        upload = self.approved_upload(self.text)
+        url = reverse('download_file', args=[upload.id])
+        etag = self.get(url)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class BundleDownloadTests(MediaTestCase):
+    def bundle(self, query):
+        response = self.get(reverse('download_bundle') + query)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_selected_outputs_and_manifest(self):
+        first = self.approved_upload('request id\n19-001\n')
+        second = self.approved_upload('request id\n19-002\n')
+        self.approved_upload('request id\n19-003\n')
+        os.remove(second.output_file.path)
+
+        archive = self.bundle(f'?ids={first.id},{second.id}')
+        entry = f'{first.id}_normalized_{first.id}.csv'
+        self.assertEqual(archive.namelist(), [entry, 'manifest.csv'])
+        self.assertEqual(archive.read(entry).decode(), 'request id\n19-001\n')
+        manifest = list(csv.DictReader(io.StringIO(archive.read('manifest.csv').decode())))
+        self.assertEqual([row['included'] for row in manifest], ['yes', 'missing output'])
+
+    def test_agency_filter(self):
+        upload = self.approved_upload(agency='Coast Guard')
+        self.approved_upload(agency='Department of Energy')
+        archive = self.bundle('?agency=coast')
+        self.assertEqual(archive.namelist(), [f'{upload.id}_normalized_{upload.id}.csv', 'manifest.csv'])
+
+
+class RecordLoaderTests(MediaTestCase):
+    def test_chunk_mixing_resolved_and_unresolved_requesters(self):
+        upload = self.approved_upload(
+            'request id,requester,fees charged,date requested\n'
+            '19-001,Jane Doe,$12.50,2019-01-03\n'
+            '19-002,Someone Else,,\n'
+        )
+        cluster = RequesterCluster.objects.create(canonical_name='Jane Doe')
+        clusters = {'Jane Doe': cluster.id}
+        loader = RecordLoader()
+
+        chunk = pd.read_csv(upload.output_file.path, dtype=str, keep_default_na=False)
+        frame = loader.prepare_chunk(chunk, upload, 0, clusters)
+        rows = list(csv.reader(loader.copy_buffer(frame)))
+        column = loader.columns.index('requester_cluster_id')
+        self.assertEqual([row[column] for row in rows], [str(cluster.id), ''])
+
+        self.assertEqual(loader.load(upload, clusters), 2)
+        records = NormalizedRecord.objects.filter(upload=upload).order_by('row_number')
+        self.assertEqual([record.requester_cluster_id for record in records], [cluster.id, None])
+        self.assertEqual(records[0].fees_charged, Decimal('12.50'))
+        self.assertEqual(str(records[0].date_requested), '2019-01-03')
+
+
+class AgencyRollupTests(TestCase):
+    def setUp(self):
+        self.coast_guard = Agency.objects.create(source_id=215, name='Coast Guard', normalized_name='coast guard')
+
+    def publish(self, agency, statuses, canonical=None):
+        upload = FOIAUpload.objects.create(
+            agency=agency, canonical_agency=canonical, source='test', file='uploads/test.csv',
+            submission_status='approved'
+        )
+        NormalizedRecord.objects.bulk_create(
+            NormalizedRecord(
+                upload=upload, row_number=i, agency=agency, canonical_agency=canonical, status=status,
+                date_requested=datetime.date(2019, 1, 3)
+            )
+            for i, status in enumerate(statuses)
+        )
+        update_rollups(upload)
+        return upload
+
+    def test_spelling_variants_share_their_directory_agency(self):
+        self.publish('U.S. Coast Guard', ['done', 'processed'], self.coast_guard)
+        self.publish('USCG', ['done'], self.coast_guard)
+        self.publish('Town of Somewhere', ['done'])
+
+        agencies = {row['agency']: row for row in analytics_summary()['agencies']}
+        self.assertEqual(set(agencies), {'Coast Guard', 'Town of Somewhere'})
+        self.assertEqual((agencies['Coast Guard']['requests'], agencies['Coast Guard']['completed']), (3, 2))
+
+        summary = analytics_summary('the coast guard')
+        self.assertEqual([row['requests'] for row in summary['agencies']], [3])
+        self.assertEqual(summary['status_distribution'], {'done': 2, 'processed': 1})
+        self.assertEqual([row['requests'] for row in analytics_summary('Town of Somewhere')['agencies']], [1])
+
+    def test_retracting_withdraws_counts(self):
+        upload = self.publish('USCG', ['done'], self.coast_guard)
+        update_rollups(upload, -1)
+        self.assertEqual(analytics_summary()['agencies'], [])
+
+
+class TurnaroundSummaryTests(TestCase):
+    def test_spelling_variants_share_their_directory_agency(self):
+        coast_guard = Agency.objects.create(source_id=215, name='Coast Guard', normalized_name='coast guard')
+        sketches = [('U.S. Coast Guard', coast_guard, 10), ('USCG', coast_guard, 30), ('Coast Guard Yard', None, 90)]
+        for agency, canonical, days in sketches:
+            upload = FOIAUpload.objects.create(
+                agency=agency, canonical_agency=canonical, source='test', file='uploads/test.csv',
+                submission_status='approved'
+            )
+            TurnaroundSketch.objects.create(
+                upload=upload, agency=agency, canonical_agency=canonical, year=2019, count=1,
+                digest=TDigest.from_values([days]).to_bytes()
+            )
+
+        summary = turnaround_summary('the coast guard')
+        self.assertEqual(summary['overall']['count'], 2)
+        self.assertEqual(turnaround_summary('Coast Guard Yard')['overall']['count'], 1)
+
+
+class LoadAgenciesCommandTests(TestCase):
+    def test_resolving_uploads_links_their_records(self):
+        upload = FOIAUpload.objects.create(
+            agency='U.S. Coast Guard', source='test', file='uploads/test.csv', submission_status='approved'
+        )
+        NormalizedRecord.objects.create(upload=upload, row_number=1, agency=upload.agency, status='done')
+        update_rollups(upload)
+
+        with tempfile.TemporaryDirectory() as logs_path:
+            os.mkdir(os.path.join(logs_path, '215 Coast Guard'))
+            call_command('load_agencies', logs_path=logs_path, resolve_uploads=True, stdout=io.StringIO())
+
+        coast_guard = Agency.objects.get(source_id=215)
+        self.assertEqual(FOIAUpload.objects.get(pk=upload.pk).canonical_agency, coast_guard)
+        self.assertEqual(NormalizedRecord.objects.get(upload=upload).canonical_agency, coast_guard)
+        self.assertEqual([row['agency'] for row in analytics_summary()['agencies']], ['Coast Guard'])
+
+
+class RecordExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        approved = FOIAUpload.objects.create(
+            agency='Coast Guard', source='test', file='uploads/test.csv', submission_status='approved'
+        )
+        pending = FOIAUpload.objects.create(agency='Coast Guard', source='test', file='uploads/test.csv')
+        NormalizedRecord.objects.bulk_create(
+            [
+                NormalizedRecord(
+                    upload=approved, row_number=i, agency='Coast Guard', request_id=f'19-{i:03d}',
+                    status='done' if i % 2 else 'processed', date_requested=datetime.date(2019, 1 + i % 12, 1),
+                    fees_charged=Decimal('12.50') if i == 1 else None
+                )
+                for i in range(7)
+            ]
+            + [NormalizedRecord(upload=pending, row_number=0, agency='Coast Guard', request_id='pending')]
+        )
+
+    def export(self, query):
+        response = self.get(reverse('export_records') + query)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    @patch.object(RecordExport, 'chunk_size', 2)
+    def test_csv_streams_approved_records_in_chunks(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('?format=csv').decode())))
+        self.assertEqual([row['request_id'] for row in rows], [f'19-{i:03d}' for i in range(7)])
+        self.assertEqual(rows[1]['fees_charged'], '12.50')
+
+    def test_filters_and_jsonl(self):
+        lines = self.export('?format=jsonl&status=done&start=2019-03-01').decode().splitlines()
+        self.assertEqual([json.loads(line)['request_id'] for line in lines], ['19-003', '19-005'])
+
+    def test_parquet(self):
+        table = pq.read_table(io.BytesIO(self.export('?format=parquet&year=2019')))
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.column_names, EXPORT_FIELDS)
+
+    def test_bad_filters_are_rejected(self):
+        for query in ('?format=xml', '?year=soon', '?start=03/01/2019'):
+            self.assertEqual(self.get(reverse('export_records') + query).status_code, 400, query)
+
+
+class PublishUploadTests(MediaTestCase):
+    text = (
+        'request id,subject,status,date requested\n'
+        '19-001,Police reports,Closed,01/03/2019\n'
+        '19-002,Budget,Open,02/04/2019\n'
+    )
+
+    def publish(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_upload(upload)
+
+    def test_publish_loads_records_rollups_and_partition(self):
+        upload = self.approved_upload(self.text)
+        self.publish(upload)
+        self.publish(upload)
+
+        request_ids = upload.records.order_by('row_number').values_list('request_id', flat=True)
+        self.assertEqual(list(request_ids), ['19-001', '19-002'])
+        self.assertEqual([row['requests'] for row in analytics_summary()['agencies']], [2])
+        partitions = CorpusStore().find_partitions(upload.id)
+        self.assertEqual(len(partitions), 1)
+        with gzip.open(partitions[0], 'rt') as f:
+            self.assertEqual(len(list(csv.reader(f))), 3)
+
+    def test_retract_removes_records_rollups_and_partition(self):
+        upload = self.approved_upload(self.text)
+        self.publish(upload)
+        with self.captureOnCommitCallbacks(execute=True):
+            retract_upload(upload)
+
+        self.assertFalse(upload.records.exists())
+        self.assertEqual(analytics_summary()['agencies'], [])
+        self.assertEqual(CorpusStore().find_partitions(upload.id), [])
+
+    def test_unchanged_output_of_an_unapproved_upload_is_retracted(self):
+        upload = self.approved_upload(self.text)
+        path = os.path.join(self.media_root, upload.file.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(self.text)
+        ColumnMapping.objects.create(upload=upload, original_column='request id', mapped_column='request id')
+        upload.output_fingerprint = FOIANormalizer(upload).output_fingerprint()
+        upload.save()
+        self.publish(upload)
+
+        upload.submission_status = 'rejected'
+        upload.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            process_upload(upload)
+
+        self.assertFalse(upload.records.exists())
+        self.assertEqual(CorpusStore().find_partitions(upload.id), [])
+        self.assertTrue(upload.logs.filter(message__contains='reusing the existing output').exists())
+
+
+class StatusClassifierTests(TestCase):
+    examples = [
+        ('Closed', 'done'), ('Closed - full grant', 'done'), ('Completed', 'done'), ('Request completed', 'done'),
+        ('Granted in full', 'done'), ('Open', 'processing'), ('In progress', 'processing'),
+        ('Pending review', 'processing'), ('Under review', 'processing'), ('Assigned for processing', 'processing'),
+        ('Withdrawn', 'withdrawn'), ('Withdrawn by requester', 'withdrawn'), ('Request withdrawn', 'withdrawn'),
+    ]
+
+    def test_classifies_unseen_spellings(self):
+        classifier = StatusClassifier.train(self.examples)
+        self.assertEqual(classifier.accuracy(self.examples), 1.0)
+        predictions = classifier.predict(['CLOSED - partial grant', 'withdrawn (requester)', 'review in progress'])
+        self.assertEqual([status for status, _ in predictions], ['done', 'withdrawn', 'processing'])
+        self.assertTrue(all(0 < probability <= 1 for _, probability in predictions))
+
+    def test_model_file_round_trip_and_reload(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'status_classifier.npz')
+            with self.settings(NORMALIZER_STATUS_MODEL=path):
+                self.assertIsNone(status_classifier())
+
+                trained = StatusClassifier.train(self.examples)
+                trained.save(path)
+                loaded = status_classifier()
+                self.assertEqual(loaded.classes, trained.classes)
+                self.assertEqual(
+                    [status for status, _ in loaded.predict(['Closed', 'Open'])],
+                    [status for status, _ in trained.predict(['Closed', 'Open'])]
+                )
+                self.assertIs(status_classifier(), loaded)
+
+
+class SniffCsvTests(TestCase):
+    def sniff(self, data):
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        dialect = sniff_csv(f.name)
+        return dialect, pd.read_csv(f.name, dtype=str, **dialect.read_options())
+
+    def test_semicolons_in_cp1252_below_a_title(self):
+        dialect, frame = self.sniff(
+            'Calendar Year 2017 FOIA Log;;\n\nRequest ID;Requester;Subject\n17-001;José Ruíz;"Budget; 2017"\n'
+            .encode('cp1252')
+        )
+        self.assertEqual((dialect.encoding, dialect.delimiter, dialect.header_row), ('cp1252', ';', 2))
+        self.assertEqual(list(frame.columns), ['Request ID', 'Requester', 'Subject'])
+        self.assertEqual(frame.iloc[0].tolist(), ['17-001', 'José Ruíz', 'Budget; 2017'])
+
+    def test_utf16_tabs_and_single_quotes(self):
+        dialect, frame = self.sniff("Request ID\tSubject\n'17-001'\t'Police, fire'\n".encode('utf-16'))
+        self.assertEqual((dialect.encoding, dialect.delimiter, dialect.quotechar), ('utf-16', '\t', "'"))
+        self.assertEqual(frame.iloc[0].tolist(), ['17-001', 'Police, fire'])
+
+    def test_character_cut_off_by_the_prefix_keeps_utf8(self):
+        prefix = 'Request ID,Subject\n19-001,Café'.encode('utf-8')[:-1]
+        self.assertEqual(sniff_encoding(prefix, final=False), 'utf-8')
+        self.assertEqual(sniff_encoding(prefix), 'cp1252')
+
+
+class RecordSearchTests(TestCase):
+    def setUp(self):
+        upload = FOIAUpload.objects.create(agency='Coast Guard', source='test', file='uploads/test.csv')
+        NormalizedRecord.objects.bulk_create(
+            NormalizedRecord(upload=upload, row_number=i, agency=agency, subject=subject, requester=requester)
+            for i, (agency, subject, requester) in enumerate([
+                ('Coast Guard', 'Budget documents', 'Police Accountability Project'),
+                ('Coast Guard', 'Police reports for 2019 boardings', 'Jane Doe'),
+                ('Navy', 'Police reports', 'John Roe'),
+            ])
+        )
+
+    def test_subject_matches_rank_first(self):
+        search = RecordSearch('police')
+        self.assertEqual(search.count(), 3)
+        self.assertEqual(search[2].subject, 'Budget documents')
+        self.assertEqual([record.subject for record in search[0:1]], ['Police reports'])
+
+    def test_agency_filter_and_query_syntax(self):
+        self.assertEqual([record.agency for record in RecordSearch('police reports', agency='Navy')[0:10]], ['Navy'])
+        self.assertEqual(len(RecordSearch('"police" OR NEAR(budget')), 0)
+        self.assertEqual(len(RecordSearch('?!')), 0)
+
+
+class TableRegionTests(TestCase):
+    def test_titles_totals_and_footnotes_are_cut(self):
+        columns = ['Request Number', 'Date Received', 'Requester', 'Subject', 'Status']
+        df = pd.DataFrame(
+            [
+                ['Department of Transportation FOIA Report', '', '', '', ''],
+                ['Generated on 01/05/2020', '', '', '', ''],
+                columns,
+            ]
+            + [[f'19-{i:03d}', f'{i % 12 + 1}/3/2019', 'Jane Doe', 'Crash reports', 'Closed'] for i in range(10)]
+            + [['', '', '', '', ''], ['Total', '10', '', '', ''], ['* Note: dates are estimates', '', '', '', '']],
+            columns=columns
+        )
+        self.assertEqual(table_region(df), (3, 13))
+
+    def test_sheet_without_data_rows_is_kept_whole(self):
+        df = pd.DataFrame({'Title': ['FOIA Report', 'Page 1']})
+        self.assertEqual(table_region(df), (0, 2))
+
+
+class ReaderEngineTests(TestCase):
+    def test_csv_engines_by_size_and_peek(self):
+        self.assertEqual(select_engines('.csv', PYARROW_MIN_BYTES), ['pyarrow', 'c'])
+        self.assertEqual(select_engines('.csv', 1024), ['c', 'pyarrow'])
+        self.assertEqual(select_engines('.csv', PYARROW_MIN_BYTES, nrows=10), ['c'])
+        order = {'.xlsx': ['xlrd', 'openpyxl', 'unknown']}
+        self.assertEqual(select_engines('.xlsx', 0, order=order), ['xlrd', 'openpyxl'])
+
+    def test_fallback_reports_every_attempt(self):
+        def read(engine):
+            if engine == 'pyarrow':
+                raise ValueError('bad quoting')
+            return engine
+
+        result, engine, messages = read_with_fallback(read, ['pyarrow', 'c'])
+        self.assertEqual((result, engine), ('c', 'c'))
+        self.assertEqual([log_type for log_type, _ in messages], ['warning', 'info'])
+        with self.assertRaisesMessage(ReaderError, 'pyarrow: bad quoting'):
+            read_with_fallback(read, ['pyarrow'])
+
+
+class FuzzyMemoTests(TestCase):
+    def test_bounded_lru_emptied_when_synonyms_change(self):
+        memo = FuzzyMemo('test', maxsize=2)
+        computed = []
+
+        def compute(key):
+            computed.append(key)
+            return key.upper()
+
+        for key in ['a', 'b', 'a', 'c', 'b']:
+            memo.get_or_compute(key, compute)
+        # 'b' was evicted by 'c' as the least recently used
+        self.assertEqual(computed, ['a', 'b', 'c', 'b'])
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+
+        # Past the version TTL a synonym change empties the memo
+        memo.version_ttl = 0
+        memo.get_or_compute('b', compute)
+        self.assertEqual(len(computed), 4)
+        StatusSynonym.objects.create(standard_status='done', synonym='Finished')
+        self.assertEqual(memo.get_or_compute('b', compute), 'B')
+        self.assertEqual(len(computed), 5)
+
+
+class CorpusStoreTests(MediaTestCase):
+    def test_agency_export_concatenates_its_partitions(self):
+        store = CorpusStore()
+        uploads = [
+            self.approved_upload('request id,subject\n19-001,Police reports\n', agency='U.S. Coast Guard'),
+            self.approved_upload('request id,subject\n20-001,Budget\n20-002,Travel\n', agency='U.S. Coast Guard'),
+            self.approved_upload('request id,subject\n19-001,Ships\n', agency='Navy'),
+        ]
+        for upload in uploads:
+            store.add_upload(upload)
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(store.iter_csv('U.S. Coast Guard')).decode())))
+        self.assertEqual([row['request id'] for row in rows], ['19-001', '20-001', '20-002'])
+        self.assertEqual({row['upload id'] for row in rows}, {str(uploads[0].id), str(uploads[1].id)})
+        self.assertEqual(len(list(csv.reader(io.StringIO(b''.join(store.iter_csv()).decode())))), 5)
 
-# Create your tests here.
+        store.remove_upload(uploads[0])
+        self.assertEqual(len(store.partitions('U.S. Coast Guard')), 1)
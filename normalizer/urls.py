@@ -5,11 +5,26 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('upload/', views.upload_file, name='upload_file'),
+    path('agencies/autocomplete/', views.agency_autocomplete, name='agency_autocomplete'),
     path('files/', views.file_list, name='file_list'),
+    path('files/bundle/', views.download_bundle, name='download_bundle'),
+    path('files/corpus/', views.download_corpus, name='download_corpus'),
     path('files/<int:upload_id>/', views.file_detail, name='file_detail'),
     path('files/<int:upload_id>/review/', views.manual_review, name='manual_review'),
+    path('files/<int:upload_id>/review/preview/', views.review_preview, name='review_preview'),
+    path('files/<int:upload_id>/review/stats/', views.review_statistics, name='review_statistics'),
     path('files/<int:upload_id>/download/', views.download_file, name='download_file'),
+    path('files/<int:upload_id>/download/parquet/', views.download_parquet, name='download_parquet'),
     path('files/<int:upload_id>/status/', views.submission_status, name='submission_status'),
+    path('files/<int:upload_id>/duplicates/', views.upload_duplicates, name='upload_duplicates'),
+    path('records/export/', views.export_records, name='export_records'),
+    path('records/<int:record_id>/duplicates/', views.record_duplicates, name='record_duplicates'),
+    
+    # Search and analytics
+    path('search/', views.search_records, name='search_records'),
+    path('analytics/', views.analytics, name='analytics'),
+    path('analytics/turnaround/', views.turnaround_analytics, name='turnaround_analytics'),
+    path('analytics/requesters/', views.requester_analytics, name='requester_analytics'),
     
     # Admin/moderation URLs
     path('queue/', views.submission_queue, name='submission_queue'),
@@ -1,18 +1,117 @@
 import pandas as pd
 import os
 from django.conf import settings
-from .models import ColumnSynonym, StatusSynonym, ProcessingLog, ColumnMapping, StatusMapping
+from django.db import transaction
+from django.db.models.functions import Lower
+from .models import ColumnSynonym, StatusSynonym, ProcessingLog, ColumnMapping, StatusMapping, TurnaroundSketch
+from .dialects import sniff_csv
+from .keywords import keyword_matchers
+from .matching import NAME_PART_FIELD, ColumnMatcher, name_part_rank
+from .memo import status_memo
+from .profiles import PROFILE_FEATURES, PROFILE_SAMPLE_ROWS, ColumnClassifier, profile_columns
+from .readers import read_with_fallback, select_engines
+from .regions import table_region
+from .renormalize import batched_renormalization
+from .sheets import read_sheets, sheet_names
+from .sketches import TDigest
+from .status_classifier import status_classifier
 import difflib
+import hashlib
+import json
 import re
+import warnings
+from decimal import Decimal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Part of every output fingerprint: bump when a pipeline change alters the
+# normalized output, so cached outputs are rebuilt on the next processing run
+NORMALIZER_VERSION = '2'
+
+# Below this probability the status classifier defers to keyword/fuzzy matching
+STATUS_CLASSIFIER_MIN_PROBABILITY = 0.6
+
+# Multi-sheet workbooks: a sheet is a FOIA log if this many of its headers
+# match column keywords or synonyms, and is appended to the first log sheet
+# if this share of their combined columns is common to both
+MIN_LOG_SHEET_COLUMNS = 2
+SHEET_COLUMN_OVERLAP = 0.6
+# Rows of each sheet read to pick the sheets to combine, as many as column profiles sample
+PEEK_ROWS = PROFILE_SAMPLE_ROWS
+# Provenance column added when several sheets are combined
+SHEET_COLUMN = 'sheet'
+HEADER_WORD_RE = re.compile(r'[a-z0-9]+')
+
+SFLF_COLUMNS = [
+    'request id', 'requester', 'requester organization', 'subject',
+    'date requested', 'date perfected', 'date completed', 'status',
+    'exemptions cited', 'fee category', 'fee waiver', 'fees charged',
+    'processed under privacy act', 'source', 'agency', 'time period of log'
+]
+
+# Explicit column types for the Parquet copy of a normalized log. Dates and
+# fees are stored typed so analytics jobs don't have to re-infer them; values
+# that can't be parsed become nulls (the CSV keeps the original text).
+SFLF_PARQUET_TYPES = {
+    'request id': 'string',
+    'requester': 'string',
+    'requester organization': 'string',
+    'subject': 'string',
+    'date requested': 'date',
+    'date perfected': 'date',
+    'date completed': 'date',
+    'status': 'string',
+    'exemptions cited': 'string',
+    'fee category': 'string',
+    'fee waiver': 'string',
+    'fees charged': 'decimal',
+    'processed under privacy act': 'string',
+    'source': 'string',
+    'agency': 'string',
+    'time period of log': 'string',
+}
+# Arrow type of 'decimal' columns, matching NormalizedRecord.fees_charged
+FEES_PARQUET_TYPE = pa.decimal128(14, 2) if pa else None
+
+
+def parse_sflf_dates(values):
+    """Parse a column of normalized date text; unparseable values become NaT"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        parsed = pd.to_datetime(values, errors='coerce')
+        
+        # The fast path infers one format from the first value; re-parse only
+        # the cells that didn't match it, element by element
+        text = values.astype('string').str.strip()
+        retry = parsed.isna() & text.notna() & (text != '')
+        if retry.any():
+            parsed[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return parsed
+
+
+def parse_sflf_amounts(values):
+    """Parse a column of fee text such as "$1,250.00"; unparseable values become NaN"""
+    cleaned = values.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def header_key(column):
+    """Case, spacing, punctuation and word order insensitive form of a header,
+    so "Victim / Suspect" lines up with "Victim/Suspect" and "Assigned Person"
+    with "Person Assigned" across sheets"""
+    return ' '.join(sorted(HEADER_WORD_RE.findall(str(column).lower())))
 
 
 class SynonymLoader:
     @staticmethod
-    def load_synonyms_from_file(file_path, model_class):
-        """Load synonyms from text file into database"""
-        if not os.path.exists(file_path):
-            return
-        
+    def parse_synonym_file(file_path):
+        """(standard name, synonym) pairs from a "standard: synonym, synonym" text file"""
         with open(file_path, 'r') as f:
             for line in f:
                 line = line.strip()
@@ -25,28 +124,36 @@ class SynonymLoader:
                 for synonym in synonyms.split(','):
                     synonym = synonym.strip().strip('"').strip("'")
                     if synonym:
-                        # Handle different field names for different models
-                        if model_class == StatusSynonym:
-                            model_class.objects.get_or_create(
-                                standard_status=standard_name,
-                                synonym=synonym
-                            )
-                        else:
-                            model_class.objects.get_or_create(
-                                standard_name=standard_name,
-                                synonym=synonym
-                            )
+                        yield standard_name, synonym
+    
+    @staticmethod
+    def load_synonyms_from_file(file_path, model_class):
+        """Load synonyms from text file into database"""
+        if not os.path.exists(file_path):
+            return
+        
+        # Affected uploads are queued once for the whole file rather than per synonym
+        with batched_renormalization(), transaction.atomic():
+            for standard_name, synonym in SynonymLoader.parse_synonym_file(file_path):
+                # Handle different field names for different models
+                if model_class == StatusSynonym:
+                    model_class.objects.get_or_create(
+                        standard_status=standard_name,
+                        synonym=synonym
+                    )
+                else:
+                    model_class.objects.get_or_create(
+                        standard_name=standard_name,
+                        synonym=synonym
+                    )
 
 
 class FOIANormalizer:
-    def __init__(self, upload_instance):
+    def __init__(self, upload_instance, log=True):
         self.upload = upload_instance
-        self.sflf_columns = [
-            'request id', 'requester', 'requester organization', 'subject',
-            'date requested', 'date perfected', 'date completed', 'status',
-            'exemptions cited', 'fee category', 'fee waiver', 'fees charged',
-            'processed under privacy act', 'source', 'agency', 'time period of log'
-        ]
+        # Previews run the pipeline on samples and shouldn't write processing logs
+        self.log = log
+        self.sflf_columns = list(SFLF_COLUMNS)
         self.sflf_statuses = [
             'processed', 'appealing', 'fix', 'payment', 'lawsuit',
             'rejected', 'no_docs', 'done', 'partial', 'abandoned', ''
@@ -54,6 +161,8 @@ class FOIANormalizer:
     
     def log_message(self, log_type, message):
         """Add a log entry for this upload"""
+        if not self.log:
+            return
         ProcessingLog.objects.create(
             upload=self.upload,
             log_type=log_type,
@@ -61,45 +170,17 @@ class FOIANormalizer:
         )
     
     def clean_problematic_rows(self, df):
-        """Use statistical methods to identify and remove problematic header/blank rows"""
+        """Strip title, header, total, footnote and blank rows around the sheet's data block"""
         if len(df) < 5:
             return df
         
         try:
-            # Analyze first 10 rows for patterns
-            sample_rows = df.head(10).copy()
-            rows_to_skip = 0
+            start, stop = table_region(df)
+            leading, trailing = start, len(df) - stop
             
-            for i in range(min(10, len(sample_rows))):
-                row = sample_rows.iloc[i]
-                
-                # Check if row is mostly empty
-                non_empty_count = row.notna().sum()
-                if non_empty_count <= 1:
-                    rows_to_skip = i + 1
-                    continue
-                
-                # Check if row contains metadata patterns
-                row_text = ' '.join(str(val) for val in row if pd.notna(val)).lower()
-                metadata_patterns = ['generated on', 'report', 'page', 'total', 'summary', 
-                                   'header', 'title', 'department', 'agency name']
-                
-                if any(pattern in row_text for pattern in metadata_patterns):
-                    rows_to_skip = i + 1
-                    continue
-                
-                # Check if row appears to be actual data (has dates, IDs, etc)
-                has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', row_text))
-                has_id = bool(re.search(r'\b\d{4,}\b', row_text))  # 4+ digit numbers
-                has_request_terms = any(term in row_text for term in ['request', 'foia', 'record'])
-                
-                if has_date or has_id or has_request_terms:
-                    # This looks like real data, stop skipping
-                    break
-            
-            if rows_to_skip > 0:
-                df_cleaned = df.iloc[rows_to_skip:].reset_index(drop=True)
-                self.log_message('info', f'Removed {rows_to_skip} problematic rows from top using statistical analysis')
+            if leading or trailing:
+                df_cleaned = df.iloc[start:stop].reset_index(drop=True)
+                self.log_message('info', f'Removed {leading} leading and {trailing} trailing non-data rows around the table')
                 return df_cleaned
             else:
                 self.log_message('info', 'No problematic rows detected')
@@ -109,151 +190,220 @@ class FOIANormalizer:
             self.log_message('error', f"Row cleaning failed: {str(e)}. Continuing without row cleaning.")
             return df
 
-    def load_file(self):
-        """Load the uploaded file into a pandas DataFrame"""
+    def load_file(self, nrows=None):
+        """Load the uploaded file into a pandas DataFrame.
+        
+        With ``nrows`` only the leading rows are read (a peek for the review
+        page): CSV parsing stops early and xlsx sheets are streamed by
+        openpyxl in read-only mode, stopping once enough rows are read.
+        Workbooks are read sheet by sheet; see load_workbook.
+        """
         file_path = self.upload.file.path
         file_ext = os.path.splitext(file_path)[1].lower()
         
         try:
             if file_ext == '.csv':
-                df = pd.read_csv(file_path)
+                # Sniff encoding, delimiter, quoting and header offset from
+                # the file's first bytes, then parse it once with them
+                dialect = sniff_csv(file_path)
+                self.log_message('info', f'Detected CSV dialect: {dialect}')
+                df, engine, messages = read_with_fallback(
+                    lambda engine: pd.read_csv(file_path, nrows=nrows, engine=engine, **dialect.read_options()),
+                    [engine for engine in self.reader_engines(file_path, nrows=nrows) if dialect.supports(engine)]
+                )
+                for log_type, message in messages:
+                    self.log_message(log_type, message)
+                df = self._tidy_frame(df)
             elif file_ext in ['.xlsx', '.xls']:
-                # Try reading normally first
-                df = pd.read_excel(file_path)
-                
-                # If we get unnamed columns, try reading with header in different rows
-                if any(str(col).startswith('Unnamed:') for col in df.columns):
-                    self.log_message('warning', 'Detected missing headers, trying different header rows')
-                    
-                    # Try reading with header in row 1, 2, or 3
-                    for header_row in [1, 2, 3]:
-                        try:
-                            test_df = pd.read_excel(file_path, header=header_row)
-                            if not any(str(col).startswith('Unnamed:') for col in test_df.columns if pd.notna(col)):
-                                df = test_df
-                                self.log_message('info', f'Found headers in row {header_row}')
-                                break
-                        except:
-                            continue
-                    
-                    # If still no good headers, try to infer from first few rows
-                    if any(str(col).startswith('Unnamed:') for col in df.columns):
-                        # Check if first row has meaningful text that could be headers
-                        first_row = df.iloc[0]
-                        if all(isinstance(val, str) or pd.isna(val) for val in first_row):
-                            # Use first row as headers
-                            new_columns = []
-                            for i, val in enumerate(first_row):
-                                if pd.notna(val) and isinstance(val, str) and val.strip():
-                                    new_columns.append(val.strip())
-                                else:
-                                    new_columns.append(f'Column_{i+1}')
-                            
-                            df.columns = new_columns
-                            df = df.iloc[1:].reset_index(drop=True)  # Remove header row from data
-                            self.log_message('info', 'Used first data row as column headers')
-                        else:
-                            # This appears to be a data-only file, infer logical column names
-                            # based on typical FOIA log structure
-                            inferred_columns = []
-                            num_cols = len(df.columns)
-                            
-                            # Common FOIA log patterns based on column count and data inspection
-                            if num_cols >= 3:
-                                # Look at the data to infer column purposes
-                                sample_data = df.head(10)
-                                used_names = set()
-                                
-                                for i, col in enumerate(df.columns):
-                                    col_data = sample_data[col].dropna()
-                                    inferred_name = None
-                                    
-                                    if i == 0 and (col_data.empty or all(pd.isna(val) or val == '' for val in col_data)):
-                                        inferred_name = 'index'
-                                    elif ('request_id' not in used_names and 
-                                          any(str(val).replace('-', '').replace('_', '').isalnum() and 
-                                              len(str(val)) < 20 for val in col_data)):
-                                        # Short alphanumeric strings - likely request IDs
-                                        inferred_name = 'request_id'
-                                    elif ('requester' not in used_names and 
-                                          any('(' in str(val) and ')' in str(val) for val in col_data)):
-                                        # Contains parentheses - likely redacted names
-                                        inferred_name = 'requester'  
-                                    elif ('organization' not in used_names and 
-                                          any(str(val).upper() == str(val) and len(str(val)) > 10 for val in col_data)):
-                                        # All caps longer strings - likely organizations
-                                        inferred_name = 'organization'
-                                    elif ('subject' not in used_names and 
-                                          any('RECORDS' in str(val).upper() or 'DOCUMENTS' in str(val).upper() 
-                                              for val in col_data)):
-                                        # Contains typical FOIA request language
-                                        inferred_name = 'subject'
-                                    elif ('date_requested' not in used_names and 
-                                          any(hasattr(val, 'year') for val in col_data)):
-                                        # Date columns
-                                        inferred_name = 'date_requested'
-                                    elif ('status_code' not in used_names and 
-                                          all(len(str(val)) <= 3 and str(val).isalpha() for val in col_data)):
-                                        # Short alphabetic codes - likely status
-                                        inferred_name = 'status_code'
-                                    
-                                    # Ensure unique names
-                                    if inferred_name and inferred_name not in used_names:
-                                        inferred_columns.append(inferred_name)
-                                        used_names.add(inferred_name)
-                                    else:
-                                        inferred_columns.append(f'column_{i+1}')
-                                        used_names.add(f'column_{i+1}')
-                            
-                            # Apply inferred column names
-                            if len(inferred_columns) == len(df.columns):
-                                df.columns = inferred_columns
-                                self.log_message('info', f'Inferred column names: {inferred_columns}')
-                            else:
-                                # Fallback to generic names
-                                df.columns = [f'column_{i+1}' for i in range(len(df.columns))]
-                                self.log_message('warning', 'Used generic column names')
+                df = self.load_workbook(file_path, nrows=nrows)
             else:
                 raise ValueError(f"Unsupported file format: {file_ext}")
             
-            # Clean up column names
-            df.columns = [str(col).strip() if pd.notna(col) else f'Column_{i+1}' 
-                         for i, col in enumerate(df.columns)]
-            
-            # Clean problematic rows using statistical methods
-            df = self.clean_problematic_rows(df)
-            
-            self.log_message('info', f"Loaded file with {len(df)} rows and {len(df.columns)} columns")
-            self.log_message('info', f"Column names: {list(df.columns)}")
+            if nrows is None:
+                self.log_message('info', f"Loaded file with {len(df)} rows and {len(df.columns)} columns")
+                self.log_message('info', f"Column names: {list(df.columns)}")
             return df
         
         except Exception as e:
             self.log_message('error', f"Error loading file: {str(e)}")
             raise
     
+    def reader_engines(self, file_path, nrows=None):
+        """Reader engines to try for a file, by its format and size (see readers.select_engines)"""
+        return select_engines(
+            os.path.splitext(file_path)[1].lower(),
+            os.path.getsize(file_path),
+            nrows=nrows,
+            order=getattr(settings, 'NORMALIZER_READER_ENGINES', None)
+        )
+
+    def _tidy_frame(self, df):
+        """Clean up column names and strip non-data rows around the table"""
+        df.columns = [str(col).strip() if pd.notna(col) else f'Column_{i+1}'
+                     for i, col in enumerate(df.columns)]
+
+        # Clean problematic rows using statistical methods
+        return self.clean_problematic_rows(df)
+
+    def _infer_column_names(self, df, log=True):
+        """Name the columns of a data-only sheet after what their values look like"""
+        predictions = ColumnClassifier().predict(profile_columns(df))
+        inferred_columns = []
+        for i, (field, confidence) in enumerate(predictions):
+            if field and confidence >= 0.5 and field not in inferred_columns:
+                inferred_columns.append(field)
+            else:
+                inferred_columns.append(f'column_{i+1}')
+
+        df.columns = inferred_columns
+        if log:
+            self.log_message('info', f'Inferred column names: {inferred_columns}')
+        return df
+
+    def load_workbook(self, file_path, nrows=None):
+        """Load every FOIA log sheet of a workbook into one DataFrame.
+
+        Each sheet is read once, with the first reader engine that can open
+        the workbook, and its header row found in memory (see
+        sheets.read_sheet). In a workbook of several sheets every sheet is
+        first peeked at (PEEK_ROWS rows) to tell FOIA log sheets from the
+        rest, and only the log sheets the peek didn't cover are then read
+        in full, concurrently for large workbooks (see sheets.read_sheets).
+        The first log sheet sets the columns, and later ones are appended
+        if their columns mostly match it, with a ``sheet`` column recording
+        where each row came from. A single-sheet workbook loads as before.
+        """
+        names, engines, messages = sheet_names(file_path, self.reader_engines(file_path, nrows=nrows))
+        for log_type, message in messages:
+            self.log_message(log_type, message)
+        peek_rows = nrows if len(names) == 1 else min(nrows or PEEK_ROWS, PEEK_ROWS)
+        reads = read_sheets(file_path, names, engines, nrows=peek_rows)
+
+        # Sheets are told apart by their peeks; named here without logging,
+        # as the ones kept are named again once read in full
+        peeks = []
+        for name in names:
+            read = reads[name]
+            if read.frame is not None:
+                df = self._infer_column_names(read.frame.copy(), log=False) if read.needs_inference else read.frame
+                peeks.append((name, df))
+        if not peeks:
+            errors = [message for read in reads.values() for log_type, message in read.messages if log_type == 'warning']
+            raise ValueError(f"No readable sheets in workbook: {'; '.join(errors) or 'all sheets are empty'}")
+        selected = self._select_sheets(peeks) if len(peeks) > 1 else [peeks[0][0]]
+
+        unread = [name for name in selected if not reads[name].complete and peek_rows != nrows]
+        if unread:
+            reads.update(read_sheets(file_path, unread, engines, nrows=nrows))
+        frames = []
+        for name in names:
+            read = reads[name]
+            prefix = f"Sheet '{name}': " if len(names) > 1 else ''
+            if read.frame is None or name in selected:
+                for log_type, message in read.messages:
+                    self.log_message(log_type, prefix + message)
+            if read.frame is None or name not in selected:
+                continue
+            df = self._infer_column_names(read.frame) if read.needs_inference else read.frame
+            frames.append((name, self._tidy_frame(df)))
+
+        if not frames:
+            errors = [message for read in reads.values() for log_type, message in read.messages if log_type == 'warning']
+            raise ValueError(f"No readable sheets in workbook: {'; '.join(errors)}")
+        if len(frames) > 1 and unread:
+            # Rows past the peek can change a sheet's header (junk columns
+            # further down leave it unnamed), so check the full sheets again
+            kept = self._select_sheets(frames)
+            frames = [(name, df) for name, df in frames if name in kept]
+        if len(frames) == 1:
+            return frames[0][1]
+        # A peek keeps the leading rows of every combined sheet, so columns
+        # only one sheet fills are profiled as sparse as they are
+        return self._combine_sheets(frames)
+
+    def _is_log_sheet(self, df):
+        """Whether a sheet's headers look like a FOIA log table"""
+        column_matcher, _ = keyword_matchers()
+        hits = sum(1 for col in df.columns if column_matcher.best(str(col).lower().strip()))
+        return len(df) > 0 and hits >= MIN_LOG_SHEET_COLUMNS
+
+    def _select_sheets(self, frames):
+        """Names of the workbook sheets to combine: the FOIA log sheets whose columns mostly match the first's"""
+        logs = [(name, df) for name, df in frames if self._is_log_sheet(df)]
+        log_names = {name for name, _ in logs}
+        for name, _ in frames:
+            if name not in log_names:
+                self.log_message('info', f"Skipped sheet '{name}': it doesn't look like a FOIA log")
+        if not logs:
+            # Nothing looks like a log; fall back to the first sheet as before
+            self.log_message('warning', f"No sheet looks like a FOIA log, using '{frames[0][0]}'")
+            return [frames[0][0]]
+
+        primary_name, primary = logs[0]
+        spelling = self._spelling(primary)
+        selected = [primary_name]
+        for name, df in logs[1:]:
+            df = self._align_columns(df, spelling)
+            shared = set(primary.columns) & set(df.columns)
+            overlap = len(shared) / len(set(primary.columns) | set(df.columns))
+            if overlap >= SHEET_COLUMN_OVERLAP:
+                selected.append(name)
+            else:
+                self.log_message(
+                    'warning',
+                    f"Skipped sheet '{name}': its columns don't match sheet '{primary_name}' ({overlap:.0%} in common)"
+                )
+        return selected
+
+    def _combine_sheets(self, frames):
+        """Concatenate the selected sheets of a workbook in the first one's column spelling, tagging rows with their sheet"""
+        primary_name, primary = frames[0]
+        spelling = self._spelling(primary)
+        parts = (
+            [primary.assign(**{SHEET_COLUMN: primary_name})]
+            + [self._align_columns(df, spelling).assign(**{SHEET_COLUMN: name}) for name, df in frames[1:]]
+        )
+        columns = list(dict.fromkeys(col for part in parts for col in part.columns))
+        # pandas is changing how empty and all-NA parts affect the combined dtypes;
+        # leave them out and restore their columns afterwards
+        parts = [part.dropna(axis=1, how='all') for part in parts if len(part)]
+        df = pd.concat(parts, ignore_index=True, sort=False) if parts else pd.DataFrame()
+        df = df.reindex(columns=columns)
+        self.log_message('info', f"Combined {len(frames)} sheets: {[name for name, _ in frames]}")
+        return df
+
+    @staticmethod
+    def _spelling(df):
+        """{header_key: column} for a sheet's columns, its first spelling of each header kept"""
+        spelling = {}
+        for col in df.columns:
+            spelling.setdefault(header_key(col), col)
+        return spelling
+
+    @staticmethod
+    def _align_columns(df, spelling):
+        """Rename a sheet's columns to the first sheet's spelling of the same header ({header_key: column})"""
+        renames = {}
+        for col in df.columns:
+            target = spelling.get(header_key(col))
+            # Never merge two of the sheet's own columns into one
+            if target is not None and target not in renames.values() and (target == col or target not in df.columns):
+                renames[col] = target
+        return df.rename(columns=renames)
+
+    def _mappable(self, df):
+        """The file's columns that map to SFLF fields (all but the sheet provenance column)"""
+        return df.drop(columns=[SHEET_COLUMN], errors='ignore')
+
     def map_columns(self, df):
-        """Map column names using synonyms and AI"""
+        """Map column names jointly using synonyms, header keywords and column contents"""
         column_mappings = {}
         
-        for col in df.columns:
-            # Convert to string to handle integer column names
-            col_str = str(col)
-            col_lower = col_str.lower().strip()
-            
-            # First try synonym lookup
-            synonym = ColumnSynonym.objects.filter(synonym__iexact=col_lower).first()
-            if synonym:
-                mapped_col = synonym.standard_name
-                confidence = 1.0
-                self.log_message('info', f"Column '{col}' mapped to '{mapped_col}' via synonym")
-            else:
-                # Try fuzzy matching
-                mapped_col, confidence = self._fuzzy_map_column(col)
-                if not mapped_col:
-                    mapped_col = col_str  # Keep original if no mapping found
-                    confidence = 0.0
-                    self.log_message('warning', f"No mapping found for column '{col}'")
-            
+        profiles = self.column_profiles(df)
+        df = self._mappable(df)
+        matches = ColumnMatcher(self.sflf_columns).assign(df, profiles=profiles)
+        for col, match in matches.items():
+            mapped_col, confidence = self._log_column_match(col, match)
             column_mappings[col] = mapped_col
             
             # Store mapping in database
@@ -263,12 +413,63 @@ class FOIANormalizer:
                 defaults={
                     'mapped_column': mapped_col,
                     'confidence': confidence,
+                    'matched_synonym': self._synonym_key(match.synonym),
                     'user_confirmed': False
                 }
             )
         
         return column_mappings
     
+    def column_profiles(self, df):
+        """Value profiles of the file's mappable columns, kept in upload.metadata.
+        
+        Profiles only look at the leading rows (of every sheet, for combined
+        workbooks), so a peek and the full file give the same result and
+        later mapping runs reuse it.
+        """
+        sample = self._profile_sample(df)
+        columns = [str(col) for col in sample.columns]
+        cached = (self.upload.metadata or {}).get('column_profiles')
+        if cached and cached.get('columns') == columns:
+            return pd.DataFrame(cached['values'], index=columns, columns=PROFILE_FEATURES)
+        
+        profiles = profile_columns(sample, sample_rows=len(sample))
+        self.upload.metadata = self.upload.metadata or {}
+        self.upload.metadata['column_profiles'] = {
+            'columns': columns,
+            'values': profiles.round(4).values.tolist(),
+        }
+        if self.upload.pk:
+            self.upload.save(update_fields=['metadata'])
+        return profiles
+    
+    def _profile_sample(self, df):
+        """Rows to profile: the leading rows, split evenly over the sheets of a combined workbook.
+        
+        A column only one sheet fills then shows as sparse as it is, instead
+        of looking empty or full depending on which sheet comes first.
+        """
+        if SHEET_COLUMN not in df.columns:
+            return df.head(PROFILE_SAMPLE_ROWS)
+        per_sheet = -(-PROFILE_SAMPLE_ROWS // max(df[SHEET_COLUMN].nunique(), 1))
+        return self._mappable(df.groupby(SHEET_COLUMN, sort=False).head(per_sheet))
+    
+    def _log_column_match(self, col, match):
+        """Log a ColumnMatcher result; returns (mapped column, confidence)"""
+        if match.field is None:
+            if match.candidate:
+                self.log_message('warning', f"Column '{col}' left unmapped: '{match.candidate}' went to a better matching column")
+            else:
+                self.log_message('warning', f"No mapping found for column '{col}'")
+            return str(col), 0.0  # Keep original if no mapping found
+        if match.method == 'synonym':
+            self.log_message('info', f"Column '{col}' mapped to '{match.field}' via synonym")
+        elif match.method == 'content':
+            self.log_message('info', f"Column '{col}' mapped to '{match.field}' from its values (confidence: {match.confidence:.2f})")
+        else:
+            self.log_message('info', f"Fuzzy matched column '{col}' to '{match.field}' (confidence: {match.confidence:.2f})")
+        return match.field, match.confidence
+    
     def map_statuses(self, df, status_column):
         """Map status values using synonyms and AI"""
         if status_column not in df.columns:
@@ -276,25 +477,11 @@ class FOIANormalizer:
         
         status_mappings = {}
         unique_statuses = df[status_column].dropna().unique()
+        mapped = self._map_status_values(str(status).strip() for status in unique_statuses)
         
         for status in unique_statuses:
             status_str = str(status).strip()
-            status_lower = status_str.lower()
-            
-            # First try synonym lookup
-            synonym = StatusSynonym.objects.filter(synonym__iexact=status_lower).first()
-            if synonym:
-                mapped_status = synonym.standard_status
-                confidence = 1.0
-                self.log_message('info', f"Status '{status}' mapped to '{mapped_status}' via synonym")
-            else:
-                # Try fuzzy matching
-                mapped_status, confidence = self._fuzzy_map_status(status_str)
-                if not mapped_status:
-                    mapped_status = status_str  # Keep original if no mapping found
-                    confidence = 0.0
-                    self.log_message('warning', f"No mapping found for status '{status}'")
-            
+            mapped_status, confidence, synonym = mapped[status_str]
             status_mappings[status] = mapped_status
             
             # Store mapping in database
@@ -304,87 +491,172 @@ class FOIANormalizer:
                 defaults={
                     'mapped_status': mapped_status,
                     'confidence': confidence,
+                    'matched_synonym': synonym,
                     'user_confirmed': False
                 }
             )
         
         return status_mappings
     
-    def _fuzzy_map_column(self, column_name):
-        """Use fuzzy matching to map column name"""
-        # Convert to string if it's not already (handles integer column names)
-        column_str = str(column_name)
-        column_lower = column_str.lower().strip()
-        
-        # Direct keyword matching with confidence scores
-        keyword_mappings = {
-            'request id': ['id', 'number', 'tracking', 'control', 'case', 'ref'],
-            'requester': ['name', 'requester', 'requestor', 'from', 'who'],
-            'requester organization': ['org', 'company', 'affiliation', 'entity'],
-            'subject': ['subject', 'description', 'request', 'topic', 'about'],
-            'date requested': ['requested', 'received', 'submitted', 'date_req'],
-            'date perfected': ['perfected', 'complete', 'perfection'],
-            'date completed': ['completed', 'closed', 'resolved', 'finished'],
-            'status': ['status', 'state', 'disposition', 'outcome'],
-            'exemptions cited': ['exemption', 'withhold', 'redact', 'b('],
-            'fee category': ['fee_cat', 'category', 'fee_type'],
-            'fee waiver': ['waiver', 'fee_waiv', 'discount'],
-            'fees charged': ['fee', 'cost', 'charge', 'amount', 'paid'],
-            'processed under privacy act': ['privacy', 'privacy_act']
+    def _map_status_values(self, values):
+        """Map status values together; returns {value: (mapped status, confidence, synonym)}.
+        
+        Exact synonyms are looked up in one query, the rest are scored by the
+        trained status classifier in one batch, and values it isn't sure of
+        fall back to keyword and fuzzy matching. ``synonym`` is the synonym
+        the value was matched by, or '' if none was.
+        """
+        values = list(dict.fromkeys(values))
+        synonyms = dict(
+            StatusSynonym.objects
+            .annotate(key=Lower('synonym'))
+            .filter(key__in={value.lower() for value in values})
+            .values_list('key', 'standard_status')
+        )
+        results = {}
+        unresolved = []
+        for value in values:
+            if value.lower() in synonyms:
+                results[value] = (synonyms[value.lower()], 1.0, self._synonym_key(value))
+                self.log_message('info', f"Status '{value}' mapped to '{results[value][0]}' via synonym")
+            else:
+                unresolved.append(value)
+        
+        classifier = status_classifier()
+        if classifier and unresolved:
+            predictions = classifier.predict(unresolved)
+            remaining = []
+            for value, (mapped_status, probability) in zip(unresolved, predictions):
+                if probability >= STATUS_CLASSIFIER_MIN_PROBABILITY:
+                    results[value] = (mapped_status, round(probability * 0.9, 3), '')
+                    self.log_message('info', f"Classified status '{value}' as '{mapped_status}' (confidence: {results[value][1]:.2f})")
+                else:
+                    remaining.append(value)
+            unresolved = remaining
+        
+        for value in unresolved:
+            mapped_status, confidence, synonym = self._fuzzy_map_status(value)
+            if not mapped_status:
+                self.log_message('warning', f"No mapping found for status '{value}'")
+                mapped_status, confidence = value, 0.0  # Keep original if no mapping found
+            results[value] = (mapped_status, confidence, synonym)
+        return results
+    
+    @staticmethod
+    def _synonym_key(synonym):
+        """A matched synonym as stored on mappings (see renormalize.request_renormalization)"""
+        return str(synonym or '').lower().strip()[:255]
+    
+    def refresh_mappings(self, df):
+        """Re-map columns and statuses the user hasn't confirmed against the current synonyms.
+        
+        Confirmed mappings are left alone. Status values in a (possibly newly
+        mapped) status column that have no mapping yet are mapped too.
+        Returns the number of mappings added or changed.
+        """
+        changed = 0
+        confirmed = dict(
+            self.upload.column_mappings.filter(user_confirmed=True).values_list('original_column', 'mapped_column')
+        )
+        profiles = self.column_profiles(df)
+        df = self._mappable(df)
+        matches = {
+            str(col): match
+            for col, match in ColumnMatcher(self.sflf_columns).assign(
+                df, fixed=confirmed, profiles=profiles
+            ).items()
+        }
+        for mapping in self.upload.column_mappings.filter(user_confirmed=False):
+            if mapping.original_column not in matches:
+                continue
+            match = matches[mapping.original_column]
+            mapped_col, confidence = self._log_column_match(mapping.original_column, match)
+            synonym = self._synonym_key(match.synonym)
+            if mapped_col != mapping.mapped_column or synonym != mapping.matched_synonym:
+                if mapped_col != mapping.mapped_column:
+                    changed += 1
+                mapping.mapped_column = mapped_col
+                mapping.confidence = confidence
+                mapping.matched_synonym = synonym
+                mapping.save()
+        
+        unconfirmed = list(self.upload.status_mappings.filter(user_confirmed=False))
+        mapped = self._map_status_values(mapping.original_status for mapping in unconfirmed)
+        for mapping in unconfirmed:
+            mapped_status, confidence, synonym = mapped[mapping.original_status]
+            if mapped_status != mapping.mapped_status or synonym != mapping.matched_synonym:
+                if mapped_status != mapping.mapped_status:
+                    changed += 1
+                mapping.mapped_status = mapped_status
+                mapping.confidence = confidence
+                mapping.matched_synonym = synonym
+                mapping.save()
+        
+        changed += self.map_missing_statuses(df)
+        
+        self.log_message('info', f"Refreshed mappings against current synonyms: {changed} changed")
+        return changed
+    
+    def map_missing_statuses(self, df):
+        """Map status values in the status column(s) that have no mapping yet.
+        
+        Mappings made during review may only have seen a peek of the file;
+        this fills in values that first appear further down. Returns the
+        number of mappings added.
+        """
+        status_columns = self.upload.column_mappings.filter(mapped_column='status').values_list('original_column', flat=True)
+        known = set(self.upload.status_mappings.values_list('original_status', flat=True))
+        missing = []
+        for col in status_columns:
+            if col not in df.columns:
+                continue
+            for status in df[col].dropna().unique():
+                status_str = str(status).strip()
+                if status_str not in known:
+                    missing.append(status_str)
+                    known.add(status_str)
+        
+        for status_str, (mapped_status, confidence, synonym) in self._map_status_values(missing).items():
+            StatusMapping.objects.create(
+                upload=self.upload,
+                original_status=status_str,
+                mapped_status=mapped_status,
+                confidence=confidence,
+                matched_synonym=synonym
+            )
+        return len(missing)
+    
+    def file_statistics(self, df):
+        """Whole-file numbers for the review page that a peek can't give"""
+        status_keywords = ['status', 'state', 'disposition', 'outcome', 'result']
+        potential_status_values = {}
+        for col in df.columns:
+            if any(keyword in str(col).lower() for keyword in status_keywords):
+                unique_values = df[col].dropna().unique()
+                if 0 < len(unique_values) < 50:  # Reasonable number of statuses
+                    potential_status_values[col] = [str(value) for value in unique_values]
+        return {
+            'total_rows': len(df),
+            'empty_rows': int(df.isnull().all(axis=1).sum()),
+            'potential_status_values': potential_status_values,
         }
-        
-        # First try exact keyword matching
-        for sflf_col, keywords in keyword_mappings.items():
-            for keyword in keywords:
-                if keyword in column_lower:
-                    confidence = 0.9 if keyword == column_lower else 0.7
-                    self.log_message('info', f"Fuzzy matched column '{column_name}' to '{sflf_col}' (confidence: {confidence})")
-                    return sflf_col, confidence
-        
-        # Try fuzzy string matching
-        best_match = None
-        best_ratio = 0
-        
-        for sflf_col in self.sflf_columns:
-            ratio = difflib.SequenceMatcher(None, column_lower, sflf_col.lower()).ratio()
-            if ratio > best_ratio and ratio > 0.6:  # 60% similarity threshold
-                best_match = sflf_col
-                best_ratio = ratio
-        
-        if best_match:
-            confidence = best_ratio * 0.8  # Scale down confidence for fuzzy matches
-            self.log_message('info', f"Fuzzy matched column '{column_name}' to '{best_match}' (confidence: {confidence:.2f})")
-            return best_match, confidence
-        
-        return None, 0.0
     
     def _fuzzy_map_status(self, status_value):
-        """Use fuzzy matching to map status value"""
+        """Use fuzzy matching to map status value; returns (status, confidence, matched synonym)"""
         # Convert to string if it's not already
-        status_str = str(status_value)
-        status_lower = status_str.lower().strip()
-        
-        # Direct keyword mapping
-        status_mappings = {
-            'processed': ['processing', 'in process', 'pending', 'open', 'active'],
-            'appealing': ['appeal', 'appealed', 'under appeal'],
-            'fix': ['fix', 'clarification', 'need info', 'incomplete'],
-            'payment': ['payment', 'fee', 'invoice', 'billing'],
-            'lawsuit': ['lawsuit', 'litigation', 'court', 'legal'],
-            'rejected': ['rejected', 'denied', 'reject', 'denial'],
-            'no_docs': ['no docs', 'no records', 'no responsive', 'nothing found'],
-            'done': ['done', 'complete', 'closed', 'fulfilled'],
-            'partial': ['partial', 'partially', 'some records'],
-            'abandoned': ['abandoned', 'withdrawn', 'cancelled', 'closed by requester']
-        }
+        status_lower = str(status_value).lower().strip()
         
-        # First try exact keyword matching
-        for sflf_status, keywords in status_mappings.items():
-            for keyword in keywords:
-                if keyword in status_lower or status_lower in keyword:
-                    confidence = 0.9 if keyword == status_lower else 0.7
-                    self.log_message('info', f"Fuzzy matched status '{status_value}' to '{sflf_status}' (confidence: {confidence})")
-                    return sflf_status, confidence
+        best_match, confidence, synonym = status_memo.get_or_compute(status_lower, self._fuzzy_status_match)
+        if best_match:
+            self.log_message('info', f"Fuzzy matched status '{status_value}' to '{best_match}' (confidence: {confidence:.2f})")
+        return best_match, confidence, self._synonym_key(synonym)
+    
+    def _fuzzy_status_match(self, status_lower):
+        """(status, confidence, synonym) for a lowercased status value; memoized per process"""
+        # Keyword rules and synonym phrases, longest match first
+        hit = keyword_matchers()[1].best(status_lower)
+        if hit:
+            return hit.target, hit.score, hit.phrase if hit.method == 'synonym' else ''
         
         # Try fuzzy string matching
         best_match = None
@@ -399,11 +671,8 @@ class FOIANormalizer:
                 best_ratio = ratio
         
         if best_match:
-            confidence = best_ratio * 0.8  # Scale down confidence for fuzzy matches
-            self.log_message('info', f"Fuzzy matched status '{status_value}' to '{best_match}' (confidence: {confidence:.2f})")
-            return best_match, confidence
-        
-        return None, 0.0
+            return best_match, best_ratio * 0.8, ''  # Scale down confidence for fuzzy matches
+        return None, 0.0, ''
     
     def normalize_dataframe(self, df, column_mappings, status_mappings):
         """Apply mappings to create normalized DataFrame"""
@@ -422,23 +691,35 @@ class FOIANormalizer:
                 # Handle multiple status columns with priority
                 self._handle_multiple_status_columns(df, df_normalized, status_columns, status_mappings)
             else:
-                # Find which original column maps to this SFLF column
-                source_col = None
-                for orig_col, mapped_col in column_mappings.items():
-                    if mapped_col == sflf_col:
-                        source_col = orig_col
-                        break
+                # Find which original column(s) map to this SFLF column
+                source_cols = [
+                    orig_col for orig_col, mapped_col in column_mappings.items()
+                    if mapped_col == sflf_col and orig_col in df.columns
+                ]
+                source_col = source_cols[0] if source_cols else None
+                source_data = df[source_col] if source_col is not None else None
                 
-                if source_col and source_col in df.columns:
+                if sflf_col == NAME_PART_FIELD and len(source_cols) > 1:
+                    full_names = [col for col in source_cols if name_part_rank(col) is None]
+                    if full_names:
+                        source_col = full_names[0]
+                        source_data = df[source_col]
+                    else:
+                        # Join "First Name" / "Last Name" style columns into one requester
+                        name_parts = sorted(source_cols, key=name_part_rank)
+                        source_col = ' + '.join(str(col) for col in name_parts)
+                        joined = df[name_parts].fillna('').astype(str).agg(' '.join, axis=1).str.split().str.join(' ')
+                        source_data = joined.mask(joined == '')
+                
+                if source_col is not None:
                     # Check if the source column has any meaningful data
-                    source_data = df[source_col]
                     non_empty_count = source_data.count()  # Counts non-null values
                     non_whitespace_count = sum(1 for val in source_data if pd.notna(val) and str(val).strip())
                     
                     # Only include column if it has meaningful data
                     if non_empty_count > 0 and non_whitespace_count > 0:
                         # Copy data from source column
-                        df_normalized[sflf_col] = df[source_col]
+                        df_normalized[sflf_col] = source_data
                         
                         self.log_message('info', f'Included column "{sflf_col}" with {non_whitespace_count} data values')
                     else:
@@ -448,6 +729,9 @@ class FOIANormalizer:
         # Add metadata fields from upload instance
         self._add_metadata_columns(df_normalized)
         
+        if SHEET_COLUMN in df.columns:
+            df_normalized[SHEET_COLUMN] = df[SHEET_COLUMN]
+        
         return df_normalized
     
     def _handle_multiple_status_columns(self, df, df_normalized, status_columns, status_mappings):
@@ -516,16 +800,21 @@ class FOIANormalizer:
             df_normalized['time period of log'] = time_period
             self.log_message('info', 'Added time period metadata column')
     
-    def generate_preview_data(self, df, column_mappings, max_rows=5):
-        """Generate preview data showing original vs mapped columns with sample data"""
+    def generate_preview_data(self, df, column_mappings, max_rows=5, file_stats=None):
+        """Generate preview data showing original vs mapped columns with sample data
+        
+        ``df`` may be a peek of the file; row totals then come from
+        ``file_stats`` (see file_statistics) or are left as None for the page
+        to fetch.
+        """
         preview_data = {
             'column_mappings': [],
             'sample_data': [],
             'statistics': {
-                'total_rows': len(df),
+                'total_rows': file_stats['total_rows'] if file_stats else None,
                 'total_columns': len(df.columns),
                 'mapped_columns': len([m for m in column_mappings.values() if m != m.lower().replace(' ', '_')]),
-                'empty_rows': df.isnull().all(axis=1).sum(),
+                'empty_rows': file_stats['empty_rows'] if file_stats else None,
                 'will_include_columns': 0,
                 'will_skip_columns': 0,
                 'unmapped_columns': len([m for m in column_mappings.values() if m == column_mappings.get(m, m)])
@@ -585,20 +874,144 @@ class FOIANormalizer:
         
         return preview_data
     
+    def file_sha256(self):
+        """SHA-256 of the uploaded file's content, read in 1MB blocks"""
+        digest = hashlib.sha256()
+        with open(self.upload.file.path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def output_fingerprint(self):
+        """Hash of everything the normalized output depends on.
+        
+        Covers the file content, the stored column and status mappings, the
+        status column priority, the metadata columns copied from the upload
+        and NORMALIZER_VERSION.
+        """
+        upload = self.upload
+        payload = {
+            'version': NORMALIZER_VERSION,
+            'file': self.file_sha256(),
+            'columns': sorted(
+                [str(original), mapped]
+                for original, mapped in upload.column_mappings.values_list('original_column', 'mapped_column')
+            ),
+            'statuses': sorted(
+                [str(original), mapped]
+                for original, mapped in upload.status_mappings.values_list('original_status', 'mapped_status')
+            ),
+            'status_column_priority': (upload.metadata or {}).get('status_column_priority'),
+            'metadata': [upload.source, upload.agency, upload.time_period_start, upload.time_period_end],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
+    def output_is_current(self, fingerprint):
+        """True when the stored output was built from exactly these inputs and still exists"""
+        upload = self.upload
+        return bool(
+            upload.output_fingerprint
+            and upload.output_fingerprint == fingerprint
+            and upload.output_file
+            and os.path.exists(upload.output_file.path)
+        )
+    
     def save_normalized_file(self, df_normalized):
-        """Save normalized DataFrame as CSV"""
-        output_filename = f"normalized_{os.path.splitext(self.upload.filename)[0]}.csv"
+        """Save normalized DataFrame as gzip-compressed CSV (plus a Parquet copy when pyarrow is available)"""
+        output_basename = f"normalized_{os.path.splitext(self.upload.filename)[0]}"
+        output_filename = f"{output_basename}.csv.gz"
         output_path = os.path.join(settings.MEDIA_ROOT, 'outputs', output_filename)
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        df_normalized.to_csv(output_path, index=False)
+        # A fixed gzip mtime keeps the bytes identical for identical output
+        df_normalized.to_csv(output_path, index=False, compression={'method': 'gzip', 'mtime': 0})
         
         # Update upload record
         self.upload.output_file.name = f'outputs/{output_filename}'
         self.upload.processed = True
+        
+        parquet_filename = self.save_parquet_file(df_normalized, output_basename)
+        self.upload.parquet_file.name = f'outputs/{parquet_filename}' if parquet_filename else None
         self.upload.save()
         
         self.log_message('info', f"Normalized file saved as {output_filename}")
-        return output_path
\ No newline at end of file
+        return output_path
+    
+    def save_turnaround_sketches(self, df_normalized):
+        """Store per-year quantile sketches of turnaround days (date completed - date requested)"""
+        TurnaroundSketch.objects.filter(upload=self.upload).delete()
+        if 'date requested' not in df_normalized.columns or 'date completed' not in df_normalized.columns:
+            return 0
+        
+        requested = parse_sflf_dates(df_normalized['date requested'])
+        completed = parse_sflf_dates(df_normalized['date completed'])
+        days = (completed - requested).dt.days
+        valid = days.notna() & (days >= 0)
+        if not valid.any():
+            return 0
+        
+        turnaround = pd.DataFrame({'year': requested[valid].dt.year, 'days': days[valid]})
+        sketches = [
+            TurnaroundSketch(
+                upload=self.upload,
+                agency=self.upload.agency,
+                canonical_agency_id=self.upload.canonical_agency_id,
+                year=int(year),
+                count=len(group),
+                digest=TDigest.from_values(group['days'].to_numpy()).to_bytes()
+            )
+            for year, group in turnaround.groupby('year')
+        ]
+        TurnaroundSketch.objects.bulk_create(sketches)
+        
+        self.log_message('info', f"Stored turnaround sketches for {int(valid.sum())} completed requests across {len(sketches)} years")
+        return len(sketches)
+    
+    def build_parquet_table(self, df_normalized):
+        """Convert a normalized DataFrame into an Arrow table with the explicit SFLF schema"""
+        fields = []
+        arrays = []
+        for col in df_normalized.columns:
+            kind = SFLF_PARQUET_TYPES.get(col, 'string')
+            values = df_normalized[col]
+            
+            if kind == 'date':
+                parsed = parse_sflf_dates(values)
+                fields.append(pa.field(col, pa.date32()))
+                arrays.append(pa.array(parsed.dt.date, type=pa.date32(), from_pandas=True))
+            elif kind == 'decimal':
+                # Same precision as NormalizedRecord.fees_charged; amounts that don't fit become nulls
+                amounts = parse_sflf_amounts(values).round(2)
+                amounts = amounts.where(amounts.abs() < 1e12)
+                fields.append(pa.field(col, FEES_PARQUET_TYPE))
+                arrays.append(pa.array(
+                    [None if pd.isna(v) else Decimal(f'{v:.2f}') for v in amounts], type=FEES_PARQUET_TYPE
+                ))
+            else:
+                text = values.astype('string').str.strip()
+                fields.append(pa.field(col, pa.string()))
+                arrays.append(pa.array(text.replace('', pd.NA), type=pa.string(), from_pandas=True))
+        
+        schema = pa.schema(fields, metadata={b'sflf_version': b'1.5.0'})
+        return pa.Table.from_arrays(arrays, schema=schema)
+    
+    def save_parquet_file(self, df_normalized, output_basename):
+        """Write a zstd-compressed Parquet copy of the normalized output next to the CSV"""
+        if pa is None:
+            self.log_message('warning', 'pyarrow is not installed; skipping Parquet output')
+            return None
+        
+        parquet_filename = f"{output_basename}.parquet"
+        parquet_path = os.path.join(settings.MEDIA_ROOT, 'outputs', parquet_filename)
+        
+        try:
+            table = self.build_parquet_table(df_normalized)
+            pq.write_table(table, parquet_path, compression='zstd')
+        except Exception as e:
+            self.log_message('warning', f"Parquet output failed: {str(e)}. CSV output is unaffected.")
+            return None
+        
+        self.log_message('info', f"Parquet copy saved as {parquet_filename}")
+        return parquet_filename
\ No newline at end of file
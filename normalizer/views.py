@@ -1,18 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse, FileResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header
 from django.db.models import Q, Count, F
-from .models import FOIAUpload, ColumnMapping, StatusMapping, ProcessingLog, ContributorStats
+from django.db import transaction
+from .models import FOIAUpload, ColumnMapping, StatusMapping, ProcessingLog, ContributorStats, NormalizedRecord
 from .forms import FileUploadForm, ApprovalForm
 from .utils import FOIANormalizer
+from .streaming import iter_file_chunks, iter_zip_stream
+from .corpus import CorpusStore, publish_upload, retract_upload
+from .search import RecordSearch
+from .agencies import autocomplete_agencies, resolve_agency
+from .analytics import analytics_summary, requester_summary, turnaround_summary
+from .dedup import DuplicateIndex
+from .exports import EXPORT_FORMATS, ExportError, RecordExport
+import csv
+import io
 import json
 import os
 
+# Rows read to render the review page; totals are fetched separately
+REVIEW_PEEK_ROWS = 200
+REVIEW_SAMPLE_TIMEOUT = 60 * 60
+REVIEW_PREVIEW_ROWS = 10
+
 
 def home(request):
     """Home page with upload interface"""
@@ -44,6 +64,8 @@ def upload_file(request):
             upload = form.save(commit=False)
             if request.user.is_authenticated:
                 upload.uploaded_by = request.user
+            # Keep the agency as submitted; the directory match is recorded alongside it
+            upload.canonical_agency = resolve_agency(upload.agency)
             upload.save()
             
             # Update contributor stats if username provided
@@ -73,6 +95,16 @@ def upload_file(request):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+def _review_sample(upload):
+    """The peeked leading rows of an upload, cached so previews don't re-read the file"""
+    key = f'normalizer:review-sample:{upload.id}'
+    df = cache.get(key)
+    if df is None:
+        df = FOIANormalizer(upload, log=False).load_file(nrows=REVIEW_PEEK_ROWS)
+        cache.set(key, df, REVIEW_SAMPLE_TIMEOUT)
+    return df
+
+
 def manual_review(request, upload_id):
     """AI-assisted manual review interface for column and status mappings"""
     upload = get_object_or_404(FOIAUpload, id=upload_id)
@@ -169,18 +201,21 @@ def manual_review(request, upload_id):
         except Exception as e:
             messages.error(request, f'Error processing file: {str(e)}')
     
-    # Initial AI-assisted processing to get mappings and preview data
+    # Render from a peek at the leading rows. Whole-file statistics come from
+    # review_statistics, which caches them in upload.metadata.
     preview_data = None
-    if not upload.column_mappings.exists():
-        try:
-            normalizer = FOIANormalizer(upload)
-            df = normalizer.load_file()
+    potential_status_values = {}
+    file_stats = (upload.metadata or {}).get('file_stats')
+    try:
+        normalizer = FOIANormalizer(upload)
+        df = _review_sample(upload)
+        
+        if not upload.column_mappings.exists():
+            # Initial AI-assisted mapping
             column_mappings = normalizer.map_columns(df)
             
-            # Generate preview data for the UI
-            preview_data = normalizer.generate_preview_data(df, column_mappings)
-            
-            # Find status column and map statuses
+            # Find status column and map statuses (values past the peek are
+            # mapped when the upload is processed)
             status_col = None
             for mapping in upload.column_mappings.all():
                 if mapping.mapped_column == 'status':
@@ -189,39 +224,17 @@ def manual_review(request, upload_id):
             
             if status_col:
                 normalizer.map_statuses(df, status_col)
-        
-        except Exception as e:
-            messages.error(request, f'Error analyzing file: {str(e)}')
-    else:
-        # Generate preview data from existing mappings
-        try:
-            normalizer = FOIANormalizer(upload)
-            df = normalizer.load_file()
+        else:
             column_mappings = {}
             for mapping in upload.column_mappings.all():
                 column_mappings[mapping.original_column] = mapping.mapped_column
-            preview_data = normalizer.generate_preview_data(df, column_mappings)
-        except Exception as e:
-            messages.warning(request, f'Could not generate preview: {str(e)}')
-    
-    # Get all unique status values from potential status columns
-    potential_status_values = {}
-    try:
-        normalizer = FOIANormalizer(upload)
-        df = normalizer.load_file()
         
-        # Look for columns that might contain status values
-        status_keywords = ['status', 'state', 'disposition', 'outcome', 'result']
-        for col in df.columns:
-            col_lower = str(col).lower()
-            if any(keyword in col_lower for keyword in status_keywords):
-                # Get unique values from this column
-                unique_values = df[col].dropna().unique()
-                if len(unique_values) > 0 and len(unique_values) < 50:  # Reasonable number of statuses
-                    potential_status_values[col] = list(unique_values)
+        # Generate preview data for the UI
+        preview_data = normalizer.generate_preview_data(df, column_mappings, file_stats=file_stats)
+        potential_status_values = (file_stats or normalizer.file_statistics(df))['potential_status_values']
+    
     except Exception as e:
-        # Continue without status value detection
-        pass
+        messages.error(request, f'Error analyzing file: {str(e)}')
     
     column_mappings = upload.column_mappings.all()
     status_mappings = upload.status_mappings.all()
@@ -250,6 +263,64 @@ def manual_review(request, upload_id):
     })
 
 
+def review_preview(request, upload_id):
+    """Normalized sample rows for the mappings currently selected on the review page"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    upload = get_object_or_404(FOIAUpload, id=upload_id)
+    try:
+        payload = json.loads(request.body or '{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    
+    columns = payload.get('columns') or {}
+    statuses = payload.get('statuses') or {}
+    priority = payload.get('status_column_priority') or []
+    if not isinstance(columns, dict) or not isinstance(statuses, dict) or not isinstance(priority, list):
+        return JsonResponse({'success': False, 'error': 'Invalid mappings'}, status=400)
+    
+    try:
+        df = _review_sample(upload)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': f'Could not read file: {str(e)}'}, status=500)
+    
+    column_mappings = {str(original): mapped for original, mapped in columns.items() if mapped}
+    for col in priority:
+        column_mappings[str(col)] = 'status'
+    status_mappings = {str(original): mapped for original, mapped in statuses.items()}
+    
+    # Apply the priority order without saving it
+    upload.metadata = {**(upload.metadata or {}), 'status_column_priority': [str(col) for col in priority]}
+    normalizer = FOIANormalizer(upload, log=False)
+    df_normalized = normalizer.normalize_dataframe(df, column_mappings, status_mappings)
+    preview = df_normalized.head(REVIEW_PREVIEW_ROWS)
+    rows = preview.astype(object).where(preview.notna(), '')
+    
+    return JsonResponse({
+        'success': True,
+        'columns': list(df_normalized.columns),
+        'rows': [[str(value) for value in row] for row in rows.itertuples(index=False)],
+        'sample_rows': len(df),
+    })
+
+
+def review_statistics(request, upload_id):
+    """Whole-file row counts and status values for the review page, computed once and cached"""
+    upload = get_object_or_404(FOIAUpload, id=upload_id)
+    stats = (upload.metadata or {}).get('file_stats')
+    if stats is None:
+        try:
+            normalizer = FOIANormalizer(upload, log=False)
+            stats = normalizer.file_statistics(normalizer.load_file())
+        except Exception as e:
+            return JsonResponse({'error': f'Could not read file: {str(e)}'}, status=500)
+        upload.metadata = upload.metadata or {}
+        upload.metadata['file_stats'] = stats
+        upload.save(update_fields=['metadata'])
+    return JsonResponse(stats)
+
+
 @login_required
 def submission_queue(request):
     """Queue of pending submissions for authenticated users to review"""
@@ -286,37 +357,41 @@ def approve_submission(request, upload_id):
             action = form.cleaned_data['action']
             rejection_reason = form.cleaned_data.get('rejection_reason', '')
             
-            upload.reviewed_by = request.user
-            upload.reviewed_at = timezone.now()
+            # Corpus rows, rollups and the new status are saved together or not at all
+            with transaction.atomic():
+                upload.reviewed_by = request.user
+                upload.reviewed_at = timezone.now()
             
-            if action == 'approve':
-                upload.submission_status = 'approved'
-                messages.success(request, 'Submission approved successfully!')
+                if action == 'approve':
+                    upload.submission_status = 'approved'
+                    publish_upload(upload)
+                    messages.success(request, 'Submission approved successfully!')
                 
-                # Update contributor stats
-                if upload.submitter_username:
-                    contributor, created = ContributorStats.objects.get_or_create(
-                        username=upload.submitter_username,
-                        defaults={'email': upload.submitter_email}
-                    )
-                    contributor.approved_count = F('approved_count') + 1
-                    contributor.save()
+                    # Update contributor stats
+                    if upload.submitter_username:
+                        contributor, created = ContributorStats.objects.get_or_create(
+                            username=upload.submitter_username,
+                            defaults={'email': upload.submitter_email}
+                        )
+                        contributor.approved_count = F('approved_count') + 1
+                        contributor.save()
                     
-            else:  # reject
-                upload.submission_status = 'rejected'
-                upload.rejection_reason = rejection_reason
-                messages.info(request, 'Submission rejected.')
+                else:  # reject
+                    upload.submission_status = 'rejected'
+                    upload.rejection_reason = rejection_reason
+                    retract_upload(upload)
+                    messages.info(request, 'Submission rejected.')
                 
-                # Update contributor stats
-                if upload.submitter_username:
-                    contributor, created = ContributorStats.objects.get_or_create(
-                        username=upload.submitter_username,
-                        defaults={'email': upload.submitter_email}
-                    )
-                    contributor.rejected_count = F('rejected_count') + 1
-                    contributor.save()
+                    # Update contributor stats
+                    if upload.submitter_username:
+                        contributor, created = ContributorStats.objects.get_or_create(
+                            username=upload.submitter_username,
+                            defaults={'email': upload.submitter_email}
+                        )
+                        contributor.rejected_count = F('rejected_count') + 1
+                        contributor.save()
             
-            upload.save()
+                upload.save()
             return redirect('submission_queue')
     else:
         form = ApprovalForm()
@@ -419,6 +494,39 @@ def file_list(request):
     })
 
 
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip: named, or covered by "*", with a q-value above 0"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0))) > 0
+
+
+def _output_file_validator(request, upload_id):
+    """ETag for an approved upload's normalized output, based on the stored file"""
+    upload = FOIAUpload.objects.filter(id=upload_id, submission_status='approved').first()
+    if not upload or not upload.output_file:
+        return None
+    try:
+        stat = os.stat(upload.output_file.path)
+    except OSError:
+        return None
+    # Weak, since the same output can be sent gzip-encoded or decoded
+    return f'W/"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+@condition(etag_func=_output_file_validator)
 def download_file(request, upload_id):
     """Download processed file (only approved submissions)"""
     try:
@@ -433,11 +541,34 @@ def download_file(request, upload_id):
             return redirect('file_detail', upload_id=upload.id)
         
         try:
-            response = FileResponse(
-                upload.output_file.open('rb'),
-                as_attachment=True,
-                filename=os.path.basename(upload.output_file.name)
-            )
+            stored_name = os.path.basename(upload.output_file.name)
+            if not stored_name.endswith('.gz'):
+                # Outputs written before compressed storage are served as-is
+                return FileResponse(
+                    upload.output_file.open('rb'),
+                    as_attachment=True,
+                    filename=stored_name
+                )
+            
+            filename = stored_name[:-len('.gz')]
+            if _accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+                response = FileResponse(
+                    upload.output_file.open('rb'),
+                    as_attachment=True,
+                    filename=filename,
+                    content_type='text/csv'
+                )
+                response['Content-Encoding'] = 'gzip'
+            else:
+                if not os.path.exists(upload.output_file.path):
+                    raise FileNotFoundError(upload.output_file.path)
+                response = StreamingHttpResponse(
+                    iter_file_chunks(upload.output_file.path),
+                    content_type='text/csv'
+                )
+                response['Content-Disposition'] = content_disposition_header(True, filename)
+            
+            patch_vary_headers(response, ('Accept-Encoding',))
             return response
         except FileNotFoundError:
             messages.error(request, 'Processed file not found.')
@@ -447,6 +578,255 @@ def download_file(request, upload_id):
         return redirect('file_list')
 
 
+def download_parquet(request, upload_id):
+    """Download the Parquet copy of a processed file (only approved submissions)"""
+    upload = get_object_or_404(
+        FOIAUpload,
+        id=upload_id,
+        submission_status='approved'
+    )
+    
+    if not upload.parquet_file:
+        messages.error(request, 'No Parquet output is available for this file.')
+        return redirect('file_detail', upload_id=upload.id)
+    
+    try:
+        return FileResponse(
+            upload.parquet_file.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(upload.parquet_file.name),
+            content_type='application/vnd.apache.parquet'
+        )
+    except FileNotFoundError:
+        messages.error(request, 'Parquet file not found.')
+        return redirect('file_detail', upload_id=upload.id)
+
+
+BUNDLE_MANIFEST_FIELDS = [
+    'upload_id', 'filename', 'agency', 'source', 'time_period_start',
+    'time_period_end', 'uploaded_at', 'reviewed_at', 'submitter_username', 'included'
+]
+
+
+def _iter_bundle_entries(uploads):
+    """Yield zip entries for each upload's normalized output, followed by a manifest"""
+    manifest_rows = []
+    for upload in uploads.iterator():
+        stored_name = os.path.basename(upload.output_file.name)
+        entry_name = f"{upload.id}_{stored_name[:-len('.gz')] if stored_name.endswith('.gz') else stored_name}"
+        path = upload.output_file.path
+        included = os.path.exists(path)
+        
+        manifest_rows.append({
+            'upload_id': upload.id,
+            'filename': entry_name if included else '',
+            'agency': upload.agency,
+            'source': upload.source,
+            'time_period_start': upload.time_period_start or '',
+            'time_period_end': upload.time_period_end or '',
+            'uploaded_at': upload.uploaded_at.isoformat(),
+            'reviewed_at': upload.reviewed_at.isoformat() if upload.reviewed_at else '',
+            'submitter_username': upload.submitter_username,
+            'included': 'yes' if included else 'missing output',
+        })
+        if included:
+            yield entry_name, iter_file_chunks(path)
+    
+    manifest = io.StringIO()
+    writer = csv.DictWriter(manifest, fieldnames=BUNDLE_MANIFEST_FIELDS)
+    writer.writeheader()
+    writer.writerows(manifest_rows)
+    yield 'manifest.csv', [manifest.getvalue().encode('utf-8')]
+
+
+def download_bundle(request):
+    """Stream a zip of approved normalized outputs selected by agency, log period or upload ids"""
+    uploads = FOIAUpload.objects.filter(
+        submission_status='approved',
+        processed=True
+    ).exclude(output_file='').exclude(output_file__isnull=True)
+    
+    agency = request.GET.get('agency', '').strip()
+    if agency:
+        canonical = resolve_agency(agency)
+        if canonical:
+            uploads = uploads.filter(Q(canonical_agency=canonical) | Q(agency__icontains=agency))
+        else:
+            uploads = uploads.filter(agency__icontains=agency)
+    
+    raw_ids = ','.join(request.GET.getlist('ids'))
+    if raw_ids:
+        try:
+            ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+        except ValueError:
+            messages.error(request, 'Upload ids must be numbers.')
+            return redirect('file_list')
+        uploads = uploads.filter(id__in=ids)
+    
+    # Date range selects logs whose covered period overlaps it
+    start = request.GET.get('start', '').strip()
+    end = request.GET.get('end', '').strip()
+    try:
+        start_date = parse_date(start) if start else None
+        end_date = parse_date(end) if end else None
+    except ValueError:
+        start_date = end_date = None
+    if (start and not start_date) or (end and not end_date):
+        messages.error(request, 'Dates must be in YYYY-MM-DD format.')
+        return redirect('file_list')
+    if start_date:
+        uploads = uploads.filter(time_period_end__gte=start_date)
+    if end_date:
+        uploads = uploads.filter(time_period_start__lte=end_date)
+    
+    if not uploads.exists():
+        messages.error(request, 'No approved files match the selected filters.')
+        return redirect('file_list')
+    
+    response = StreamingHttpResponse(
+        iter_zip_stream(_iter_bundle_entries(uploads.order_by('id'))),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = content_disposition_header(
+        True, f"foia_logs_{timezone.now():%Y%m%d}.zip"
+    )
+    return response
+
+
+def download_corpus(request):
+    """Stream the merged corpus of approved logs as one CSV (optionally one agency)"""
+    agency = request.GET.get('agency', '').strip()
+    response = StreamingHttpResponse(
+        CorpusStore().iter_csv(agency or None),
+        content_type='text/csv'
+    )
+    filename = f"foia_corpus_{CorpusStore.agency_key(agency)}.csv" if agency else 'foia_corpus.csv'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def export_records(request):
+    """Stream approved records matching the query filters as CSV, JSON Lines or Parquet"""
+    export_format = request.GET.get('format', 'csv').strip().lower()
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+    
+    try:
+        chunks = RecordExport(request.GET).stream(export_format)
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, f'foia_records.{extension}')
+    return response
+
+
+def agency_autocomplete(request):
+    """Canonical agencies matching a typed prefix, for the upload form"""
+    query = request.GET.get('q', '').strip()
+    agencies = autocomplete_agencies(query) if query else []
+    return JsonResponse({
+        'results': [
+            {'id': agency.id, 'source_id': agency.source_id, 'name': agency.name}
+            for agency in agencies
+        ]
+    })
+
+
+def search_records(request):
+    """Ranked full-text search over approved records' subjects and requesters"""
+    query = request.GET.get('q', '').strip()
+    agency = request.GET.get('agency', '').strip()
+    
+    paginator = Paginator(RecordSearch(query, agency=agency or None), 25)
+    page = paginator.get_page(request.GET.get('page'))
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'query': query,
+            'count': paginator.count,
+            'page': page.number,
+            'num_pages': paginator.num_pages,
+            'results': [
+                {
+                    'id': record.id,
+                    'upload_id': record.upload_id,
+                    'rank': record.rank,
+                    'agency': record.agency,
+                    'request_id': record.request_id,
+                    'requester': record.requester,
+                    'requester_organization': record.requester_organization,
+                    'subject': record.subject,
+                    'status': record.status,
+                    'date_requested': record.date_requested.isoformat() if record.date_requested else None,
+                }
+                for record in page.object_list
+            ],
+        })
+    
+    return render(request, 'normalizer/search.html', {
+        'query': query,
+        'agency': agency,
+        'page': page,
+    })
+
+
+def analytics(request):
+    """Cross-agency request statistics from the precomputed rollups"""
+    agency = request.GET.get('agency', '').strip()
+    return JsonResponse(analytics_summary(agency or None))
+
+
+def turnaround_analytics(request):
+    """Median and p90 days to completion, merged from per-upload sketches"""
+    agency = request.GET.get('agency', '').strip()
+    year = request.GET.get('year', '').strip()
+    if year and not year.isdigit():
+        return JsonResponse({'error': 'year must be a number'}, status=400)
+    return JsonResponse(turnaround_summary(agency or None, int(year) if year else None))
+
+
+def requester_analytics(request):
+    """Top requesters across the corpus, grouped by resolved requester cluster"""
+    agency = request.GET.get('agency', '').strip()
+    limit = request.GET.get('limit', '50').strip()
+    if not limit.isdigit():
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    return JsonResponse(requester_summary(agency or None, min(int(limit), 500)))
+
+
+def record_duplicates(request, record_id):
+    """Likely duplicates of one normalized record, found through the LSH index"""
+    record = get_object_or_404(NormalizedRecord, id=record_id)
+    duplicates = DuplicateIndex().likely_duplicates(record)
+    return JsonResponse({
+        'record_id': record.id,
+        'duplicates': [
+            {
+                'id': duplicate.id,
+                'upload_id': duplicate.upload_id,
+                'agency': duplicate.agency,
+                'request_id': duplicate.request_id,
+                'subject': duplicate.subject,
+                'requester': duplicate.requester,
+                'similarity': round(similarity, 3),
+            }
+            for duplicate, similarity in duplicates
+        ],
+    })
+
+
+def upload_duplicates(request, upload_id):
+    """Other approved uploads whose records look like this upload's records"""
+    upload = get_object_or_404(FOIAUpload, id=upload_id, submission_status='approved')
+    return JsonResponse({
+        'upload_id': upload.id,
+        'record_count': upload.records.count(),
+        'overlaps': DuplicateIndex().upload_overlap(upload),
+    })
+
+
 def process_upload(upload):
     """Process an upload using AI-assisted mappings"""
     from .models import ProcessingLog
@@ -460,6 +840,24 @@ def process_upload(upload):
         
         normalizer = FOIANormalizer(upload)
         
+        # Reuse the existing output if neither the file nor the mappings changed
+        fingerprint = None
+        if upload.column_mappings.exists():
+            fingerprint = normalizer.output_fingerprint()
+            if normalizer.output_is_current(fingerprint):
+                # The output stays, but only approved uploads keep rows in the corpus
+                if upload.submission_status != 'approved':
+                    retract_upload(upload)
+                ProcessingLog.objects.create(
+                    upload=upload,
+                    log_type='info',
+                    message='File and mappings unchanged since the last run; reusing the existing output'
+                )
+                return upload
+        
+        # Any previously published rows are stale once the upload is reprocessed
+        retract_upload(upload)
+        
         # Load the file
         df = normalizer.load_file()
         
@@ -487,6 +885,11 @@ def process_upload(upload):
                     message=f'Mapping status values from column: {status_col}'
                 )
                 normalizer.map_statuses(df, status_col)
+            
+            fingerprint = normalizer.output_fingerprint()
+        elif normalizer.map_missing_statuses(df):
+            # Status values the review peek didn't see were just mapped
+            fingerprint = normalizer.output_fingerprint()
         
         # Get confirmed mappings from database
         column_mappings = {}
@@ -508,6 +911,9 @@ def process_upload(upload):
         
         # Save the normalized file
         normalizer.save_normalized_file(df_normalized)
+        normalizer.save_turnaround_sketches(df_normalized)
+        upload.output_fingerprint = fingerprint
+        upload.save(update_fields=['output_fingerprint'])
         
         ProcessingLog.objects.create(
             upload=upload,